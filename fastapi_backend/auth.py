@@ -3,26 +3,44 @@ Authentication module for PolyLingo backend.
 """
 import os
 import jwt
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, NamedTuple, Optional, Set
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr, Field
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from user_store import create_user_repository
+
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))  # cost factor, each +1 doubles hashing time
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+
 # Initialize password context for hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# Bounded pool that runs bcrypt off the event loop (bcrypt releases the GIL)
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 # Initialize OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 # Secret key for JWT
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "polylingo_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
-# In-memory user database (replace with a real database in production)
-users_db = {}
+# Verified-token cache configuration
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 60))  # bounds staleness across workers
+
+# User repository (SQLite by default, see user_store.USER_STORE)
+user_repository = create_user_repository()
 
 # User models
 class UserBase(BaseModel):
@@ -33,6 +51,7 @@ class UserCreate(UserBase):
     password: str = Field(..., min_length=8)
 
 class UserInDB(UserBase):
+    id: Optional[str] = None
     hashed_password: str
     created_at: datetime = Field(default_factory=datetime.now)
     
@@ -47,6 +66,73 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
 
+class Principal(NamedTuple):
+    """Slim authenticated identity for hot paths, built without pydantic validation."""
+    id: str
+    username: str
+    email: str
+    created_at: datetime
+
+class TokenCache:
+    """
+    Bounded cache of verified tokens mapped to their principal.
+
+    Entries expire at the earlier of the token's own expiry and TOKEN_CACHE_TTL,
+    and can be dropped for a user when their record changes, so a cache hit skips
+    both the HMAC verification and the user lookup.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        """Return the cached principal for a token, or None."""
+        entry = self._entries.get(token)
+        if entry is not None:
+            principal, expires_at = entry
+            if expires_at > time.time():
+                self.hits += 1
+                return principal
+            self._drop(token)
+        self.misses += 1
+        return None
+
+    def put(self, token: str, principal: Principal, token_expiry: float):
+        """Cache a verified token until it or the TTL expires."""
+        if self.max_size <= 0:
+            return
+        self._entries[token] = (principal, min(token_expiry, time.time() + self.ttl))
+        self._tokens_by_user.setdefault(principal.username, set()).add(token)
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, username: str):
+        """Drop every cached token for a user."""
+        for token in list(self._tokens_by_user.get(username, ())):
+            self._drop(token)
+
+    def _drop(self, token: str):
+        """Remove one token from the cache and the per-user index."""
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user.get(entry[0].username)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry[0].username]
+
+    def stats(self) -> dict:
+        """Report cache counters."""
+        return {"size": len(self._entries), "maxSize": self.max_size, "hits": self.hits, "misses": self.misses}
+
+# Shared verified-token cache
+token_cache = TokenCache()
+
 # Password functions
 def verify_password(plain_password, hashed_password):
     """Verify a password against a hash."""
@@ -56,21 +142,40 @@ def get_password_hash(password):
     """Generate a password hash."""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password against a hash without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Generate a password hash without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+def shutdown_password_executor():
+    """Stop the password hashing pool."""
+    password_executor.shutdown(wait=False)
+
 # User functions
-def get_user(username: str):
+async def get_user(username: str):
     """Get a user by username."""
-    if username in users_db:
-        user_dict = users_db[username]
+    user_dict = await user_repository.get_by_username(username)
+    if user_dict:
         return UserInDB(**user_dict)
     return None
 
-def authenticate_user(username: str, password: str):
-    """Authenticate a user."""
-    user = get_user(username)
+async def authenticate_user_async(username: str, password: str):
+    """Authenticate a user, hashing off the event loop."""
+    user = await get_user(username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
+
+    # Re-hash with the current cost factor after BCRYPT_ROUNDS changes
+    if pwd_context.needs_update(user.hashed_password):
+        await user_repository.update_password_hash(username, await get_password_hash_async(password))
+        token_cache.invalidate_user(username)
     return user
 
 # Token functions
@@ -100,16 +205,65 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(username=username)
     except jwt.PyJWTError:
         raise credentials_exception
-    user = get_user(username=token_data.username)
+    user = await get_user(username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
 
-async def get_current_active_user(current_user: UserInDB = Depends(get_current_user)):
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Resolve a JWT to a Principal, using the verified-token cache.
+
+    On a cache hit this skips signature verification, the user lookup and
+    pydantic model construction entirely.
+    """
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        raise credentials_exception
+    username = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+    user_dict = await user_repository.get_by_username(username)
+    if user_dict is None:
+        raise credentials_exception
+
+    principal = Principal(
+        id=user_dict.get("id") or username,
+        username=username,
+        email=user_dict["email"],
+        created_at=user_dict["created_at"],
+    )
+    token_cache.put(token, principal, float(payload.get("exp", 0)))
+    return principal
+
+async def get_optional_principal(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[Principal]:
+    """
+    Resolve a bearer token if one was sent, for endpoints that also serve anonymous clients.
+
+    A missing or invalid token yields None instead of a 401.
+    """
+    if not token:
+        return None
+    try:
+        return await get_current_principal(token)
+    except HTTPException:
+        return None
+
+async def get_current_active_user(principal: Principal = Depends(get_current_principal)):
     """Get the current active user."""
     return User(
-        id=current_user.username,
-        email=current_user.email,
-        username=current_user.username,
-        created_at=current_user.created_at
+        id=principal.id,
+        email=principal.email,
+        username=principal.username,
+        created_at=principal.created_at
     )
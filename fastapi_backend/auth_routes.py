@@ -1,16 +1,19 @@
 """
 Authentication routes for PolyLingo backend.
 """
-from datetime import timedelta
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Dict
 import uuid
+from loguru import logger
 
+import auth
 from auth import (
-    User, UserCreate, Token, authenticate_user, create_access_token,
-    get_current_active_user, get_password_hash, users_db, ACCESS_TOKEN_EXPIRE_MINUTES
+    User, UserCreate, Token, authenticate_user_async, create_access_token,
+    get_current_active_user, get_password_hash_async, ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from user_store import UserExistsError
 
 router = APIRouter()
 
@@ -19,38 +22,47 @@ async def register_user(user: UserCreate):
     """
     Register a new user.
     """
-    if user.username in users_db:
+    # Indexed lookups reject duplicates before paying for a password hash
+    if await auth.user_repository.get_by_username(user.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
     # Check if email is already registered
-    for existing_user in users_db.values():
-        if existing_user["email"] == user.email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
+    if await auth.user_repository.get_by_email(user.email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_id = str(uuid.uuid4())
     
-    # Store user in database
-    users_db[user.username] = {
-        "username": user.username,
-        "email": user.email,
-        "hashed_password": hashed_password,
-        "created_at": user.created_at
-    }
+    # Store user in database; unique indexes catch concurrent duplicates
+    try:
+        stored = await auth.user_repository.create({
+            "id": user_id,
+            "username": user.username,
+            "email": user.email,
+            "hashed_password": hashed_password,
+            "created_at": datetime.now()
+        })
+    except UserExistsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{e.field} already registered"
+        )
     
+    logger.info("Registered user {}", stored["id"])
+
     # Return user without password
     return User(
-        id=user_id,
-        username=user.username,
-        email=user.email,
-        created_at=users_db[user.username]["created_at"]
+        id=stored["id"],
+        username=stored["username"],
+        email=stored["email"],
+        created_at=stored["created_at"]
     )
 
 @router.post("/token", response_model=Token)
@@ -58,8 +70,9 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     """
     Get an access token for a user.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user_async(form_data.username, form_data.password)
     if not user:
+        logger.info("Failed login for {}", form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -86,8 +99,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Login endpoint that returns user data along with the token.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user_async(form_data.username, form_data.password)
     if not user:
+        logger.info("Failed login for {}", form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -105,7 +119,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         "access_token": access_token,
         "token_type": "bearer",
         "user": {
-            "id": user.username,
+            "id": user.id or user.username,
             "username": user.username,
             "email": user.email,
             "created_at": user.created_at
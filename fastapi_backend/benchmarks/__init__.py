@@ -0,0 +1,3 @@
+"""
+Benchmarks for the PolyLingo backend. Run from the fastapi_backend directory, e.g. `python -m benchmarks.login_storm`.
+"""
@@ -0,0 +1,88 @@
+"""
+Microbenchmark of per-request authentication overhead.
+
+Compares the uncached path (JWT verification, user lookup and pydantic models
+via get_current_user) with get_current_principal served from the token cache.
+
+Usage:
+    python -m benchmarks.auth_overhead --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+# Keep the benchmark from creating a users database on import
+os.environ.setdefault("USER_STORE", "memory")
+
+import auth
+from user_store import InMemoryUserRepository
+
+
+async def time_per_call(fn, iterations: int) -> float:
+    """Average microseconds per awaited call."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def run(iterations: int) -> dict:
+    """
+    Time both authentication paths for one seeded user.
+
+    Args:
+        iterations: Calls per path
+
+    Returns:
+        Dictionary of results
+    """
+    auth.user_repository = InMemoryUserRepository()
+    await auth.user_repository.create({
+        "id": "bench",
+        "username": "bench_user",
+        "email": "bench@example.com",
+        "hashed_password": "unused",
+        "created_at": datetime.now(),
+    })
+    token = auth.create_access_token(data={"sub": "bench_user"})
+
+    async def uncached():
+        user = await auth.get_current_user(token)
+        return auth.User(id=user.id, email=user.email, username=user.username, created_at=user.created_at)
+
+    async def cached():
+        return await auth.get_current_principal(token)
+
+    # Warm up both paths, which also fills the token cache
+    await uncached()
+    await cached()
+
+    uncached_us = await time_per_call(uncached, iterations)
+    cached_us = await time_per_call(cached, iterations)
+    return {
+        "iterations": iterations,
+        "uncachedUsPerRequest": round(uncached_us, 2),
+        "cachedUsPerRequest": round(cached_us, 2),
+        "speedup": round(uncached_us / cached_us, 1) if cached_us else None,
+        "tokenCache": auth.token_cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.iterations))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
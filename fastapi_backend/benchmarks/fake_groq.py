@@ -0,0 +1,238 @@
+"""
+Fake OpenAI-compatible chat completions server for benchmarks.
+
+Answers every request with well-formed JSON shaped for the endpoint that sent
+it (learning suggestions, exercises, conversation analysis, sentence scores,
+incremental and packed batch prompts, plain-text translations), after a
+lognormal latency.
+A share of requests can fail with 5xx or 429 + Retry-After, and streamed
+requests are answered with SSE chunks at a fixed token interval. Usage is
+reported like Groq does, including x_groq usage on the last stream chunk.
+
+Usage:
+    python -m benchmarks.fake_groq --port 9911 --latency-ms 300 --latency-sigma 0.4 --error-rate 0.01
+
+Point the backend at it with GROQ_API_URL=http://127.0.0.1:9911/v1/chat/completions.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = "practice the past tense with everyday verbs and notice how word order changes in questions".split()
+
+
+class FakeConfig:
+    """Behaviour of the fake upstream; set from the command line."""
+
+    latency_ms = 300.0  # median time to first byte
+    latency_sigma = 0.4  # lognormal shape, 0 for a fixed latency
+    error_rate = 0.0  # share of requests answered with 503
+    rate_limit_rate = 0.0  # share of requests answered with 429
+    retry_after = 1.0  # Retry-After seconds sent with 429s
+    token_interval_ms = 5.0  # delay between streamed chunks
+    chunk_chars = 16  # characters per streamed chunk
+    completion_words = 40  # filler words per list, to size responses
+
+
+class FakeStats:
+    """Counters reported on /stats."""
+
+    requests = 0
+    streamed = 0
+    errors = 0
+    rate_limited = 0
+
+
+app = FastAPI(title="Fake Groq")
+
+
+def _latency() -> float:
+    """Sample a latency in seconds from the configured lognormal distribution."""
+    median = FakeConfig.latency_ms / 1000
+    if FakeConfig.latency_sigma <= 0:
+        return median
+    return median * math.exp(random.gauss(0, FakeConfig.latency_sigma))
+
+
+def _filler(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+
+def _item(exercises: bool) -> dict:
+    """One learning-suggestions or exercise result."""
+    filler = _filler(FakeConfig.completion_words)
+    if exercises:
+        return {"questions": [f"1. {filler}?", f"2. {filler}?"], "answers": ["1. yes", "2. no"]}
+    return {
+        "translation": [filler],
+        "grammar": [filler],
+        "vocabulary": [filler],
+        "suggestions": [filler],
+        "cultural": [filler],
+    }
+
+
+def build_content(body: dict) -> str:
+    """
+    Build a completion matching what the prompt asks for.
+
+    Args:
+        body: Chat completion request body
+
+    Returns:
+        The completion text
+    """
+    text = "\n".join(message.get("content", "") for message in body.get("messages", []))
+    exercises = '"questions"' in text and '"answers"' in text
+
+    aspects = re.search(r"one key per aspect: ([^.\n]+)", text)
+    if aspects:
+        return json.dumps({
+            aspect.strip(): {"score": round(random.random(), 2), "notes": _filler(12)}
+            for aspect in aspects.group(1).split(",")
+        })
+
+    if "exact keys: score, feedback, tip" in text:
+        return json.dumps({"score": random.randint(40, 95), "feedback": _filler(12), "tip": _filler(12)})
+
+    incremental = re.search(r"messages must be an array with exactly (\d+) objects", text)
+    if incremental:
+        message = {"sentiment": 0.5, "formality": 0.4, "engagement": 0.8, "cultural": ""}
+        return json.dumps({"messages": [message] * int(incremental.group(1)), "summary": _filler(20)})
+
+    batch = re.search(r"contains (\d+) numbered sentences", text)
+    if batch:
+        return json.dumps({"items": [_item(exercises) for _ in range(int(batch.group(1)))]})
+
+    if "response_format" not in body and "json" not in text.lower():
+        # Translations and summaries are plain text
+        return _filler(15)
+
+    return json.dumps(_item(exercises))
+
+
+def _usage(body: dict, content: str) -> dict:
+    prompt_chars = sum(len(message.get("content", "")) for message in body.get("messages", []))
+    prompt_tokens, completion_tokens = prompt_chars // 4, len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    FakeStats.requests += 1
+    await asyncio.sleep(_latency())
+
+    # Failures are decided after the latency, like a real overloaded upstream
+    roll = random.random()
+    if roll < FakeConfig.rate_limit_rate:
+        FakeStats.rate_limited += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+            status_code=429, headers={"retry-after": str(FakeConfig.retry_after)}
+        )
+    if roll < FakeConfig.rate_limit_rate + FakeConfig.error_rate:
+        FakeStats.errors += 1
+        return JSONResponse({"error": {"message": "Service unavailable"}}, status_code=503)
+
+    model = body.get("model", "fake")
+    content = build_content(body)
+    usage = _usage(body, content)
+    created = int(time.time())
+
+    if not body.get("stream"):
+        return {
+            "id": f"chatcmpl-{FakeStats.requests}",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    FakeStats.streamed += 1
+
+    async def chunks():
+        step = FakeConfig.chunk_chars
+        for index in range(0, len(content), step):
+            chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": content[index:index + step]}}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(FakeConfig.token_interval_ms / 1000)
+        final = {"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "requests": FakeStats.requests,
+        "streamed": FakeStats.streamed,
+        "errors": FakeStats.errors,
+        "rateLimited": FakeStats.rate_limited,
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy"}
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Add the fake upstream's behaviour options to a parser."""
+    parser.add_argument("--latency-ms", type=float, default=FakeConfig.latency_ms, help="Median upstream latency")
+    parser.add_argument("--latency-sigma", type=float, default=FakeConfig.latency_sigma, help="Lognormal shape of the latency")
+    parser.add_argument("--error-rate", type=float, default=FakeConfig.error_rate, help="Share of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=FakeConfig.rate_limit_rate, help="Share of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=FakeConfig.retry_after)
+    parser.add_argument("--token-interval-ms", type=float, default=FakeConfig.token_interval_ms)
+    parser.add_argument("--completion-words", type=int, default=FakeConfig.completion_words)
+
+
+def fake_arguments(args: argparse.Namespace) -> list:
+    """Turn parsed behaviour options back into command-line arguments."""
+    return [
+        "--latency-ms", str(args.latency_ms),
+        "--latency-sigma", str(args.latency_sigma),
+        "--error-rate", str(args.error_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate),
+        "--retry-after", str(args.retry_after),
+        "--token-interval-ms", str(args.token_interval_ms),
+        "--completion-words", str(args.completion_words),
+    ]
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9911)
+    parser.add_argument("--seed", type=int, help="Seed for reproducible latencies and failures")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    FakeConfig.latency_ms = args.latency_ms
+    FakeConfig.latency_sigma = args.latency_sigma
+    FakeConfig.error_rate = args.error_rate
+    FakeConfig.rate_limit_rate = args.rate_limit_rate
+    FakeConfig.retry_after = args.retry_after
+    FakeConfig.token_interval_ms = args.token_interval_ms
+    FakeConfig.completion_words = args.completion_words
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Microbenchmark and accuracy check of local language detection.
+
+Times LanguageDetector.detect one message at a time and detect_batch over
+batches, on short chat-style sentences in every profiled language, and
+reports how many were identified correctly, left as "auto" or mislabelled.
+
+Usage:
+    python -m benchmarks.language_id --iterations 2000 --batch-size 32
+"""
+import argparse
+import json
+import time
+
+from language_id import LanguageDetector
+
+# Short chat messages; ambiguous ones are expected to stay "auto"
+SAMPLES = {
+    "en": ["How are you doing today?", "I would like to book a table for two.", "Thank you very much for your help"],
+    "es": ["¿Dónde está la estación de tren?", "Me gustaría reservar una mesa para dos.", "Muchas gracias por tu ayuda"],
+    "fr": ["Où est la gare, s'il vous plaît ?", "Je voudrais réserver une table pour deux.", "Merci beaucoup pour votre aide"],
+    "de": ["Wo ist der Bahnhof?", "Ich möchte einen Tisch für zwei Personen reservieren.", "Vielen Dank für deine Hilfe"],
+    "it": ["Dov'è la stazione dei treni?", "Vorrei prenotare un tavolo per due.", "Grazie mille per il tuo aiuto"],
+    "pt": ["Onde fica a estação de trem?", "Eu gostaria de reservar uma mesa para dois.", "Muito obrigado pela sua ajuda"],
+    "nl": ["Waar is het treinstation?", "Ik wil graag een tafel voor twee reserveren.", "Heel erg bedankt voor je hulp"],
+    "pl": ["Gdzie jest dworzec kolejowy?", "Chciałbym zarezerwować stolik dla dwóch osób.", "Dziękuję bardzo za pomoc"],
+    "tr": ["İki kişilik bir masa ayırtmak istiyorum.", "Yardımın için çok teşekkür ederim"],
+    "vi": ["Tôi muốn đặt một bàn cho hai người.", "Cảm ơn bạn rất nhiều"],
+    "ru": ["Где находится вокзал?", "Спасибо большое за помощь"],
+    "zh": ["火车站在哪里？", "非常感谢你的帮助"],
+    "ja": ["駅はどこですか？", "手伝ってくれてありがとうございます"],
+    "ko": ["기차역이 어디에 있어요?", "도와줘서 정말 고마워요"],
+    "ar": ["أين محطة القطار؟", "شكرا جزيلا على مساعدتك"],
+    "hi": ["रेलवे स्टेशन कहाँ है?", "आपकी मदद के लिए बहुत धन्यवाद"],
+    "th": ["สถานีรถไฟอยู่ที่ไหน", "ขอบคุณมากสำหรับความช่วยเหลือ"],
+}
+
+
+def run(iterations: int, batch_size: int) -> dict:
+    """
+    Check accuracy on SAMPLES, then time single and batched detection.
+
+    Args:
+        iterations: Messages timed per mode
+        batch_size: Messages per detect_batch call
+
+    Returns:
+        Dictionary of results
+    """
+    detector = LanguageDetector()
+    start = time.perf_counter()
+    detector.load()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    labelled = [(language, text) for language, texts in SAMPLES.items() for text in texts]
+    detections = detector.detect_batch([text for _, text in labelled])
+    correct = sum(detection.language == language for (language, _), detection in zip(labelled, detections))
+    undetermined = sum(detection.language == "auto" for detection in detections)
+    wrong = [
+        {"expected": language, "detected": detection.language, "text": text}
+        for (language, text), detection in zip(labelled, detections)
+        if detection.language not in (language, "auto")
+    ]
+
+    texts = [text for _, text in labelled]
+    start = time.perf_counter()
+    for i in range(iterations):
+        detector.detect(texts[i % len(texts)])
+    single_us = (time.perf_counter() - start) / iterations * 1e6
+
+    batches = [[texts[(i + j) % len(texts)] for j in range(batch_size)] for i in range(0, iterations, batch_size)]
+    start = time.perf_counter()
+    for batch in batches:
+        detector.detect_batch(batch)
+    batch_us = (time.perf_counter() - start) / (len(batches) * batch_size) * 1e6
+
+    return {
+        "profileLoadMs": round(load_ms, 1),
+        "samples": len(labelled),
+        "correct": correct,
+        "undetermined": undetermined,
+        "wrong": wrong,
+        "singleUsPerMessage": round(single_us, 1),
+        "batchUsPerMessage": round(batch_us, 1),
+        "batchSize": batch_size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    result = run(args.iterations, args.batch_size)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+Load test of the backend against the bundled fake Groq server.
+
+Starts benchmarks.fake_groq and the backend (uvicorn fixed_backend:app, or
+run_fixed.py with --workers) as subprocesses, then drives each scenario at each concurrency level and
+reports throughput, client-side latency percentiles, error counts, the
+backend's event-loop lag (from its /metrics) and its resident memory.
+Results are written as JSON; pass a previous result with --compare to print
+throughput and p95 changes against it.
+
+Scenarios: learning, learning_stream, exercises, analysis, sentence, auth_login, auth_me.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 1,16,64 --requests 400 --output results.json
+    python -m benchmarks.load_test --scenarios auth_login --concurrency 8 --compare results.json
+    python -m benchmarks.load_test --workers 4 --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks import fake_groq
+
+SCENARIOS = ("learning", "learning_stream", "exercises", "analysis", "sentence", "auth_login", "auth_me")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_TIMEOUT = 30  # seconds to wait for a subprocess to answer /health
+
+# Base environment for the backend under test; --backend-env adds to or overrides it
+BACKEND_ENV = {
+    "GROQ_API_KEY": "bench",
+    "USER_STORE": "memory",
+    "GROQ_CACHE_DB": "",
+    "TM_DB": "",
+    "LOG_LEVEL": "WARNING",
+    "LOG_FILE": "",
+}
+
+SENTENCES = [
+    "Yesterday I went to the market and bought fresh bread",
+    "She has been learning Spanish for three years",
+    "Could you tell me where the nearest train station is",
+    "We would have arrived earlier if the bus had been on time",
+]
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile of a list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def parse_histogram(text: str, name: str) -> Dict[str, object]:
+    """
+    Read one unlabelled histogram from a Prometheus text scrape.
+
+    Args:
+        text: Scrape body
+        name: Metric name without the prefix, e.g. "event_loop_lag_seconds"
+
+    Returns:
+        Dictionary with buckets (upper bound -> cumulative count), sum and count
+    """
+    buckets, total, count = {}, 0.0, 0
+    for line in text.splitlines():
+        match = re.match(rf'^\w*{name}_bucket\{{le="([^"]+)"\}} (\S+)$', line)
+        if match:
+            buckets[float(match.group(1))] = float(match.group(2))
+        elif re.match(rf"^\w*{name}_sum ", line):
+            total = float(line.split()[1])
+        elif re.match(rf"^\w*{name}_count ", line):
+            count = int(float(line.split()[1]))
+    return {"buckets": buckets, "sum": total, "count": count}
+
+
+def histogram_quantile(before: dict, after: dict, quantile: float) -> Optional[float]:
+    """Quantile of the observations between two scrapes, interpolated within buckets."""
+    bounds = sorted(after["buckets"])
+    counts = [after["buckets"][bound] - before["buckets"].get(bound, 0) for bound in bounds]
+    if not counts or counts[-1] <= 0:
+        return None
+    rank = quantile * counts[-1]
+    previous_bound, previous_count = 0.0, 0.0
+    for bound, count in zip(bounds, counts):
+        if count >= rank:
+            if bound == float("inf"):
+                return previous_bound
+            width = count - previous_count
+            return previous_bound + (bound - previous_bound) * ((rank - previous_count) / width if width else 1)
+        previous_bound, previous_count = bound, count
+    return previous_bound
+
+
+def process_tree(pid: int) -> List[int]:
+    """A process and all its descendants, from /proc."""
+    pids = [pid]
+    for current in pids:
+        try:
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def process_memory_mb(pid: int) -> Dict[str, Optional[float]]:
+    """
+    Current and peak resident memory of a process from /proc, in MB.
+
+    Worker processes (and OCR processes) are included, so multi-worker runs
+    report the memory of the whole server.
+    """
+    memory = {"rssMb": None, "peakRssMb": None}
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        memory["rssMb"] = round((memory["rssMb"] or 0) + int(line.split()[1]) / 1024, 1)
+                    elif line.startswith("VmHWM:"):
+                        memory["peakRssMb"] = round((memory["peakRssMb"] or 0) + int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+    return memory
+
+
+def git_revision() -> Optional[str]:
+    """Commit of the tree under test, so results can be matched to versions."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_ready(url: str, process: Optional[subprocess.Popen] = None):
+    """Poll a /health URL until it answers or the process exits."""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"{url} process exited with {process.returncode}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+class Workload:
+    """Builds requests for each scenario against one backend."""
+
+    def __init__(self, client: httpx.AsyncClient, unique_ratio: float):
+        self.client = client
+        self.unique_ratio = unique_ratio
+        self.counter = 0
+        self.username = f"bench_{uuid.uuid4().hex[:8]}"
+        self.password = "bench-password-123"
+        self.token: Optional[str] = None
+        self.sentence_sources: Counter = Counter()
+
+    async def setup_auth(self):
+        """Register the benchmark user and keep a token for auth_me."""
+        await self.client.post("/auth/register", json={
+            "username": self.username, "email": f"{self.username}@example.com", "password": self.password
+        })
+        response = await self.client.post("/auth/token", data={"username": self.username, "password": self.password})
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+
+    def _text(self) -> str:
+        """A sentence that is unique for unique_ratio of requests and repeats (cache hits) otherwise."""
+        self.counter += 1
+        sentence = SENTENCES[self.counter % len(SENTENCES)]
+        if (self.counter * 0.6180339887) % 1 < self.unique_ratio:
+            return f"{sentence} ({self.counter})"
+        return sentence
+
+    async def send(self, scenario: str) -> bool:
+        """
+        Send one request for a scenario.
+
+        Returns:
+            Whether the request succeeded
+        """
+        if scenario == "learning":
+            response = await self.client.post("/learning-suggestions", json={
+                "text": self._text(), "userLanguage": "en", "targetLanguage": "es", "proficiencyLevel": "intermediate", "focusArea": "general"
+            })
+            return response.status_code == 200 and response.json().get("success", True) is not False
+        if scenario == "learning_stream":
+            ok = False
+            async with self.client.stream("POST", "/learning-suggestions/stream", json={
+                "text": self._text(), "userLanguage": "en", "targetLanguage": "es", "proficiencyLevel": "intermediate", "focusArea": "general"
+            }) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("event: done"):
+                        ok = True
+            return response.status_code == 200 and ok
+        if scenario == "exercises":
+            response = await self.client.post("/generate-exercises", json={
+                "text": self._text(), "targetLanguage": "es", "proficiencyLevel": "intermediate", "exerciseType": "mixed"
+            })
+            return response.status_code == 200 and response.json().get("success", True) is not False
+        if scenario == "analysis":
+            text = self._text()
+            response = await self.client.post("/analyze-conversation", json={
+                "messages": [
+                    {"text": text, "speaker": "A", "language": "en"},
+                    {"text": "That sounds great, tell me more", "speaker": "B", "language": "en"},
+                ],
+                "analyzeFor": ["sentiment", "formality", "engagement"],
+            })
+            return response.status_code == 200 and response.json().get("success", True) is not False
+        if scenario == "sentence":
+            response = await self.client.post("/analyze-sentence", json={"text": self._text(), "language": "en"})
+            if response.status_code != 200:
+                return False
+            # Tally local answers against LLM escalations
+            self.sentence_sources[response.json()["source"]] += 1
+            return True
+        if scenario == "auth_login":
+            response = await self.client.post("/auth/token", data={"username": self.username, "password": self.password})
+            return response.status_code == 200
+        if scenario == "auth_me":
+            response = await self.client.get("/auth/users/me", headers={"Authorization": f"Bearer {self.token}"})
+            return response.status_code == 200
+        raise ValueError(f"Unknown scenario {scenario}")
+
+
+async def run_level(workload: Workload, scenario: str, concurrency: int, requests: int, backend_pid: Optional[int],
+                    lag: bool = True) -> dict:
+    """
+    Drive one scenario at one concurrency level.
+
+    Args:
+        workload: Request builder bound to the backend
+        scenario: Scenario name
+        concurrency: Requests in flight at once
+        requests: Total requests to send
+        backend_pid: Backend process id for memory readings, if it was started here
+        lag: Whether to read event-loop lag; /metrics is per process, so not with several workers
+
+    Returns:
+        Dictionary of results for this level
+    """
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                ok = await workload.send(scenario)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+
+    if lag:
+        before = parse_histogram((await workload.client.get("/metrics")).text, "event_loop_lag_seconds")
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "elapsedSeconds": round(elapsed, 3),
+        "throughputRps": round(requests / elapsed, 2),
+        "latencyMs": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(max(latencies), 1),
+        },
+        "loopLagMs": None,
+    }
+    if lag:
+        after = parse_histogram((await workload.client.get("/metrics")).text, "event_loop_lag_seconds")
+        lag_samples = after["count"] - before["count"]
+        lag_p99 = histogram_quantile(before, after, 0.99)
+        result["loopLagMs"] = {
+            "samples": lag_samples,
+            "mean": round((after["sum"] - before["sum"]) / lag_samples * 1000, 2) if lag_samples else None,
+            "p99": round(lag_p99 * 1000, 2) if lag_p99 is not None else None,
+        }
+    if backend_pid is not None:
+        result["memory"] = process_memory_mb(backend_pid)
+    return result
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """
+    Throughput and p95 changes against a baseline run, in percent.
+
+    Args:
+        results: Results of this run
+        baseline: Results of an earlier run
+
+    Returns:
+        Dictionary of scenario -> concurrency -> changes
+    """
+    changes = {}
+    for scenario, levels in results["scenarios"].items():
+        base_levels = {level["concurrency"]: level for level in baseline.get("scenarios", {}).get(scenario, [])}
+        for level in levels:
+            base = base_levels.get(level["concurrency"])
+            if not base:
+                continue
+            changes.setdefault(scenario, {})[str(level["concurrency"])] = {
+                "throughputPercent": round((level["throughputRps"] / base["throughputRps"] - 1) * 100, 1),
+                "p95Percent": round((level["latencyMs"]["p95"] / base["latencyMs"]["p95"] - 1) * 100, 1),
+            }
+    return changes
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """
+    Start the fake upstream and backend, run every scenario and level, and stop them.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Dictionary of results
+    """
+    processes = []
+    backend_pid = None
+    backend_url = args.backend_url
+    data_dir = tempfile.mkdtemp(prefix="polylingo-bench-")
+    try:
+        if not backend_url:
+            fake = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.fake_groq", "--port", str(args.fake_port), "--seed", "1"] + fake_groq.fake_arguments(args),
+                cwd=BACKEND_DIR,
+            )
+            processes.append(fake)
+            await wait_ready(f"http://127.0.0.1:{args.fake_port}/health", fake)
+
+            env = {**os.environ, **BACKEND_ENV, "GROQ_API_URL": f"http://127.0.0.1:{args.fake_port}/v1/chat/completions"}
+            env["JOBS_DB"] = os.path.join(data_dir, "jobs.db")
+            env["SESSION_DB"] = os.path.join(data_dir, "sessions.db")
+            env["SUMMARY_DB"] = os.path.join(data_dir, "summaries.db")
+            env["ANALYSIS_STATE_DB"] = os.path.join(data_dir, "analysis_state.db")
+            if args.workers > 1:
+                # In-memory users are per process, so workers share a throwaway SQLite store instead
+                env.update({"USER_STORE": "sqlite", "USER_DB": os.path.join(data_dir, "users.db")})
+            env.update(item.split("=", 1) for item in args.backend_env)
+            if args.workers:
+                env.update({"PORT": str(args.backend_port), "HOST": "127.0.0.1", "WEB_CONCURRENCY": str(args.workers)})
+                command = [sys.executable, "run_fixed.py"]
+            else:
+                command = [sys.executable, "-m", "uvicorn", "fixed_backend:app", "--port", str(args.backend_port), "--log-level", "warning"]
+            backend = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+            processes.append(backend)
+            backend_pid = backend.pid
+            backend_url = f"http://127.0.0.1:{args.backend_port}"
+            await wait_ready(f"{backend_url}/health", backend)
+
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=backend_url, limits=limits, timeout=args.timeout) as client:
+            workload = Workload(client, args.unique_ratio)
+            if any(scenario.startswith("auth") for scenario in args.scenarios):
+                await workload.setup_auth()
+
+            scenarios = {}
+            for scenario in args.scenarios:
+                # A few requests first so connections and caches are warm
+                for _ in range(min(5, args.requests)):
+                    await workload.send(scenario)
+                scenarios[scenario] = []
+                for concurrency in args.concurrency:
+                    level = await run_level(workload, scenario, concurrency, args.requests, backend_pid, args.workers <= 1)
+                    print(f"{scenario} x{concurrency}: {level['throughputRps']} req/s, p95 {level['latencyMs']['p95']} ms, {level['errors']} errors", file=sys.stderr)
+                    scenarios[scenario].append(level)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpuCount": os.cpu_count(),
+        "workers": args.workers,
+        "upstream": None if args.backend_url else {
+            "latencyMs": args.latency_ms,
+            "latencySigma": args.latency_sigma,
+            "errorRate": args.error_rate,
+            "rateLimitRate": args.rate_limit_rate,
+        },
+        "uniqueRatio": args.unique_ratio,
+        "scenarios": scenarios,
+        # Where /analyze-sentence answers came from: local scorer or LLM
+        "sentenceSources": dict(workload.sentence_sources),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS),
+                        help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")], default=[1, 16, 64],
+                        help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and level")
+    parser.add_argument("--unique-ratio", type=float, default=1.0, help="Share of requests with unique text; the rest can hit the cache")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--backend-url", help="Test an already running backend instead of starting one (no memory readings)")
+    parser.add_argument("--backend-port", type=int, default=8101)
+    parser.add_argument("--fake-port", type=int, default=9911)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Start the backend with run_fixed.py and this many workers; 0 runs plain single-process uvicorn")
+    parser.add_argument("--backend-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the backend, e.g. GROQ_MAX_IN_FLIGHT=64")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    fake_groq.add_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    result = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            result["comparison"] = {"baseline": args.compare, "changes": compare(result, json.load(f))}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Measure event-loop lag during a login storm, with bcrypt on and off the event loop.
+
+Usage:
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+# Keep the benchmark from creating a users database on import
+os.environ.setdefault("USER_STORE", "memory")
+
+import auth
+from user_store import InMemoryUserRepository
+
+PROBE_INTERVAL = 0.005  # seconds between event-loop lag samples
+
+
+async def probe_loop_lag(samples: list, stop: asyncio.Event):
+    """Record how late a short sleep wakes up; lateness is time the loop was blocked."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+async def run_storm(mode: str, logins: int, concurrency: int, username: str, password: str) -> dict:
+    """
+    Run concurrent logins and report throughput and loop lag.
+
+    Args:
+        mode: "blocking" calls the synchronous verify_password, "offloaded" awaits authenticate_user_async
+        logins: Total number of logins
+        concurrency: Logins in flight at once
+        username: Seeded user name
+        password: Seeded user password
+
+    Returns:
+        Dictionary of results
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def login():
+        async with semaphore:
+            start = time.perf_counter()
+            if mode == "blocking":
+                user = await auth.get_user(username)
+                ok = auth.verify_password(password, user.hashed_password)
+            else:
+                ok = await auth.authenticate_user_async(username, password)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert ok
+
+    lag_samples = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(lag_samples, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe
+
+    lag_samples.sort()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "concurrency": concurrency,
+        "bcryptRounds": auth.BCRYPT_ROUNDS,
+        "workers": auth.PASSWORD_HASH_WORKERS,
+        "loginsPerSec": round(logins / elapsed, 1),
+        "loginP50Ms": round(statistics.median(latencies), 1),
+        "loopLagSamples": len(lag_samples),
+        "loopLagP50Ms": round(lag_samples[len(lag_samples) // 2], 2) if lag_samples else None,
+        "loopLagP99Ms": round(lag_samples[min(len(lag_samples) - 1, int(len(lag_samples) * 0.99))], 2) if lag_samples else None,
+        "loopLagMaxMs": round(lag_samples[-1], 2) if lag_samples else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    # Seed one user in an in-memory store so the benchmark measures hashing, not storage
+    username, password = "bench_user", "bench-password-123"
+    auth.user_repository = InMemoryUserRepository()
+    asyncio.run(auth.user_repository.create({
+        "id": "bench",
+        "username": username,
+        "email": "bench@example.com",
+        "hashed_password": auth.get_password_hash(password),
+        "created_at": datetime.now(),
+    }))
+
+    results = [
+        asyncio.run(run_storm(mode, args.logins, args.concurrency, username, password))
+        for mode in ("blocking", "offloaded")
+    ]
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
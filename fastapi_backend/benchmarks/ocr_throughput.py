@@ -0,0 +1,108 @@
+"""
+OCR throughput of the process pool, in images per second and per core.
+
+Renders synthetic textbook-like pages as JPEG photos, then pushes them all
+through OcrPool at once and reports wall-clock throughput. Preprocessing alone
+is also timed in-process, to separate Pillow cost from Tesseract cost.
+Requires the tesseract binary on PATH.
+
+Usage:
+    python -m benchmarks.ocr_throughput --images 64 --workers 4
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import time
+
+from PIL import Image, ImageDraw
+
+from ocr import OcrPool, OcrError, preprocess_image
+
+WORDS = "the student reads a short story about a family trip to the sea and writes new words in a notebook".split()
+
+
+def render_page(width: int, height: int, seed: int) -> bytes:
+    """Render lines of random words on an off-white page and encode as JPEG."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (236, 232, 222))
+    draw = ImageDraw.Draw(image)
+    line_height = max(12, height // 40)
+    for y in range(line_height, height - line_height, line_height * 2):
+        line = " ".join(rng.choice(WORDS) for _ in range(12))
+        draw.text((width // 20, y), line, fill=(30, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+async def run(images: int, workers: int, width: int, height: int) -> dict:
+    """
+    Measure pool throughput for a batch of synthetic pages.
+
+    Args:
+        images: Number of images to process
+        workers: Pool processes
+        width: Page width in pixels
+        height: Page height in pixels
+
+    Returns:
+        Dictionary of results
+    """
+    pages = [render_page(width, height, seed) for seed in range(images)]
+
+    # Preprocessing alone, single core
+    start = time.perf_counter()
+    for page in pages:
+        preprocess_image(page)
+    preprocess_seconds = time.perf_counter() - start
+
+    pool = OcrPool(workers=workers, max_pending=images)
+    try:
+        # Warm up so process spawn time is not counted
+        warmup = await asyncio.gather(*(pool.run(pages[0]) for _ in range(workers)), return_exceptions=True)
+        if isinstance(warmup[0], OcrError):
+            return {"error": str(warmup[0])}
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(pool.run(page) for page in pages), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+
+    failures = [result for result in results if isinstance(result, Exception)]
+    cores = min(workers, os.cpu_count() or 1)
+    return {
+        "images": images,
+        "workers": workers,
+        "cpuCount": os.cpu_count(),
+        "imageSize": f"{width}x{height}",
+        "avgUploadKb": round(sum(map(len, pages)) / len(pages) / 1024, 1),
+        "preprocessMsPerImage": round(preprocess_seconds / images * 1000, 1),
+        "elapsedSeconds": round(elapsed, 3),
+        "imagesPerSecond": round(images / elapsed, 2),
+        "imagesPerSecondPerCore": round(images / elapsed / cores, 2),
+        "failures": len(failures),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--width", type=int, default=3024)
+    parser.add_argument("--height", type=int, default=4032)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.images, args.workers, args.width, args.height))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Token-bounded conversation context with a rolling summary per conversation, shared by every worker.
+"""
+import os
+import re
+import time
+import asyncio
+import hashlib
+import weakref
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from sqlite_pool import SQLitePool
+
+# Context configuration
+CONTEXT_HISTORY_TOKENS = int(os.getenv("CONTEXT_HISTORY_TOKENS", 3000))  # budget for analysis prompts
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", 600))  # budget for chat translation context
+SUMMARY_MIN_MESSAGES = int(os.getenv("SUMMARY_MIN_MESSAGES", 4))  # fold at least this many messages per re-summary
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", 10000))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", 6 * 3600))
+SUMMARY_DB = os.getenv("SUMMARY_DB", "summaries.db")
+SUMMARY_DB_POOL_SIZE = int(os.getenv("SUMMARY_DB_POOL_SIZE", 2))
+
+# Writes between purges of expired and excess summaries
+PURGE_EVERY = 100
+
+# Words and individual punctuation marks, roughly how BPE tokenizers split text
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text without a model tokenizer.
+
+    Long words are split into several tokens by BPE vocabularies, so each word
+    counts one token per started group of four characters.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def format_message(message) -> str:
+    """Render a chat message as one prompt line, leaving out a language that is still "auto"."""
+    if not message.language or message.language == "auto":
+        return f"Speaker {message.speaker}: {message.text}"
+    return f"Speaker {message.speaker} ({message.language}): {message.text}"
+
+
+def _prefix_digest(messages: list, count: int) -> str:
+    """Fingerprint the first count messages so a cached summary can be validated."""
+    digest = hashlib.sha256()
+    for message in messages[:count]:
+        digest.update(format_message(message).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class _SummaryEntry:
+    """Rolling summary of the first `covered` messages of one conversation."""
+
+    __slots__ = ("summary", "covered", "digest")
+
+    def __init__(self, summary: str = "", covered: int = 0, digest: str = ""):
+        self.summary = summary
+        self.covered = covered
+        self.digest = digest
+
+
+class ConversationContext:
+    """
+    Build token-bounded conversation context.
+
+    The most recent messages are kept verbatim within a token budget. For
+    conversations with an id, older messages are folded into a rolling summary
+    that is stored per conversation and extended incrementally, so each request
+    only summarizes the messages that slid out of the window since the last one.
+    Without an id, older messages are simply dropped.
+
+    Summaries live in SQLite so every worker process extends the same one.
+    Two workers summarizing one conversation at once both store a valid
+    summary and the last write wins; the prefix digest keeps either usable.
+    """
+
+    def __init__(self, max_entries: int = SUMMARY_CACHE_SIZE, ttl: float = SUMMARY_CACHE_TTL,
+                 db_path: str = SUMMARY_DB, pool_size: int = SUMMARY_DB_POOL_SIZE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._pool: Optional[SQLitePool] = None
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._writes = 0
+        self.summaries_created = 0
+        self.summaries_extended = 0
+        self.summaries_reused = 0
+
+    async def build(
+        self,
+        messages: list,
+        max_tokens: int,
+        summarize: Callable[[str, List[str]], Awaitable[Optional[str]]],
+        conversation_id: Optional[str] = None,
+    ) -> Tuple[str, list, int]:
+        """
+        Select the context to send for a conversation.
+
+        Args:
+            messages: Chat messages, oldest first
+            max_tokens: Token budget for the verbatim recent messages
+            summarize: Coroutine (previous summary, message lines) -> new summary, or None on failure
+            conversation_id: Stable id of the conversation, enables the cached summary
+
+        Returns:
+            Tuple of (summary of older messages, recent messages within max_tokens,
+            number of messages in neither)
+        """
+        split = self._window_start(messages, max_tokens)
+        if split == 0:
+            return "", list(messages), 0
+        if not conversation_id:
+            return "", list(messages[split:]), split
+
+        # One summary per conversation at a time in this worker
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = self._locks[conversation_id] = asyncio.Lock()
+        async with lock:
+            entry = await self._load(conversation_id)
+            # Discard the cached summary if the client rewrote earlier history
+            if entry.covered > len(messages) or entry.digest != _prefix_digest(messages, entry.covered):
+                entry.summary, entry.covered, entry.digest = "", 0, _prefix_digest(messages, 0)
+
+            # Fold older messages in batches so small window shifts reuse the summary
+            if split - entry.covered >= SUMMARY_MIN_MESSAGES or (entry.covered == 0 and split > 0):
+                lines = [format_message(message) for message in messages[entry.covered:split]]
+                summary = await summarize(entry.summary, lines)
+                if summary is None:
+                    if not entry.summary:
+                        return "", list(messages[split:]), split
+                else:
+                    if entry.summary:
+                        self.summaries_extended += 1
+                    else:
+                        self.summaries_created += 1
+                    entry.summary, entry.covered = summary, split
+                    entry.digest = _prefix_digest(messages, split)
+            else:
+                self.summaries_reused += 1
+
+            await self._store(conversation_id, entry)
+            # Messages between the summary and the window wait for the next batch and are left out meanwhile
+            return entry.summary, list(messages[split:]), split - entry.covered
+
+    @staticmethod
+    def _window_start(messages: list, max_tokens: int) -> int:
+        """Index of the oldest message that fits in the budget, walking back from the newest."""
+        used = 0
+        for index in range(len(messages) - 1, -1, -1):
+            used += estimate_tokens(format_message(messages[index]))
+            if used > max_tokens:
+                # Always keep at least the newest message
+                return min(index + 1, len(messages) - 1)
+        return 0
+
+    def _db(self) -> SQLitePool:
+        """Open the database on first use."""
+        if self._pool is None:
+            self._pool = SQLitePool(self.db_path, self.pool_size, "summary-db", (
+                "CREATE TABLE IF NOT EXISTS conversation_summaries ("
+                "conversation_id TEXT PRIMARY KEY, "
+                "summary TEXT NOT NULL, "
+                "covered INTEGER NOT NULL, "
+                "digest TEXT NOT NULL, "
+                "expires_at REAL NOT NULL)",
+                "CREATE INDEX IF NOT EXISTS idx_conversation_summaries_expires ON conversation_summaries (expires_at)",
+            ))
+        return self._pool
+
+    async def _load(self, conversation_id: str) -> _SummaryEntry:
+        """Read the stored summary of a conversation, or an empty one if it has none or it expired."""
+        row = await self._db().run(
+            lambda conn: conn.execute(
+                "SELECT summary, covered, digest FROM conversation_summaries WHERE conversation_id = ? AND expires_at >= ?",
+                (conversation_id, time.time()),
+            ).fetchone()
+        )
+        return _SummaryEntry(*row) if row is not None else _SummaryEntry()
+
+    async def _store(self, conversation_id: str, entry: _SummaryEntry):
+        """Write a summary and extend its lifetime, purging stale ones every PURGE_EVERY writes."""
+        self._writes += 1
+        purge = self._writes % PURGE_EVERY == 0
+
+        def write(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO conversation_summaries (conversation_id, summary, covered, digest, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, entry.summary, entry.covered, entry.digest, time.time() + self.ttl),
+            )
+            if purge:
+                conn.execute("DELETE FROM conversation_summaries WHERE expires_at < ?", (time.time(),))
+                conn.execute(
+                    "DELETE FROM conversation_summaries WHERE conversation_id IN ("
+                    "SELECT conversation_id FROM conversation_summaries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+        await self._db().run(write)
+
+    def close(self):
+        """Close the database."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def stats(self) -> dict:
+        """
+        Report summary cache counters for the health endpoint.
+
+        Returns:
+            Dictionary with this worker's summary counters
+        """
+        return {
+            "summariesCreated": self.summaries_created,
+            "summariesExtended": self.summaries_extended,
+            "summariesReused": self.summaries_reused,
+        }
+
+
+# Shared context builder used by analysis and chat translation
+conversation_context = ConversationContext()
@@ -0,0 +1,321 @@
+"""
+Per-conversation analysis state for incremental conversation analysis, shared by every worker.
+"""
+import os
+import json
+import time
+import asyncio
+import weakref
+from typing import Callable, Dict, List, Optional
+
+from sqlite_pool import SQLitePool
+
+# State store configuration
+ANALYSIS_STATE_DB = os.getenv("ANALYSIS_STATE_DB", "analysis_state.db")
+ANALYSIS_STATE_DB_POOL_SIZE = int(os.getenv("ANALYSIS_STATE_DB_POOL_SIZE", 2))
+ANALYSIS_STATE_SIZE = int(os.getenv("ANALYSIS_STATE_SIZE", 10000))
+ANALYSIS_STATE_TTL = float(os.getenv("ANALYSIS_STATE_TTL", 6 * 3600))
+ANALYSIS_CONTEXT_TAIL = int(os.getenv("ANALYSIS_CONTEXT_TAIL", 3))  # previous messages resent as context
+
+# Writes between purges of expired and excess conversations
+PURGE_EVERY = 100
+
+# Numeric aspects scored per message, with the labels used for the running mean
+SCORED_ASPECTS = {
+    "sentiment": ((-0.2, "negative"), (0.2, "neutral"), (None, "positive")),  # -1..1
+    "formality": ((0.35, "informal"), (0.65, "neutral"), (None, "formal")),  # 0..1
+    "engagement": ((0.35, "low"), (0.65, "moderate"), (None, "high")),  # 0..1
+}
+
+
+def _label(aspect: str, value: float) -> str:
+    """Map a running mean onto a label for its aspect."""
+    for upper, label in SCORED_ASPECTS[aspect]:
+        if upper is None or value < upper:
+            return label
+    return ""
+
+
+class _RunningMean:
+    """Count-weighted running mean, updated in O(1) per value."""
+
+    __slots__ = ("count", "mean")
+
+    def __init__(self, count: int = 0, mean: float = 0.0):
+        self.count = count
+        self.mean = mean
+
+    def add(self, value: float):
+        """Include one more value in the mean."""
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+
+
+class ConversationState:
+    """
+    Aggregated analysis of everything seen so far in one conversation.
+
+    version is the stored revision the state was read at, 0 for a
+    conversation that has none yet.
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.message_count = 0
+        self.aspects: Dict[str, _RunningMean] = {}
+        self.speakers: Dict[str, Dict[str, _RunningMean]] = {}
+        self.cultural_notes: List[str] = []
+        self.summary = ""
+        self.tail: List[str] = []
+
+    def to_json(self) -> str:
+        """Serialize the aggregates for storage."""
+        return json.dumps({
+            "messageCount": self.message_count,
+            "aspects": {aspect: [running.count, running.mean] for aspect, running in self.aspects.items()},
+            "speakers": {
+                speaker: {aspect: [running.count, running.mean] for aspect, running in aspects.items()}
+                for speaker, aspects in self.speakers.items()
+            },
+            "cultural": self.cultural_notes,
+            "summary": self.summary,
+            "tail": self.tail,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data: str, version: int) -> "ConversationState":
+        """Rebuild a state stored by to_json at the given revision."""
+        stored = json.loads(data)
+        state = cls(version)
+        state.message_count = stored["messageCount"]
+        state.aspects = {aspect: _RunningMean(*pair) for aspect, pair in stored["aspects"].items()}
+        state.speakers = {
+            speaker: {aspect: _RunningMean(*pair) for aspect, pair in aspects.items()}
+            for speaker, aspects in stored["speakers"].items()
+        }
+        state.cultural_notes = stored["cultural"]
+        state.summary = stored["summary"]
+        state.tail = stored["tail"]
+        return state
+
+    def apply(self, speakers: List[str], lines: List[str], delta: dict):
+        """
+        Fold a model delta for new messages into the aggregates.
+
+        Args:
+            speakers: Speaker of each new message
+            lines: Formatted new messages, kept as context for the next delta
+            delta: Parsed model output with a per-message "messages" list and a "summary"
+        """
+        scored = delta.get("messages") or []
+        for speaker, scores in zip(speakers, scored):
+            if not isinstance(scores, dict):
+                continue
+            for aspect in SCORED_ASPECTS:
+                value = scores.get(aspect)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.aspects.setdefault(aspect, _RunningMean()).add(float(value))
+                    self.speakers.setdefault(speaker, {}).setdefault(aspect, _RunningMean()).add(float(value))
+            note = scores.get("cultural")
+            if isinstance(note, str) and note.strip():
+                self.cultural_notes = (self.cultural_notes + [note.strip()])[-5:]
+
+        if isinstance(delta.get("summary"), str) and delta["summary"].strip():
+            self.summary = delta["summary"].strip()
+        self.message_count += len(lines)
+        self.tail = (self.tail + lines)[-ANALYSIS_CONTEXT_TAIL:] if ANALYSIS_CONTEXT_TAIL else []
+
+    def snapshot(self, analyze_for: Optional[List[str]] = None) -> dict:
+        """
+        Return the aggregated analysis.
+
+        Args:
+            analyze_for: Aspects to include, or None for all
+
+        Returns:
+            Dictionary of aspect aggregates, per-speaker means and the running summary
+        """
+        wanted = set(analyze_for) if analyze_for else None
+        analysis = {}
+        for aspect, running in self.aspects.items():
+            if wanted is None or aspect in wanted:
+                analysis[aspect] = {
+                    "score": round(running.mean, 3),
+                    "label": _label(aspect, running.mean),
+                    "messages": running.count,
+                }
+        if wanted is None or "cultural" in wanted:
+            analysis["cultural"] = list(self.cultural_notes)
+        analysis["speakers"] = {
+            speaker: {
+                aspect: round(running.mean, 3)
+                for aspect, running in aspects.items()
+                if wanted is None or aspect in wanted
+            }
+            for speaker, aspects in self.speakers.items()
+        }
+        analysis["summary"] = self.summary
+        return analysis
+
+    def context(self) -> str:
+        """Compact description of the state sent with the next delta."""
+        means = ", ".join(f"{aspect}={running.mean:.2f}" for aspect, running in self.aspects.items())
+        parts = [
+            f"Messages analyzed so far: {self.message_count}",
+            f"Running averages: {means or 'none yet'}",
+            f"Summary so far: {self.summary or 'none yet'}",
+        ]
+        if self.tail:
+            parts.append("Most recent earlier messages:\n" + "\n".join(self.tail))
+        return "\n".join(parts)
+
+
+class ConversationStateStore:
+    """
+    Expiring conversation id -> ConversationState map in SQLite.
+
+    Every worker process reads and writes the same file, so consecutive
+    requests for one conversation see the same aggregates whichever worker
+    they land on. Within a worker, lock() serializes updates per
+    conversation. Across workers, save() only succeeds if the stored revision
+    is still the one the state was read at; update() then rereads the state
+    and applies the same change again. Deltas only add to running means, so
+    reapplying one on top of another worker's update loses nothing. Expired
+    conversations, and the least recently used beyond max_entries, are purged
+    every PURGE_EVERY writes.
+    """
+
+    def __init__(self, max_entries: int = ANALYSIS_STATE_SIZE, ttl: float = ANALYSIS_STATE_TTL,
+                 db_path: str = ANALYSIS_STATE_DB, pool_size: int = ANALYSIS_STATE_DB_POOL_SIZE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._pool: Optional[SQLitePool] = None
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._writes = 0
+        self.deltas_applied = 0
+        self.messages_analyzed = 0
+        self.conflicts = 0
+
+    def _db(self) -> SQLitePool:
+        """Open the database on first use."""
+        if self._pool is None:
+            self._pool = SQLitePool(self.db_path, self.pool_size, "analysis-state-db", (
+                "CREATE TABLE IF NOT EXISTS conversation_states ("
+                "conversation_id TEXT PRIMARY KEY, "
+                "state TEXT NOT NULL, "
+                "version INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL)",
+                "CREATE INDEX IF NOT EXISTS idx_conversation_states_expires ON conversation_states (expires_at)",
+            ))
+        return self._pool
+
+    def lock(self, conversation_id: str) -> asyncio.Lock:
+        """This worker's lock for a conversation, held while its state is updated."""
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = self._locks[conversation_id] = asyncio.Lock()
+        return lock
+
+    async def get(self, conversation_id: str) -> ConversationState:
+        """Read the state for a conversation, or an empty one if it has none or it expired."""
+        row = await self._db().run(
+            lambda conn: conn.execute(
+                "SELECT state, version, expires_at FROM conversation_states WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+        )
+        if row is None:
+            return ConversationState()
+        if row["expires_at"] < time.time():
+            # Start over, but at the stored revision so the next save replaces it
+            return ConversationState(row["version"])
+        return ConversationState.from_json(row["state"], row["version"])
+
+    async def save(self, conversation_id: str, state: ConversationState) -> bool:
+        """
+        Store a state unless another worker saved the conversation since it was read.
+
+        Args:
+            conversation_id: Conversation the state belongs to
+            state: State read by get() and changed since
+
+        Returns:
+            True if the state was stored, with its version advanced
+        """
+        def write(conn):
+            cursor = conn.execute(
+                "INSERT INTO conversation_states (conversation_id, state, version, expires_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (conversation_id) DO UPDATE SET state = excluded.state, "
+                "version = conversation_states.version + 1, expires_at = excluded.expires_at "
+                "WHERE conversation_states.version = ?",
+                (conversation_id, state.to_json(), time.time() + self.ttl, state.version),
+            )
+            return cursor.rowcount == 1
+
+        saved = await self._db().run(write)
+        if saved:
+            state.version += 1
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                await self._db().run(self._purge)
+        return saved
+
+    async def update(self, conversation_id: str, state: ConversationState,
+                     change: Callable[[ConversationState], None]) -> ConversationState:
+        """
+        Apply a change to a state and store it, reapplying it on a fresh read after a conflict.
+
+        Args:
+            conversation_id: Conversation the state belongs to
+            state: State as read by get()
+            change: Function that updates a state in place
+
+        Returns:
+            The stored state
+        """
+        change(state)
+        while not await self.save(conversation_id, state):
+            self.conflicts += 1
+            state = await self.get(conversation_id)
+            change(state)
+        return state
+
+    def _purge(self, conn):
+        """Delete expired conversations and the least recently used beyond max_entries."""
+        conn.execute("DELETE FROM conversation_states WHERE expires_at < ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM conversation_states WHERE conversation_id IN ("
+            "SELECT conversation_id FROM conversation_states ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    async def reset(self, conversation_id: str):
+        """Forget a conversation."""
+        await self._db().run(
+            lambda conn: conn.execute("DELETE FROM conversation_states WHERE conversation_id = ?", (conversation_id,))
+        )
+
+    def close(self):
+        """Close the database."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def stats(self) -> dict:
+        """
+        Report store counters for the health endpoint.
+
+        Returns:
+            Dictionary with this worker's applied deltas and write conflicts
+        """
+        return {
+            "deltasApplied": self.deltas_applied,
+            "messagesAnalyzed": self.messages_analyzed,
+            "conflicts": self.conflicts,
+        }
+
+
+# Shared state store used by incremental conversation analysis
+conversation_states = ConversationStateStore()
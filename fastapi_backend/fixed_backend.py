@@ -2,22 +2,57 @@
 Fixed FastAPI backend for PolyLingo AI enhancement features.
 """
 import os
+import math
 import time
-import httpx
 import json
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+import httpx
+from loguru import logger
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, File, Form, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from dotenv import load_dotenv
+
+# Load environment variables before importing modules that read configuration
+load_dotenv()
+
 from updated_prompts import *
 
 # Import authentication modules
 from auth_routes import router as auth_router
-from auth import get_current_active_user, User
+import auth
+from auth import get_current_active_user, get_optional_principal, Principal, User, shutdown_password_executor
+from groq_client import groq_client
+from model_router import model_router
+from prompt_registry import prompt_registry
+from ocr import ocr_pool, read_upload, OcrError, OcrBusyError, OcrLanguageError, OcrWorkerError, UploadTooLargeError, OCR_LANGUAGES
+from structured_output import (
+    extract_json, json_mode_supported, mark_json_mode_unsupported, output_stats, JSON_REPAIR,
+    LEARNING_SCHEMA, EXERCISE_SCHEMA, INCREMENTAL_ANALYSIS_SCHEMA, ANALYZER_SCHEMA, analysis_schema
+)
+from response_cache import response_cache, make_cache_key
+from singleflight import single_flight
+from streaming import JsonSectionParser, sse_event
+from translation_memory import translation_memory
+from conversation_context import conversation_context, format_message, estimate_tokens, CONTEXT_HISTORY_TOKENS, CHAT_CONTEXT_TOKENS
+from conversation_state import conversation_states
+from rate_limiter import upstream_limiter, backoff_delay, UpstreamBusyError, GROQ_EXPECTED_COMPLETION_TOKENS, GROQ_MAX_RETRIES
+from scheduler import llm_scheduler, current_user_key, PriorityMiddleware, INTERACTIVE, BULK, BACKGROUND
+from log_config import configure_logging, log_payload, RequestIdMiddleware
+from job_queue import job_queue, validate_webhook_url, JobRejectedError
+from learning_sessions import session_writer, SESSION_RECENT_MAX
+from sentence_scorer import sentence_scorer, ANALYZE_MAX_CHARS
+from language_id import language_detector
+from metrics import (
+    metrics_registry, MetricsMiddleware, TimedRoute, timed, record_usage, loop_lag_monitor, CONTENT_TYPE,
+    STAGE_PROMPT_BUILD, STAGE_CACHE_LOOKUP, STAGE_SCHEDULER_WAIT, STAGE_LIMITER_WAIT
+)
 
-# Load environment variables
-load_dotenv()
+# Queued loguru sinks for everything below, including uvicorn's loggers
+configure_logging()
 
 # Create FastAPI app
 app = FastAPI(
@@ -26,6 +61,9 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Time request parsing and validation on every route declared below
+app.router.route_class = TimedRoute
+
 # Include authentication router
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
 
@@ -38,6 +76,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Priority class of each route's upstream work; unlisted routes run as bulk
+ROUTE_PRIORITIES = {
+    "/learning-suggestions": INTERACTIVE,
+    "/learning-suggestions/stream": INTERACTIVE,
+    "/analyze-conversation/stream": INTERACTIVE,
+    "/analyze-conversation/incremental": INTERACTIVE,
+    "/translate": INTERACTIVE,
+    "/chat-translate": INTERACTIVE,
+    "/ocr-translate": INTERACTIVE,
+    "/analyze-sentence": INTERACTIVE,
+    "/generate-exercises": BULK,
+    "/analyze-conversation": BULK,
+    "/learning-suggestions/batch": BACKGROUND,
+    "/generate-exercises/batch": BACKGROUND,
+}
+
+async def _principal_id(token: str) -> Optional[str]:
+    """User id of a bearer token for the scheduler's fairness key, or None if it is not valid."""
+    principal = await get_optional_principal(token)
+    return principal.id if principal is not None else None
+
+# Tag each request with its priority class and fairness key for the scheduler
+app.add_middleware(PriorityMiddleware, routes=ROUTE_PRIORITIES, default=BULK, resolve_user=_principal_id)
+
+# Count and time every HTTP request by route and status
+app.add_middleware(MetricsMiddleware)
+
+def _retry_after(error: UpstreamBusyError) -> int:
+    """Whole seconds a client should wait before retrying, at least 1."""
+    return max(1, math.ceil(error.retry_after))
+
+# Answer 503 with Retry-After when the upstream limiter fails fast
+@app.exception_handler(UpstreamBusyError)
+async def upstream_busy_handler(request: Request, exc: UpstreamBusyError):
+    retry_after = _retry_after(exc)
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": str(exc), "errorType": "UPSTREAM_BUSY", "retryAfter": retry_after},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+# Outermost, so every log line of a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
+# Manage the shared upstream HTTP client for the lifetime of the app
+@app.on_event("startup")
+async def startup_event():
+    await groq_client.start()
+    loop_lag_monitor.start()
+    job_queue.start()
+    session_writer.start()
+    # Parse the wordlists and language profiles off the event loop
+    await asyncio.to_thread(sentence_scorer.preload)
+    await asyncio.to_thread(language_detector.load)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop job workers first so running jobs are requeued while their dependencies are still up
+    await job_queue.stop()
+    # Write out buffered learning sessions before their store closes
+    await session_writer.stop()
+    await loop_lag_monitor.stop()
+    await groq_client.close()
+    response_cache.close()
+    translation_memory.close()
+    conversation_context.close()
+    conversation_states.close()
+    shutdown_password_executor()
+    auth.user_repository.close()
+    # Waits for running tesseract processes, so keep it off the event loop
+    await asyncio.to_thread(ocr_pool.close)
+    job_queue.close()
+    session_writer.close()
+    # Flush queued log records before the process exits
+    await logger.complete()
+
 # Request models
 class TextTranslationRequest(BaseModel):
     text: str
@@ -48,11 +162,12 @@ class TextTranslationRequest(BaseModel):
 class ChatMessage(BaseModel):
     text: str
     speaker: str
-    language: Optional[str] = "en"
+    language: Optional[str] = "auto"  # detected locally when "auto"
 
 class ChatTranslationRequest(BaseModel):
     message: str
     conversationHistory: Optional[List[ChatMessage]] = []
+    conversationId: Optional[str] = None  # enables the cached rolling summary of older turns
     sourceLanguage: Optional[str] = "auto"
     targetLanguage: str
     aiEnhance: Optional[bool] = True
@@ -67,6 +182,13 @@ class LearningRequest(BaseModel):
 class SentimentAnalysisRequest(BaseModel):
     messages: List[ChatMessage]
     analyzeFor: Optional[List[str]] = ["sentiment"]  # sentiment, formality, engagement, cultural
+    conversationId: Optional[str] = None  # enables the cached rolling summary of older turns
+
+class IncrementalAnalysisRequest(BaseModel):
+    conversationId: str
+    newMessages: List[ChatMessage]  # only messages not sent before for this conversation
+    analyzeFor: Optional[List[str]] = ["sentiment", "formality", "engagement"]  # sentiment, formality, engagement, cultural
+    reset: Optional[bool] = False  # start the conversation state over
 
 class ExerciseRequest(BaseModel):
     text: str
@@ -74,56 +196,283 @@ class ExerciseRequest(BaseModel):
     proficiencyLevel: Optional[str] = "intermediate"  # beginner, intermediate, advanced
     exerciseType: Optional[str] = "mixed"  # vocabulary, grammar, comprehension, mixed
 
+class SentenceAnalysisRequest(BaseModel):
+    text: str
+    language: Optional[str] = "en"  # "auto" detects it locally
+    thorough: Optional[bool] = False  # always ask the LLM, e.g. when the user submits
+
+class LearningBatchRequest(BaseModel):
+    items: List[LearningRequest]
+    packShortTexts: Optional[bool] = False  # pack short sentences into shared prompts
+
+class ExerciseBatchRequest(BaseModel):
+    items: List[ExerciseRequest]
+    packShortTexts: Optional[bool] = False  # pack short sentences into shared prompts
+
+class ExerciseJobRequest(ExerciseRequest):
+    webhookUrl: Optional[str] = None  # POSTed the finished job; must be on a JOB_WEBHOOK_HOSTS host
+
+class AnalysisJobRequest(SentimentAnalysisRequest):
+    webhookUrl: Optional[str] = None  # POSTed the finished job; must be on a JOB_WEBHOOK_HOSTS host
+
+# Batch configuration
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+PACK_MAX_CHARS = int(os.getenv("PACK_MAX_CHARS", 200))  # only texts this short are packed
+PACK_MAX_ITEMS = int(os.getenv("PACK_MAX_ITEMS", 5))  # sentences per packed prompt
+
+def _is_json(content: str) -> bool:
+    """Check whether upstream content is valid JSON before caching it."""
+    try:
+        json.loads(content)
+        return True
+    except ValueError:
+        return False
+
 # Helper function to safely call Groq API
-async def call_groq_api(prompt, system_message, timeout=15):
+async def call_groq_api(prompt, system_message, timeout=15, use_cache=True, json_response=True, task="learning"):
     """
     Helper function to safely call Groq API with error handling.
 
+    Identical prompts that are already in flight share one upstream call.
+    Only answers from the primary model are cached, since the cache key names
+    that model; one served by a hedge or fallback model is returned uncached.
+
     Args:
         prompt: The prompt to send to the API
         system_message: The system message to use
         timeout: Timeout in seconds
+        use_cache: Whether to serve and store the response in the response cache
+        json_response: Request upstream JSON mode and only cache responses that parse as JSON
+        task: Task name used to pick the model (see model_router.py)
 
     Returns:
-        API response or error message
+        API response or error message, with the cache key the content is stored
+        under, or None as cacheKey when it came from another model
+
+    Raises:
+        UpstreamBusyError: If the upstream limiter has no capacity before the queue timeout
     """
     try:
-        headers = {
-            "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "llama3-8b-8192",
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ]
+        # Pick the model chain for this task and prompt size
+        prompt_tokens = estimate_tokens(system_message) + estimate_tokens(prompt)
+        targets = model_router.route(task, prompt_tokens)
+
+        # Serve repeated prompts from the response cache
+        cache_key = make_cache_key(targets[0].model, system_message, prompt)
+        if use_cache:
+            start = time.perf_counter()
+            cached_content = await response_cache.get(cache_key)
+            STAGE_CACHE_LOOKUP.observe(time.perf_counter() - start)
+            if cached_content is not None:
+                return {"success": True, "content": cached_content, "cached": True, "cacheKey": cache_key}
+
+        # Coalesce concurrent identical calls into one upstream request; the key covers everything that shapes the call
+        result, joined = await single_flight.do(
+            (cache_key, tuple(targets), timeout, use_cache, json_response),
+            lambda: _request_groq(prompt, system_message, timeout, cache_key if use_cache else None, json_response, targets, prompt_tokens)
+        )
+        stored = result.get("model") == targets[0].model
+        return {**result, "coalesced": joined, "cacheKey": cache_key if stored else None}
+    except UpstreamBusyError:
+        # No upstream capacity: the whole request should be retried later, see upstream_busy_handler
+        raise
+    except Exception as e:
+        logger.error("API call error: {}", e)
+        return {"success": False, "error": str(e)}
+
+async def _send_to(target, payload, timeout, estimated_tokens, json_response):
+    """
+    POST a payload to one model target through the upstream limiter.
+
+    Args:
+        target: ModelTarget to call
+        payload: Chat completion body without the model
+        timeout: Read timeout in seconds
+        estimated_tokens: Rate budget to reserve
+        json_response: Request upstream JSON mode if the model supports it
+
+    Returns:
+        The raw httpx response
+    """
+    body = {**payload, "model": target.model}
+    if json_response and json_mode_supported(target.model):
+        body["response_format"] = {"type": "json_object"}
+
+    queued = time.perf_counter()
+    async with upstream_limiter.acquire(estimated_tokens):
+        STAGE_LIMITER_WAIT.observe(time.perf_counter() - queued)
+        start = time.monotonic()
+        try:
+            # Reuse pooled connections from the shared client
+            response = await groq_client.post_chat_completion(body, timeout=timeout, url=target.url, api_key=target.api_key())
+            if response.status_code == 400 and "response_format" in body and "response_format" in response.text:
+                # The model does not do JSON mode: remember that and resend without it
+                logger.warning("{} rejected JSON mode, retrying without it", target.model)
+                mark_json_mode_unsupported(target.model)
+                del body["response_format"]
+                response = await groq_client.post_chat_completion(body, timeout=timeout, url=target.url, api_key=target.api_key())
+        except httpx.TransportError:
+            model_router.record(target, time.monotonic() - start, False)
+            raise
+    model_router.record(target, time.monotonic() - start, response.status_code < 400)
+    return response
+
+async def _request_groq(prompt, system_message, timeout, cache_key, json_response, targets, prompt_tokens):
+    """
+    Send one chat completion upstream and cache the primary model's successful content.
+
+    Args:
+        prompt: The prompt to send to the API
+        system_message: The system message to use
+        timeout: Timeout in seconds
+        cache_key: Key to store the response under, or None to skip caching
+        json_response: Request upstream JSON mode and only cache responses that parse as JSON
+        targets: Model chain from model_router.route, primary first
+        prompt_tokens: Estimated tokens in the system message and prompt
+
+    Returns:
+        API response or error message, with the model that answered
+    """
+    payload = {
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+    }
+
+    # Log a sample of prompts for debugging
+    log_payload("Groq prompt", prompt)
+
+    # Reserve rate budget for the prompt plus the expected completion
+    estimated_tokens = prompt_tokens + GROQ_EXPECTED_COMPLETION_TOKENS
+
+    position = 0
+    for attempt in range(GROQ_MAX_RETRIES + 1):
+        can_fall_back = position + 1 < len(targets) and attempt < GROQ_MAX_RETRIES
+        try:
+            # Wait for a slot in this request's priority class, hedging slow calls onto the next model
+            queued = time.perf_counter()
+            async with llm_scheduler.slot():
+                STAGE_SCHEDULER_WAIT.observe(time.perf_counter() - queued)
+                answered, response = await model_router.hedged(
+                    targets[position:], lambda target: _send_to(target, payload, timeout, estimated_tokens, json_response)
+                )
+        except httpx.TransportError as e:
+            # Fall back to the next model on timeouts and connection errors
+            if not can_fall_back:
+                raise
+            logger.warning("{} failed ({}), falling back to {}", targets[position].model, type(e).__name__, targets[position + 1].model)
+            position += 1
+            model_router.fallbacks += 1
+            continue
+
+        if (response.status_code == 429 or response.status_code >= 500) and can_fall_back:
+            # Another model has its own capacity, so move on instead of waiting
+            logger.warning("{} returned {}, falling back to {}", targets[position].model, response.status_code, targets[position + 1].model)
+            position += 1
+            model_router.fallbacks += 1
+            continue
+
+        # Back off and retry on rate limiting and transient upstream errors
+        if response.status_code == 429 or response.status_code >= 500:
+            delay = backoff_delay(attempt, response.headers.get("retry-after"))
+            if response.status_code == 429:
+                # Hold back every caller, not just this one, until the upstream recovers
+                upstream_limiter.pause(delay)
+            if attempt < GROQ_MAX_RETRIES:
+                upstream_limiter.retries += 1
+                logger.warning("Groq API returned {}, retrying in {:.2f}s", response.status_code, delay)
+                if response.status_code != 429:
+                    await asyncio.sleep(delay)
+                continue
+        break
+
+    if response.status_code >= 400:
+        return {
+            "success": False,
+            "error": f"Upstream returned {response.status_code}",
+            "status": response.status_code,
+            "raw": response.text[:500]
         }
 
-        # Log the API request for debugging
-        print(f"Calling Groq API with prompt: {prompt[:100]}...")
+    data = response.json()
+    usage = data.get("usage") or {}
+    upstream_limiter.record_usage(estimated_tokens, usage.get("total_tokens"))
+    record_usage(data.get("model") or answered.model, usage)
+
+    # Log a sample of raw responses for debugging
+    log_payload("Groq response", data)
+
+    # Add defensive code to check response structure
+    if "choices" in data and data["choices"] and "message" in data["choices"][0] and "content" in data["choices"][0]["message"]:
+        content = data["choices"][0]["message"]["content"].strip()
+        if cache_key is not None and answered == targets[0] and (not json_response or _is_json(content)):
+            await response_cache.set(cache_key, content)
+        return {"success": True, "content": content, "cached": False, "model": answered.model}
+    else:
+        logger.warning("Unexpected API response structure")
+        return {"success": False, "error": "Invalid API response structure", "raw": str(data)}
+
+async def call_groq_json(prompt, system_message, schema, task="learning", label="response") -> tuple:
+    """
+    Call the Groq API for a JSON object and enforce its schema.
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            data = response.json()
-
-            # Log raw response for debugging
-            print(f"Groq API Raw Response: {data}")
-
-            # Add defensive code to check response structure
-            if "choices" in data and data["choices"] and "message" in data["choices"][0] and "content" in data["choices"][0]["message"]:
-                content = data["choices"][0]["message"]["content"].strip()
-                return {"success": True, "content": content}
-            else:
-                print("⚠️ Unexpected API response structure")
-                return {"success": False, "error": "Invalid API response structure", "raw": str(data)}
-    except Exception as e:
-        print(f"API Call Error: {e}")
-        return {"success": False, "error": str(e)}
+    The output is parsed tolerantly. If keys are missing or mistyped, one
+    follow-up call asks for just those keys and the answer is merged in, so a
+    malformed response never costs a full regeneration.
+
+    Args:
+        prompt: The prompt to send to the API
+        system_message: The system message to use
+        schema: JsonSchema the response must satisfy
+        task: Task name used to pick the model
+        label: Name used in log messages
+
+    Returns:
+        Tuple of (parsed object or error dictionary, whether the response was cached)
+    """
+    result = await call_groq_api(prompt, system_message, task=task)
+    if not result["success"]:
+        return {"error": result["error"], "raw": result.get("raw", "")}, False
+
+    content = result["content"]
+    parsed = schema.normalize(extract_json(content))
+    if not isinstance(parsed, dict):
+        logger.warning("JSON parsing failed in {}", label)
+        return {"raw": content, "error": "Failed to parse JSON response"}, False
+
+    # Recovered or repaired objects are re-cached in clean form so later hits parse directly
+    changed = not _is_json(content)
+    problems = schema.problems(parsed)
+    if problems and JSON_REPAIR:
+        # Ask only for the missing keys instead of regenerating everything
+        output_stats.reasked += 1
+        keys = ", ".join(problems)
+        _, repair_prompt = prompt_registry.render(
+            "JSON_REPAIR_PROMPT", system_message, prompt=prompt, response=content, keys=keys
+        )
+        try:
+            repair = await call_groq_api(repair_prompt, system_message, use_cache=False, task=task)
+        except UpstreamBusyError:
+            # The first answer is still usable, so report it incomplete instead of failing
+            repair = {"success": False}
+        patch = schema.normalize(extract_json(repair["content"])) if repair["success"] else None
+        if isinstance(patch, dict):
+            parsed.update({key: patch[key] for key in problems if key in patch})
+            changed = True
+            problems = schema.problems(parsed)
+            if not problems:
+                output_stats.repaired += 1
+
+    if problems:
+        output_stats.incomplete += 1
+        logger.warning("{} is missing keys: {}", label, ", ".join(problems))
+        return {**parsed, "missingKeys": problems}, result.get("cached", False)
+
+    if changed and result["cacheKey"] is not None:
+        await response_cache.set(result["cacheKey"], json.dumps(parsed))
+    return parsed, result.get("cached", False)
 
 # Health check endpoint
 @app.get("/health")
@@ -131,10 +480,263 @@ async def health_check():
     """
     Health check endpoint.
     """
-    return {"status": "healthy", "api_key_configured": bool(os.getenv('GROQ_API_KEY'))}
+    return {
+        "status": "healthy",
+        "api_key_configured": bool(os.getenv('GROQ_API_KEY')),
+        "upstream_pool": groq_client.pool_stats(),
+        "upstream_limiter": upstream_limiter.stats(),
+        "model_router": model_router.stats(),
+        "structured_output": output_stats.as_dict(),
+        "ocr_pool": ocr_pool.stats(),
+        "sentence_scorer": sentence_scorer.stats(),
+        "language_detector": language_detector.stats(),
+        "job_queue": await job_queue.stats(),
+        "learning_sessions": session_writer.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "response_cache": response_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "translation_memory": translation_memory.stats(),
+        "conversation_context": conversation_context.stats(),
+        "conversation_states": conversation_states.stats()
+    }
+
+# Gauges read from the shared components at scrape time
+metrics_registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", (),
+    lambda: [((), MetricsMiddleware.in_flight)]
+)
+metrics_registry.gauge(
+    "upstream_requests_in_flight", "Upstream chat completion calls currently open.", (),
+    lambda: [((), groq_client.requests_in_flight)]
+)
+def _connection_gauge():
+    stats = groq_client.pool_stats()
+    return [(("active",), stats["activeConnections"]), (("idle",), stats["idleConnections"])]
+
+metrics_registry.gauge("upstream_connections", "Pooled upstream connections by state.", ("state",), _connection_gauge)
+metrics_registry.gauge(
+    "upstream_limiter_requests", "Upstream limiter slots in use and callers waiting.", ("state",),
+    lambda: [(("in_flight",), upstream_limiter.in_flight), (("queued",), upstream_limiter.queued)]
+)
+metrics_registry.gauge(
+    "scheduler_queued", "LLM calls waiting for a scheduler slot, by priority class.", ("priority",),
+    lambda: [((name,), values["queued"]) for name, values in llm_scheduler.stats()["classes"].items()]
+)
+metrics_registry.gauge(
+    "scheduler_active", "LLM calls holding a scheduler slot.", (),
+    lambda: [((), llm_scheduler.active)]
+)
+metrics_registry.gauge(
+    "ocr_pending", "Images queued or running in the OCR pool.", (),
+    lambda: [((), ocr_pool.pending)]
+)
+
+# Prometheus metrics endpoint
+@app.get("/metrics")
+async def metrics():
+    """
+    Expose counters, stage latency histograms and gauges in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE)
+
+# Templates used by each endpoint, for the prompt token report
+PROMPT_ENDPOINTS = {
+    "/learning-suggestions": ["GRAMMAR_PROMPT", "VOCABULARY_PROMPT", "IDIOMS_PROMPT", "GENERAL_PROMPT"],
+    "/generate-exercises": ["EXERCISE_GENERATOR_PROMPT"],
+    "/analyze-conversation": ["CONVERSATION_SUMMARY_PROMPT"],
+    "/analyze-conversation/incremental": ["INCREMENTAL_ANALYSIS_PROMPT"],
+    "/translate": ["TRANSLATION_PROMPT"],
+    "/chat-translate": ["CHAT_TRANSLATION_PROMPT", "CONVERSATION_SUMMARY_PROMPT"],
+    "/ocr-translate": ["GRAMMAR_PROMPT", "VOCABULARY_PROMPT", "IDIOMS_PROMPT", "GENERAL_PROMPT"],
+    "/analyze-sentence": ["ANALYZER_PROMPT"],
+}
+
+# Prompt token report endpoint
+@app.get("/prompts/report")
+async def prompts_report():
+    """
+    Report template token counts and compact-variant savings per endpoint.
+    """
+    return prompt_registry.report(PROMPT_ENDPOINTS)
+
+# System messages for each AI feature
+LEARNING_SYSTEM_MESSAGE = "You are an AI language tutor. Provide helpful, accurate language learning insights formatted as JSON."
+EXERCISE_SYSTEM_MESSAGE = "You are an AI language exercise creator. Generate engaging, appropriate exercises formatted as JSON."
+ANALYSIS_SYSTEM_MESSAGE = "You are an AI conversation analyst. Provide detailed, accurate analysis of conversations formatted as JSON."
+TRANSLATION_SYSTEM_MESSAGE = "You are a professional multilingual translator for a travel and communication app. Translate text precisely and naturally."
+ANALYZER_SYSTEM_MESSAGE = "You are an AI writing coach. Score sentences fairly and give short, specific feedback formatted as JSON."
+
+def build_learning_prompt(text: str, user_lang: str, target_lang: str, proficiency: str, focus: str, split: bool = True) -> tuple:
+    """
+    Format the learning prompt template for a focus area.
+
+    Args:
+        text: Text to analyze
+        user_lang: User's native language
+        target_lang: Language being learned
+        proficiency: User's proficiency level
+        focus: Area to focus on
+        split: Move the template's static instructions to the system message
+
+    Returns:
+        Tuple of (system message, prompt)
+    """
+    # Select the appropriate prompt template based on focus area
+    if focus == "grammar":
+        template = "GRAMMAR_PROMPT"
+    elif focus == "vocabulary":
+        template = "VOCABULARY_PROMPT"
+    elif focus == "idioms":
+        template = "IDIOMS_PROMPT"
+    else:  # general
+        template = "GENERAL_PROMPT"
+    return prompt_registry.render(
+        template, LEARNING_SYSTEM_MESSAGE, split,
+        text=text, proficiency=proficiency, user_lang=user_lang, target_lang=target_lang
+    )
+
+def _learning_task(focus: str) -> str:
+    """Grammar breakdowns go to the larger model; other focus areas use the fast one."""
+    return "grammar" if focus == "grammar" else "learning"
+
+def build_exercise_prompt(text: str, target_lang: str, proficiency: str, exercise_type: str, split: bool = True) -> tuple:
+    """
+    Format the exercise generator prompt.
+
+    Args:
+        text: Text to base exercises on
+        target_lang: Target language
+        proficiency: User's proficiency level
+        exercise_type: Type of exercises to generate
+        split: Move the template's static instructions to the system message
+
+    Returns:
+        Tuple of (system message, prompt)
+    """
+    return prompt_registry.render(
+        "EXERCISE_GENERATOR_PROMPT", EXERCISE_SYSTEM_MESSAGE, split,
+        user_input=text,
+        proficiency_level=proficiency,
+        focus_area=f"{target_lang} {exercise_type}"
+    )
+
+@timed(STAGE_PROMPT_BUILD)
+def build_analysis_prompt(conversation_text: str, analyze_for: List[str]) -> str:
+    """
+    Format the conversation analysis prompt.
+
+    Args:
+        conversation_text: Conversation context from build_conversation_context
+        analyze_for: List of aspects to analyze
+
+    Returns:
+        The formatted prompt
+    """
+    analysis_aspects = ", ".join(analyze_for)
+    return (
+        f"Analyze this conversation for {analysis_aspects}: {conversation_text}\n\n"
+        f"Return a JSON object with one key per aspect: {analysis_aspects}."
+    )
+
+# Rolling summary length for long conversations
+SUMMARY_MAX_WORDS = int(os.getenv("SUMMARY_MAX_WORDS", 150))
+
+async def summarize_conversation(previous_summary: str, lines: List[str]) -> Optional[str]:
+    """
+    Fold older conversation lines into a running summary.
+
+    Args:
+        previous_summary: Summary of the messages before these lines, may be empty
+        lines: Formatted messages to add to the summary
+
+    Returns:
+        The updated summary, or None if the API call failed
+    """
+    system_message, prompt = prompt_registry.render(
+        "CONVERSATION_SUMMARY_PROMPT", "You summarize conversations concisely and faithfully.",
+        summary=previous_summary or "(none)",
+        messages="\n".join(lines),
+        max_words=SUMMARY_MAX_WORDS
+    )
+    try:
+        result = await call_groq_api(prompt, system_message, json_response=False, task="summary")
+    except UpstreamBusyError as e:
+        result = {"success": False, "error": str(e)}
+    if not result["success"]:
+        logger.warning("Conversation summary failed: {}", result["error"])
+        return None
+    return result["content"]
+
+def label_languages(messages: List[ChatMessage]) -> List[ChatMessage]:
+    """
+    Fill in the language of messages sent without one, detected locally in one batch.
+
+    Messages the detector is not confident about keep "auto". The request's
+    own message objects are left as they are.
+
+    Args:
+        messages: Chat messages
+
+    Returns:
+        The messages, with copies carrying the detected language in place of unlabelled ones
+    """
+    unlabelled = [index for index, msg in enumerate(messages) if not msg.language or msg.language == "auto"]
+    if not unlabelled:
+        return list(messages)
+    labelled = list(messages)
+    detections = language_detector.detect_batch([messages[index].text for index in unlabelled])
+    for index, detection in zip(unlabelled, detections):
+        labelled[index] = messages[index].model_copy(update={"language": detection.language})
+    return labelled
+
+def conversation_key(conversation_id: Optional[str]) -> Optional[str]:
+    """
+    Scope a client-chosen conversation id to the caller.
+
+    The key is the authenticated user, or the client address for anonymous
+    requests, so nobody can read or overwrite another caller's conversation
+    by sending its id.
+
+    Args:
+        conversation_id: Conversation id from the request, if any
+
+    Returns:
+        Storage key for the conversation, or None without an id
+    """
+    if not conversation_id:
+        return None
+    return f"{current_user_key.get()}/{conversation_id}"
+
+async def build_conversation_context(messages: List[ChatMessage], max_tokens: int, conversation_id: Optional[str] = None) -> str:
+    """
+    Format a conversation within a token budget.
+
+    Recent messages are kept verbatim; older ones are replaced by the cached
+    rolling summary when a conversation id is given, or dropped otherwise.
+
+    Args:
+        messages: List of chat messages, oldest first
+        max_tokens: Token budget for verbatim messages
+        conversation_id: Stable id of the conversation
+
+    Returns:
+        Conversation text for a prompt
+    """
+    # Label languages first so prompts and summary digests see the same lines
+    messages = label_languages(messages)
+    summary, recent, omitted = await conversation_context.build(
+        messages, max_tokens, summarize_conversation, conversation_key(conversation_id)
+    )
+    parts = []
+    if summary:
+        parts.append(f"Summary of earlier messages: {summary}")
+    if omitted:
+        parts.append(f"({omitted} earlier messages omitted)")
+    parts.extend(format_message(msg) for msg in recent)
+    return "\n".join(parts)
 
 # Language learning suggestions function
-async def generate_learning_suggestions(text: str, user_lang: str, target_lang: str, proficiency: str, focus: str) -> dict:
+async def generate_learning_suggestions(text: str, user_lang: str, target_lang: str, proficiency: str, focus: str) -> tuple:
     """
     Generate personalized language learning suggestions based on the text.
 
@@ -146,48 +748,33 @@ async def generate_learning_suggestions(text: str, user_lang: str, target_lang:
         focus: Area to focus on
 
     Returns:
-        Dictionary with learning suggestions
+        Tuple of (learning suggestions, whether the response was cached)
     """
     try:
         # Select the appropriate prompt template based on focus area
-        if focus == "grammar":
-            prompt = GRAMMAR_PROMPT.format(text=text, proficiency=proficiency, user_lang=user_lang, target_lang=target_lang)
-        elif focus == "vocabulary":
-            prompt = VOCABULARY_PROMPT.format(text=text, proficiency=proficiency, user_lang=user_lang, target_lang=target_lang)
-        elif focus == "idioms":
-            prompt = IDIOMS_PROMPT.format(text=text, proficiency=proficiency, user_lang=user_lang, target_lang=target_lang)
-        else:  # general
-            prompt = GENERAL_PROMPT.format(text=text, proficiency=proficiency, user_lang=user_lang, target_lang=target_lang)
-
-        system_message = "You are an AI language tutor. Provide helpful, accurate language learning insights formatted as JSON."
+        system_message, prompt = build_learning_prompt(text, user_lang, target_lang, proficiency, focus)
 
-        # Call the Groq API
-        result = await call_groq_api(prompt, system_message)
-
-        if result["success"]:
-            # Try to parse as JSON, but return as text if parsing fails
-            try:
-                parsed_suggestions = json.loads(result["content"])
-                return parsed_suggestions
-            except json.JSONDecodeError as json_err:
-                print(f"⚠️ JSON parsing failed in learning suggestions: {json_err}")
-                # If JSON parsing fails, return as raw text
-                return {"raw": result["content"], "error": "Failed to parse JSON response"}
-        else:
-            return {"error": result["error"], "raw": result.get("raw", "")}
+        # Call the Groq API and enforce the learning schema
+        return await call_groq_json(prompt, system_message, LEARNING_SCHEMA, task=_learning_task(focus), label="learning suggestions")
 
+    except UpstreamBusyError:
+        raise
     except Exception as e:
-        print(f"Learning Suggestions Error: {e}")
-        return {"error": str(e)}
+        logger.error("Learning suggestions error: {}", e)
+        return {"error": str(e)}, False
 
 # Language learning endpoint
 @app.post("/learning-suggestions")
-async def learning_suggestions(req: LearningRequest):
+async def learning_suggestions(req: LearningRequest, principal: Optional[Principal] = Depends(get_optional_principal)):
     """
     Generate personalized language learning suggestions.
 
+    Sessions of authenticated users are recorded through the write-behind
+    buffer, so the response never waits on the database.
+
     Args:
         req: Request containing text and learning parameters
+        principal: Authenticated user, if a valid bearer token was sent
 
     Returns:
         Learning suggestions
@@ -198,7 +785,7 @@ async def learning_suggestions(req: LearningRequest):
     start_time = time.time()
 
     # Generate learning suggestions
-    suggestions = await generate_learning_suggestions(
+    suggestions, cached = await generate_learning_suggestions(
         req.text,
         req.userLanguage,
         req.targetLanguage,
@@ -209,6 +796,12 @@ async def learning_suggestions(req: LearningRequest):
     # Calculate processing time
     processing_time = round((time.time() - start_time) * 1000)
 
+    # Record the session for signed-in users; this only appends to a buffer
+    if principal is not None and "error" not in suggestions:
+        session_writer.record(
+            principal.id, req.text, req.userLanguage, req.targetLanguage, req.proficiencyLevel, req.focusArea, suggestions
+        )
+
     # Return suggestions
     return {
         "success": True,
@@ -218,11 +811,177 @@ async def learning_suggestions(req: LearningRequest):
         "targetLanguage": req.targetLanguage,
         "proficiencyLevel": req.proficiencyLevel,
         "focusArea": req.focusArea,
+        "cached": cached,
         "processingTimeMs": processing_time
     }
 
+# Recent learning sessions endpoint
+@app.get("/learning-sessions/recent")
+async def recent_learning_sessions(limit: int = 20, current_user: User = Depends(get_current_active_user)):
+    """
+    List the current user's most recent learning sessions, newest first.
+
+    Args:
+        limit: Maximum number of sessions, at most SESSION_RECENT_MAX
+        current_user: Authenticated user
+
+    Returns:
+        The sessions, including ones not yet written to the database
+    """
+    if limit < 1 or limit > SESSION_RECENT_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {SESSION_RECENT_MAX}.")
+
+    sessions = await session_writer.recent(current_user.id, limit)
+    return {"success": True, "sessions": sessions}
+
+# Sentence analysis endpoint
+@app.post("/analyze-sentence")
+async def analyze_sentence(req: SentenceAnalysisRequest):
+    """
+    Score a sentence with feedback and a tip, locally when possible.
+
+    The local scorer (spell check against the language's wordlist plus
+    structural checks) runs in well under a millisecond and answers whenever
+    it is confident: clean sentences and ones with a clear typo. Sentences
+    with unknown or commonly confused words, long sentences and languages
+    without a wordlist go to the LLM with ANALYZER_PROMPT, as does a request
+    with thorough set. If that call fails, the local answer is returned.
+
+    Args:
+        req: Request containing the sentence and its language
+
+    Returns:
+        Score, feedback and tip, with where they came from
+    """
+    text = req.text.strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Text is required.")
+    if len(text) > ANALYZE_MAX_CHARS:
+        raise HTTPException(status_code=400, detail=f"Text must be at most {ANALYZE_MAX_CHARS} characters.")
+
+    start_time = time.time()
+    language = language_detector.resolve(req.language, text)
+
+    # Local first pass; an undetected language has no wordlist and goes to the LLM
+    local = sentence_scorer.analyze(text, language)
+    result = {"score": local.score, "feedback": local.feedback, "tip": local.tip}
+    reason = "requested" if req.thorough else local.escalation_reason
+    source, cached, failed = "local", False, False
+
+    # Escalate ambiguous input to the LLM
+    if reason:
+        system_message, prompt = prompt_registry.render("ANALYZER_PROMPT", ANALYZER_SYSTEM_MESSAGE, user_input=text)
+        try:
+            analysis, cached = await call_groq_json(prompt, system_message, ANALYZER_SCHEMA, task="scoring", label="sentence analysis")
+        except UpstreamBusyError as e:
+            analysis = {"error": str(e)}
+        # A failed or incomplete answer falls back to the local one
+        if "error" in analysis or "missingKeys" in analysis:
+            failed = True
+        else:
+            result = {
+                "score": max(1, min(100, round(analysis["score"]))),
+                "feedback": analysis["feedback"],
+                "tip": analysis["tip"],
+            }
+            source = "llm"
+    sentence_scorer.record(reason, failed)
+
+    return {
+        "success": True,
+        "text": text,
+        "language": language,
+        **result,
+        "source": source,
+        "confidence": local.confidence,
+        "escalationReason": reason,
+        "issues": [issue._asdict() for issue in local.issues],
+        "cached": cached,
+        "processingTimeMs": round((time.time() - start_time) * 1000)
+    }
+
+# OCR learning endpoint
+@app.post("/ocr-translate")
+async def ocr_translate(
+    file: UploadFile = File(...),
+    userLanguage: str = Form("en"),
+    targetLanguage: str = Form(...),
+    proficiencyLevel: str = Form("intermediate"),
+    focusArea: str = Form("general"),
+    ocrLanguages: str = Form(OCR_LANGUAGES),
+):
+    """
+    Extract text from a photographed page and generate learning suggestions for it.
+
+    Args:
+        file: Image upload (multipart/form-data)
+        userLanguage: User's native language
+        targetLanguage: Language being learned
+        proficiencyLevel: User's proficiency level
+        focusArea: Area to focus on
+        ocrLanguages: Tesseract language codes, e.g. "eng+spa", from those in OCR_LANGUAGES
+
+    Returns:
+        Extracted text and learning suggestions
+    """
+    start_time = time.time()
+
+    # Read the upload in chunks, rejecting oversized images early
+    try:
+        data = await read_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if not data:
+        raise HTTPException(status_code=400, detail="Image is required.")
+
+    # Preprocess and OCR on the process pool
+    try:
+        ocr = await ocr_pool.run(data, ocrLanguages)
+    except OcrLanguageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OcrBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except OcrWorkerError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except OcrError as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "errorType": "OCR_ERROR",
+            "processingTimeMs": round((time.time() - start_time) * 1000)
+        }
+    if not ocr["text"]:
+        return {
+            "success": False,
+            "error": "No readable text found in the image",
+            "errorType": "OCR_ERROR",
+            "processingTimeMs": round((time.time() - start_time) * 1000)
+        }
+
+    # Feed the extracted text into learning suggestions
+    suggestions, cached = await generate_learning_suggestions(
+        ocr["text"],
+        userLanguage,
+        targetLanguage,
+        proficiencyLevel,
+        focusArea
+    )
+
+    return {
+        "success": True,
+        "text": ocr["text"],
+        "suggestions": suggestions,
+        "userLanguage": userLanguage,
+        "targetLanguage": targetLanguage,
+        "proficiencyLevel": proficiencyLevel,
+        "focusArea": focusArea,
+        "cached": cached,
+        "ocr": {key: ocr[key] for key in ("width", "height", "preprocessMs", "ocrMs")},
+        "processingTimeMs": round((time.time() - start_time) * 1000)
+    }
+
 # Exercise generation function
-async def generate_exercises(text: str, target_lang: str, proficiency: str, exercise_type: str) -> dict:
+async def generate_exercises(text: str, target_lang: str, proficiency: str, exercise_type: str) -> tuple:
     """
     Generate language learning exercises based on the text.
 
@@ -233,36 +992,20 @@ async def generate_exercises(text: str, target_lang: str, proficiency: str, exer
         exercise_type: Type of exercises to generate
 
     Returns:
-        Dictionary with exercises
+        Tuple of (exercises, whether the response was cached)
     """
     try:
         # Create a prompt based on the exercise type and proficiency
-        prompt = EXERCISE_GENERATOR_PROMPT.format(
-            user_input=text,
-            proficiency_level=proficiency,
-            focus_area=f"{target_lang} {exercise_type}"
-        )
-
-        system_message = "You are an AI language exercise creator. Generate engaging, appropriate exercises formatted as JSON."
-
-        # Call the Groq API
-        result = await call_groq_api(prompt, system_message)
+        system_message, prompt = build_exercise_prompt(text, target_lang, proficiency, exercise_type)
 
-        if result["success"]:
-            # Try to parse as JSON, but return as text if parsing fails
-            try:
-                parsed_exercises = json.loads(result["content"])
-                return parsed_exercises
-            except json.JSONDecodeError as json_err:
-                print(f"⚠️ JSON parsing failed in exercise generation: {json_err}")
-                # If JSON parsing fails, return as raw text
-                return {"raw": result["content"], "error": "Failed to parse JSON response"}
-        else:
-            return {"error": result["error"], "raw": result.get("raw", "")}
+        # Call the Groq API and enforce the exercise schema
+        return await call_groq_json(prompt, system_message, EXERCISE_SCHEMA, task="exercises", label="exercise generation")
 
+    except UpstreamBusyError:
+        raise
     except Exception as e:
-        print(f"Exercise Generation Error: {e}")
-        return {"error": str(e)}
+        logger.error("Exercise generation error: {}", e)
+        return {"error": str(e)}, False
 
 # Exercise generation endpoint
 @app.post("/generate-exercises")
@@ -282,7 +1025,7 @@ async def generate_exercises_endpoint(req: ExerciseRequest):
     start_time = time.time()
 
     # Generate exercises
-    exercises = await generate_exercises(
+    exercises, cached = await generate_exercises(
         req.text,
         req.targetLanguage,
         req.proficiencyLevel,
@@ -300,49 +1043,39 @@ async def generate_exercises_endpoint(req: ExerciseRequest):
         "targetLanguage": req.targetLanguage,
         "proficiencyLevel": req.proficiencyLevel,
         "exerciseType": req.exerciseType,
+        "cached": cached,
         "processingTimeMs": processing_time
     }
 
 # Conversation analysis function
-async def analyze_conversation(messages: List[ChatMessage], analyze_for: List[str]) -> dict:
+async def analyze_conversation(messages: List[ChatMessage], analyze_for: List[str], conversation_id: Optional[str] = None) -> tuple:
     """
     Analyze conversation for sentiment, formality, engagement, and cultural aspects.
 
     Args:
         messages: List of chat messages
         analyze_for: List of aspects to analyze
+        conversation_id: Stable id of the conversation, enables the cached summary
 
     Returns:
-        Dictionary with analysis results
+        Tuple of (analysis results, whether the response was cached)
     """
     try:
-        # Format the conversation for analysis
-        conversation_text = "\n".join([f"Speaker {msg.speaker} ({msg.language}): {msg.text}" for msg in messages])
+        # Keep long conversations within the model's context window
+        conversation_text = await build_conversation_context(messages, CONTEXT_HISTORY_TOKENS, conversation_id)
 
         # Create a customized prompt based on what to analyze for
-        analysis_aspects = ", ".join(analyze_for)
-        prompt = f"Analyze this conversation for {analysis_aspects}: {conversation_text}"
+        prompt = build_analysis_prompt(conversation_text, analyze_for)
+        system_message = ANALYSIS_SYSTEM_MESSAGE
 
-        system_message = "You are an AI conversation analyst. Provide detailed, accurate analysis of conversations formatted as JSON."
-
-        # Call the Groq API
-        result = await call_groq_api(prompt, system_message)
-
-        if result["success"]:
-            # Try to parse as JSON, but return as text if parsing fails
-            try:
-                parsed_analysis = json.loads(result["content"])
-                return parsed_analysis
-            except json.JSONDecodeError as json_err:
-                print(f"⚠️ JSON parsing failed in conversation analysis: {json_err}")
-                # If JSON parsing fails, return as raw text
-                return {"raw": result["content"], "error": "Failed to parse JSON response"}
-        else:
-            return {"error": result["error"], "raw": result.get("raw", "")}
+        # Call the Groq API and require one key per analyzed aspect
+        return await call_groq_json(prompt, system_message, analysis_schema(analyze_for), task="analysis", label="conversation analysis")
 
+    except UpstreamBusyError:
+        raise
     except Exception as e:
-        print(f"Conversation Analysis Error: {e}")
-        return {"error": str(e)}
+        logger.error("Conversation analysis error: {}", e)
+        return {"error": str(e)}, False
 
 # Conversation analysis endpoint
 @app.post("/analyze-conversation")
@@ -362,9 +1095,10 @@ async def analyze_conversation_endpoint(req: SentimentAnalysisRequest):
     start_time = time.time()
 
     # Analyze conversation
-    analysis = await analyze_conversation(
+    analysis, cached = await analyze_conversation(
         req.messages,
-        req.analyzeFor
+        req.analyzeFor,
+        req.conversationId
     )
 
     # Calculate processing time
@@ -376,15 +1110,798 @@ async def analyze_conversation_endpoint(req: SentimentAnalysisRequest):
         "messageCount": len(req.messages),
         "analysis": analysis,
         "analyzedFor": req.analyzeFor,
+        "cached": cached,
         "processingTimeMs": processing_time
     }
 
+LANGUAGE_NAMES = {
+    "en": "English", "es": "Spanish", "fr": "French", "de": "German", "it": "Italian",
+    "pt": "Portuguese", "ru": "Russian", "zh": "Chinese", "ja": "Japanese", "ko": "Korean",
+    "ar": "Arabic", "hi": "Hindi", "tr": "Turkish", "nl": "Dutch", "pl": "Polish",
+    "vi": "Vietnamese", "th": "Thai"
+}
+
+def _language_name(code: str) -> str:
+    """Map a language code to its English name for prompts."""
+    if not code or code == "auto":
+        return "its original language"
+    return LANGUAGE_NAMES.get(code, code)
+
+def _memory_reference(reference: Optional[dict]) -> str:
+    """Prompt lines offering a near translation-memory match as a reference, or nothing."""
+    if not reference:
+        return ""
+    return (
+        "For reference, a similar text was translated before. Reuse its terminology where it fits, "
+        "but translate the text below exactly, including its numbers, names and negations.\n"
+        f"Similar text: \"{reference['source']}\"\n"
+        f"Its translation: \"{reference['translation']}\"\n"
+    )
+
+def _clean_translation(text: str) -> str:
+    """Strip wrapping quotes the model sometimes adds around a translation."""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        text = text[1:-1]
+    return text.replace('\\"', '"').replace("\\'", "'")
+
+# Incremental conversation analysis endpoint
+@app.post("/analyze-conversation/incremental")
+async def analyze_conversation_incremental(req: IncrementalAnalysisRequest):
+    """
+    Analyze only the new messages of a conversation and update its stored aggregates.
+
+    The prompt carries a fixed-size description of the stored state plus the new
+    messages, so the cost per call does not grow with conversation length.
+
+    Args:
+        req: Request containing the conversation id and the messages added since the last call
+
+    Returns:
+        Aggregated analysis of the whole conversation and the per-message delta
+    """
+    if not req.conversationId:
+        raise HTTPException(status_code=400, detail="conversationId is required.")
+    if not req.newMessages and not req.reset:
+        raise HTTPException(status_code=400, detail="newMessages are required.")
+
+    start_time = time.time()
+    delta = None
+    key = conversation_key(req.conversationId)
+
+    # Serialize this worker's updates per conversation so deltas apply in order
+    async with conversation_states.lock(key):
+        if req.reset:
+            await conversation_states.reset(key)
+        state = await conversation_states.get(key)
+        if req.newMessages:
+            new_messages = label_languages(req.newMessages)
+            lines = [format_message(msg) for msg in new_messages]
+            system_message, prompt = prompt_registry.render(
+                "INCREMENTAL_ANALYSIS_PROMPT", ANALYSIS_SYSTEM_MESSAGE,
+                state=state.context(),
+                messages="\n".join(lines),
+                aspects=", ".join(req.analyzeFor),
+                count=len(lines)
+            )
+
+            # Call the Groq API and enforce the delta schema
+            delta, _ = await call_groq_json(prompt, system_message, INCREMENTAL_ANALYSIS_SCHEMA, task="analysis", label="incremental analysis")
+
+            # Leave the state untouched on failure so the client can resend the same messages
+            if "error" not in delta and "messages" not in delta.get("missingKeys", []):
+                speakers = [msg.speaker for msg in req.newMessages]
+                state = await conversation_states.update(
+                    key, state, lambda current: current.apply(speakers, lines, delta)
+                )
+                conversation_states.deltas_applied += 1
+                conversation_states.messages_analyzed += len(lines)
+
+        analysis = state.snapshot(req.analyzeFor)
+        message_count = state.message_count
+
+    # Calculate processing time
+    processing_time = round((time.time() - start_time) * 1000)
+
+    return {
+        "success": delta is None or ("error" not in delta and "messages" not in delta.get("missingKeys", [])),
+        "conversationId": req.conversationId,
+        "messageCount": message_count,
+        "newMessageCount": len(req.newMessages),
+        "analysis": analysis,
+        "delta": delta,
+        "analyzedFor": req.analyzeFor,
+        "processingTimeMs": processing_time
+    }
+
+# Translation function
+async def translate_text(text: str, source_lang: str, target_lang: str, ai_enhance: bool, history: Optional[List[ChatMessage]] = None, conversation_id: Optional[str] = None) -> dict:
+    """
+    Translate text, serving repeated strings from the translation memory.
+
+    Only an exact memory match skips the LLM. A near match is passed to the
+    model as a reference and reported in suggestions. Chat translations depend
+    on the conversation, so they neither read nor write the memory, and
+    neither does text whose language could not be detected.
+
+    Args:
+        text: Text to translate
+        source_lang: Source language code, or "auto"
+        target_lang: Target language code
+        ai_enhance: Prefer a natural, idiomatic translation over a literal one
+        history: Earlier chat messages used as context, if any
+        conversation_id: Stable id of the conversation, enables the cached summary
+
+    Returns:
+        Dictionary with the translation and how it was produced, or an error
+    """
+    try:
+        # Text the caller says is already in the target language needs no translation
+        if source_lang == target_lang:
+            return {
+                "translation": text,
+                "detectedLanguage": None,
+                "memoryMatch": None,
+                "similarity": None,
+                "suggestions": [],
+                "cached": False
+            }
+
+        # Detect "auto" locally so the prompt, the response cache and the memory get a real language.
+        # A detection is never trusted to skip the LLM: text outside the profiles can be mislabelled.
+        detected = None
+        if not source_lang or source_lang == "auto":
+            detected = language_detector.detect(text).language
+            source_lang = detected
+
+        style_key = "natural" if ai_enhance else "literal"
+        style = (
+            "Produce a natural, fluent translation that a native speaker would use."
+            if ai_enhance else
+            "Produce a faithful, literal translation."
+        )
+
+        # The memory is keyed by language, so text whose language is still unknown neither reads nor writes it
+        use_memory = not history and source_lang != "auto"
+
+        # Skip the LLM entirely for exact matches; a near match is only a reference
+        reference = None
+        if use_memory:
+            memorized = translation_memory.lookup(text, source_lang, target_lang, style_key)
+            if memorized is not None:
+                return {
+                    "translation": memorized,
+                    "detectedLanguage": detected,
+                    "memoryMatch": "exact",
+                    "similarity": 1.0,
+                    "suggestions": [],
+                    "cached": False
+                }
+            reference = translation_memory.reference(text, source_lang, target_lang, style_key)
+
+        if history:
+            history_text = await build_conversation_context(history, CHAT_CONTEXT_TOKENS, conversation_id)
+            system_message, prompt = prompt_registry.render(
+                "CHAT_TRANSLATION_PROMPT", TRANSLATION_SYSTEM_MESSAGE,
+                text=text,
+                source_lang=_language_name(source_lang),
+                target_lang=_language_name(target_lang),
+                style=style,
+                history=history_text
+            )
+        else:
+            system_message, prompt = prompt_registry.render(
+                "TRANSLATION_PROMPT", TRANSLATION_SYSTEM_MESSAGE,
+                text=text,
+                source_lang=_language_name(source_lang),
+                target_lang=_language_name(target_lang),
+                style=style,
+                reference=_memory_reference(reference)
+            )
+
+        # Call the Groq API
+        result = await call_groq_api(prompt, system_message, json_response=False, task="translation")
+
+        if result["success"]:
+            translation = _clean_translation(result["content"])
+            if use_memory:
+                await translation_memory.store(text, source_lang, target_lang, style_key, translation)
+            return {
+                "translation": translation,
+                "detectedLanguage": detected,
+                "memoryMatch": "fuzzy" if reference else None,
+                "similarity": reference["similarity"] if reference else None,
+                "suggestions": [reference] if reference else [],
+                "cached": result.get("cached", False)
+            }
+        else:
+            return {"error": result["error"]}
+
+    except UpstreamBusyError:
+        raise
+    except Exception as e:
+        logger.error("Translation error: {}", e)
+        return {"error": str(e)}
+
+def _translation_response(translation: dict, source_lang: str, target_lang: str, start_time: float) -> dict:
+    """Shape a translation result like the Node /api/translate response."""
+    processing_time = round((time.time() - start_time) * 1000)
+    if "error" in translation:
+        return {
+            "success": False,
+            "error": translation["error"],
+            "errorType": "TRANSLATION_ERROR",
+            "sourceLanguage": source_lang,
+            "targetLanguage": target_lang,
+            "processingTimeMs": processing_time
+        }
+    return {
+        "success": True,
+        "translation": translation["translation"],
+        "translated": translation["translation"],
+        "sourceLanguage": source_lang,
+        "targetLanguage": target_lang,
+        "detectedLanguage": translation["detectedLanguage"],
+        "memoryMatch": translation["memoryMatch"],
+        "similarity": translation["similarity"],
+        "suggestions": translation["suggestions"],
+        "cached": translation["cached"],
+        "processingTimeMs": processing_time
+    }
+
+# Text translation endpoint
+@app.post("/translate")
+async def translate_endpoint(req: TextTranslationRequest):
+    """
+    Translate a piece of text.
+
+    Args:
+        req: Request containing text and languages
+
+    Returns:
+        Translation result
+    """
+    if not req.text or not req.targetLanguage:
+        raise HTTPException(status_code=400, detail="Text and targetLanguage are required.")
+
+    start_time = time.time()
+
+    translation = await translate_text(req.text, req.sourceLanguage, req.targetLanguage, req.aiEnhance)
+
+    return _translation_response(translation, req.sourceLanguage, req.targetLanguage, start_time)
+
+# Chat translation endpoint
+@app.post("/chat-translate")
+async def chat_translate_endpoint(req: ChatTranslationRequest):
+    """
+    Translate a chat message using the recent conversation as context.
+
+    Args:
+        req: Request containing the message, conversation history and languages
+
+    Returns:
+        Translation result
+    """
+    if not req.message or not req.targetLanguage:
+        raise HTTPException(status_code=400, detail="Message and targetLanguage are required.")
+
+    start_time = time.time()
+
+    translation = await translate_text(
+        req.message,
+        req.sourceLanguage,
+        req.targetLanguage,
+        req.aiEnhance,
+        history=req.conversationHistory,
+        conversation_id=req.conversationId
+    )
+
+    return _translation_response(translation, req.sourceLanguage, req.targetLanguage, start_time)
+
+# Streaming helpers
+@asynccontextmanager
+async def _no_limit():
+    """Stand-in for the scheduler and upstream limiter when no upstream call is made."""
+    yield
+
+async def _replay(content: str):
+    """Yield cached content as a single streamed delta."""
+    yield content
+
+async def _stream_with_fallback(targets, payload: dict, timeout: float, answered: list):
+    """
+    Stream deltas from the first model that starts answering.
+
+    A model that fails before sending anything is skipped for the next one in
+    the chain; once deltas have been sent the stream cannot switch models.
+
+    Args:
+        targets: Model chain from model_router.route, primary first
+        payload: Chat completion body without the model
+        timeout: Read timeout in seconds between streamed chunks
+        answered: Receives the target that started answering
+
+    Yields:
+        Text deltas from the completion
+    """
+    for position, target in enumerate(targets):
+        started = False
+        try:
+            body = {**payload, "model": target.model}
+            if json_mode_supported(target.model):
+                body["response_format"] = {"type": "json_object"}
+            async for delta in groq_client.stream_chat_completion(body, timeout=timeout, url=target.url, api_key=target.api_key()):
+                if not started:
+                    started = True
+                    answered.append(target)
+                yield delta
+            return
+        except httpx.HTTPError as e:
+            if started or position + 1 == len(targets):
+                raise
+            logger.warning("Streaming from {} failed ({}), falling back to {}", target.model, e, targets[position + 1].model)
+            model_router.fallbacks += 1
+
+async def stream_groq_sections(prompt: str, system_message: str, result_key: str, timeout: float = 15, task: str = "learning"):
+    """
+    Stream a completion as Server-Sent Events.
+
+    Emits a "token" event per upstream delta, a "section" event as soon as each
+    top-level JSON member closes, and a final "done" event with the full result.
+
+    Args:
+        prompt: The prompt to send to the API
+        system_message: The system message to use
+        result_key: Name of the result field in the "done" event
+        timeout: Read timeout in seconds between streamed chunks
+        task: Task name used to pick the model (see model_router.py)
+
+    Yields:
+        Encoded SSE events
+    """
+    start_time = time.time()
+    first_section_ms = None
+    parser = JsonSectionParser()
+    answered = []
+
+    try:
+        # Replay cached completions without going upstream
+        prompt_tokens = estimate_tokens(system_message) + estimate_tokens(prompt)
+        targets = model_router.route(task, prompt_tokens)
+        cache_key = make_cache_key(targets[0].model, system_message, prompt)
+        cached_content = await response_cache.get(cache_key)
+        cached = cached_content is not None
+
+        if cached:
+            deltas = _replay(cached_content)
+        else:
+            payload = {
+                "messages": [
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ]
+            }
+            log_payload("Groq stream prompt", prompt)
+            deltas = _stream_with_fallback(targets, payload, timeout, answered)
+
+        # Hold a scheduler slot and an upstream slot for the whole stream
+        estimated_tokens = 0 if cached else prompt_tokens + GROQ_EXPECTED_COMPLETION_TOKENS
+        async with llm_scheduler.slot() if not cached else _no_limit(), upstream_limiter.acquire(estimated_tokens) if not cached else _no_limit():
+            async for delta in deltas:
+                if not cached:
+                    yield sse_event("token", {"delta": delta})
+                for key, value in parser.feed(delta):
+                    if first_section_ms is None:
+                        first_section_ms = round((time.time() - start_time) * 1000)
+                    yield sse_event("section", {"key": key, "value": value})
+
+        # Parse the full completion once the stream ends
+        content = parser.text().strip()
+        result = extract_json(content)
+        if isinstance(result, dict):
+            # The key names the primary model, so a fallback's answer is not stored under it
+            if not cached and answered == targets[:1]:
+                await response_cache.set(cache_key, json.dumps(result))
+        else:
+            logger.warning("JSON parsing failed in streamed response")
+            result = {"raw": content, "error": "Failed to parse JSON response"}
+
+        yield sse_event("done", {
+            "success": True,
+            result_key: result,
+            "cached": cached,
+            "timeToFirstSectionMs": first_section_ms,
+            "processingTimeMs": round((time.time() - start_time) * 1000)
+        })
+    except UpstreamBusyError as e:
+        # Headers are already sent, so the retry hint goes in the event
+        yield sse_event("error", {"success": False, "error": str(e), "errorType": "UPSTREAM_BUSY", "retryAfter": _retry_after(e)})
+    except Exception as e:
+        logger.error("Streaming error: {}", e)
+        yield sse_event("error", {"success": False, "error": str(e)})
+
+def _sse_response(events) -> StreamingResponse:
+    """Wrap an SSE generator in a response that proxies will not buffer."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Streaming language learning endpoint
+@app.post("/learning-suggestions/stream")
+async def learning_suggestions_stream(req: LearningRequest):
+    """
+    Stream personalized language learning suggestions as Server-Sent Events.
+
+    Args:
+        req: Request containing text and learning parameters
+
+    Returns:
+        SSE stream of tokens, completed sections and the final suggestions
+    """
+    if not req.text:
+        raise HTTPException(status_code=400, detail="Text is required.")
+
+    system_message, prompt = build_learning_prompt(req.text, req.userLanguage, req.targetLanguage, req.proficiencyLevel, req.focusArea)
+    return _sse_response(stream_groq_sections(prompt, system_message, "suggestions", task=_learning_task(req.focusArea)))
+
+# Streaming conversation analysis endpoint
+@app.post("/analyze-conversation/stream")
+async def analyze_conversation_stream(req: SentimentAnalysisRequest):
+    """
+    Stream conversation analysis as Server-Sent Events.
+
+    Args:
+        req: Request containing messages and analysis parameters
+
+    Returns:
+        SSE stream of tokens, completed sections and the final analysis
+    """
+    if not req.messages or len(req.messages) == 0:
+        raise HTTPException(status_code=400, detail="Messages are required.")
+
+    conversation_text = await build_conversation_context(req.messages, CONTEXT_HISTORY_TOKENS, req.conversationId)
+    prompt = build_analysis_prompt(conversation_text, req.analyzeFor)
+    return _sse_response(stream_groq_sections(prompt, ANALYSIS_SYSTEM_MESSAGE, "analysis", task="analysis"))
+
+# Batch helpers
+def _plan_batch_units(items: list, group_key, pack: bool) -> List[List[int]]:
+    """
+    Split batch items into units of work, one upstream prompt per unit.
+
+    Args:
+        items: Batch request items
+        group_key: Function returning the prompt parameters an item shares with others
+        pack: Whether short texts with identical parameters may share a prompt
+
+    Returns:
+        List of units, each a list of item indexes
+    """
+    if not pack:
+        return [[index] for index in range(len(items))]
+
+    units = []
+    groups: Dict[tuple, List[int]] = {}
+    for index, item in enumerate(items):
+        if item.text and len(item.text) <= PACK_MAX_CHARS:
+            groups.setdefault(group_key(item), []).append(index)
+        else:
+            units.append([index])
+
+    # Chunk each group so packed prompts stay small
+    for indexes in groups.values():
+        for start in range(0, len(indexes), PACK_MAX_ITEMS):
+            units.append(indexes[start:start + PACK_MAX_ITEMS])
+    return units
+
+async def _generate_packed(texts: List[str], build_prompt, task: str, schema):
+    """
+    Generate results for several short texts with a single upstream call.
+
+    Args:
+        texts: Texts sharing the same prompt parameters
+        build_prompt: Function returning the unsplit single-item (system message, prompt) for a given text,
+            so the batch instructions follow the per-item format they refer to in the same message
+        task: Task name used to pick the model
+        schema: JsonSchema every item must satisfy
+
+    Returns:
+        Tuple of (list of per-text results, cached), or None if the packed response was unusable
+    """
+    numbered = "\n".join(f"{number}. {text}" for number, text in enumerate(texts, 1))
+    system_message, prompt = build_prompt(numbered)
+    prompt += PACKED_BATCH_SUFFIX.format(count=len(texts))
+
+    result = await call_groq_api(prompt, system_message, task=task)
+    if not result["success"]:
+        return None
+    parsed = extract_json(result["content"])
+    items = parsed.get("items") if isinstance(parsed, dict) else None
+    if items is None:
+        logger.warning("Packed batch response could not be parsed, falling back to single prompts")
+        return None
+    if not isinstance(items, list) or len(items) != len(texts):
+        logger.warning("Packed batch response has the wrong shape, falling back to single prompts")
+        return None
+    # Return the normalized items, the same shape the single-item endpoints produce
+    normalized = [schema.normalize(item) for item in items]
+    if any(schema.problems(item) for item in normalized):
+        logger.warning("Packed batch response has the wrong shape, falling back to single prompts")
+        return None
+    return normalized, result.get("cached", False)
+
+async def _run_batch(items: list, units: List[List[int]], run_unit) -> list:
+    """
+    Run batch units concurrently under a bounded semaphore.
+
+    Args:
+        items: Batch request items
+        units: Units of work from _plan_batch_units
+        run_unit: Coroutine function taking a list of items and returning one result per item
+
+    Returns:
+        Per-item results in request order
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    results = [None] * len(items)
+
+    async def run(unit):
+        async with semaphore:
+            try:
+                unit_results = await run_unit([items[index] for index in unit])
+            except UpstreamBusyError as e:
+                # Fail only this unit's items, keeping the rest of the batch
+                unit_results = [
+                    {"success": False, "text": items[index].text, "error": str(e), "errorType": "UPSTREAM_BUSY", "retryAfter": _retry_after(e)}
+                    for index in unit
+                ]
+        for index, result in zip(unit, unit_results):
+            results[index] = {"index": index, **result}
+
+    await asyncio.gather(*[run(unit) for unit in units])
+    return results
+
+def _batch_item_result(key: str, text: str, value: dict, cached: bool, packed: bool) -> dict:
+    """Wrap a generator result as a per-item batch result with its own error."""
+    if "error" in value:
+        return {"success": False, "text": text, "error": value["error"], key: value}
+    return {"success": True, "text": text, key: value, "cached": cached, "packed": packed}
+
+def _check_batch(items: list):
+    """Validate batch size."""
+    if not items:
+        raise HTTPException(status_code=400, detail="Items are required.")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {BATCH_MAX_ITEMS} items.")
+
+# Batch language learning endpoint
+@app.post("/learning-suggestions/batch")
+async def learning_suggestions_batch(req: LearningBatchRequest):
+    """
+    Generate learning suggestions for many sentences in one request.
+
+    Args:
+        req: Request containing learning requests and the packing option
+
+    Returns:
+        Per-item learning suggestions or errors
+    """
+    _check_batch(req.items)
+
+    start_time = time.time()
+
+    async def run_unit(unit_items: List[LearningRequest]) -> list:
+        first = unit_items[0]
+        if len(unit_items) > 1:
+            packed = await _generate_packed(
+                [item.text for item in unit_items],
+                lambda text: build_learning_prompt(text, first.userLanguage, first.targetLanguage, first.proficiencyLevel, first.focusArea, split=False),
+                _learning_task(first.focusArea),
+                LEARNING_SCHEMA
+            )
+            if packed is not None:
+                values, cached = packed
+                return [_batch_item_result("suggestions", item.text, value, cached, True) for item, value in zip(unit_items, values)]
+
+        # Generate one prompt per item, including packed units that failed
+        results = []
+        for item in unit_items:
+            if not item.text:
+                results.append({"success": False, "text": item.text, "error": "Text is required."})
+                continue
+            suggestions, cached = await generate_learning_suggestions(
+                item.text, item.userLanguage, item.targetLanguage, item.proficiencyLevel, item.focusArea
+            )
+            results.append(_batch_item_result("suggestions", item.text, suggestions, cached, False))
+        return results
+
+    units = _plan_batch_units(
+        req.items,
+        lambda item: (item.userLanguage, item.targetLanguage, item.proficiencyLevel, item.focusArea),
+        req.packShortTexts
+    )
+    results = await _run_batch(req.items, units, run_unit)
+
+    # Calculate processing time
+    processing_time = round((time.time() - start_time) * 1000)
+
+    return {
+        "success": True,
+        "count": len(results),
+        "failed": sum(1 for result in results if not result["success"]),
+        "promptUnits": len(units),
+        "results": results,
+        "processingTimeMs": processing_time
+    }
+
+# Batch exercise generation endpoint
+@app.post("/generate-exercises/batch")
+async def generate_exercises_batch(req: ExerciseBatchRequest):
+    """
+    Generate exercises for many sentences in one request.
+
+    Args:
+        req: Request containing exercise requests and the packing option
+
+    Returns:
+        Per-item exercises or errors
+    """
+    _check_batch(req.items)
+
+    start_time = time.time()
+
+    async def run_unit(unit_items: List[ExerciseRequest]) -> list:
+        first = unit_items[0]
+        if len(unit_items) > 1:
+            packed = await _generate_packed(
+                [item.text for item in unit_items],
+                lambda text: build_exercise_prompt(text, first.targetLanguage, first.proficiencyLevel, first.exerciseType, split=False),
+                "exercises",
+                EXERCISE_SCHEMA
+            )
+            if packed is not None:
+                values, cached = packed
+                return [_batch_item_result("exercises", item.text, value, cached, True) for item, value in zip(unit_items, values)]
+
+        # Generate one prompt per item, including packed units that failed
+        results = []
+        for item in unit_items:
+            if not item.text:
+                results.append({"success": False, "text": item.text, "error": "Text is required."})
+                continue
+            exercises, cached = await generate_exercises(
+                item.text, item.targetLanguage, item.proficiencyLevel, item.exerciseType
+            )
+            results.append(_batch_item_result("exercises", item.text, exercises, cached, False))
+        return results
+
+    units = _plan_batch_units(
+        req.items,
+        lambda item: (item.targetLanguage, item.proficiencyLevel, item.exerciseType),
+        req.packShortTexts
+    )
+    results = await _run_batch(req.items, units, run_unit)
+
+    # Calculate processing time
+    processing_time = round((time.time() - start_time) * 1000)
+
+    return {
+        "success": True,
+        "count": len(results),
+        "failed": sum(1 for result in results if not result["success"]),
+        "promptUnits": len(units),
+        "results": results,
+        "processingTimeMs": processing_time
+    }
+
+async def _exercise_job(payload: dict) -> dict:
+    """Run a queued exercise generation; upstream failures raise so the job is retried."""
+    try:
+        response = await generate_exercises_endpoint(ExerciseRequest(**payload))
+    except HTTPException as e:
+        raise JobRejectedError(e.detail)
+    if "error" in response["exercises"]:
+        raise RuntimeError(response["exercises"]["error"])
+    return response
+
+async def _analysis_job(payload: dict) -> dict:
+    """Run a queued conversation analysis; upstream failures raise so the job is retried."""
+    try:
+        response = await analyze_conversation_endpoint(SentimentAnalysisRequest(**payload))
+    except HTTPException as e:
+        raise JobRejectedError(e.detail)
+    if "error" in response["analysis"]:
+        raise RuntimeError(response["analysis"]["error"])
+    return response
+
+job_queue.register("generate-exercises", _exercise_job)
+job_queue.register("analyze-conversation", _analysis_job)
+
+async def _submit_job(kind: str, payload: dict, webhook_url: Optional[str]) -> JSONResponse:
+    """
+    Queue a job and answer 202 with where to poll for it.
+
+    Args:
+        kind: Registered job kind
+        payload: Request fields for the handler
+        webhook_url: Optional localhost URL to POST the finished job to
+
+    Returns:
+        202 response with the job id and status URL
+    """
+    if webhook_url:
+        try:
+            validate_webhook_url(webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    job = await job_queue.submit(kind, payload, webhook_url)
+    status_url = f"/jobs/{job['jobId']}"
+    return JSONResponse(
+        status_code=202,
+        content={"success": True, "jobId": job["jobId"], "status": job["status"], "statusUrl": status_url},
+        headers={"Location": status_url},
+    )
+
+# Asynchronous exercise generation endpoint
+@app.post("/jobs/generate-exercises", status_code=202)
+async def submit_exercise_job(req: ExerciseJobRequest):
+    """
+    Queue exercise generation and return immediately.
+
+    Args:
+        req: Exercise request, optionally with a webhook URL
+
+    Returns:
+        Job id and status URL; poll GET /jobs/{jobId} for the /generate-exercises response
+    """
+    if not req.text:
+        raise HTTPException(status_code=400, detail="Text is required.")
+    return await _submit_job("generate-exercises", req.model_dump(exclude={"webhookUrl"}), req.webhookUrl)
+
+# Asynchronous conversation analysis endpoint
+@app.post("/jobs/analyze-conversation", status_code=202)
+async def submit_analysis_job(req: AnalysisJobRequest):
+    """
+    Queue conversation analysis and return immediately.
+
+    Args:
+        req: Analysis request, optionally with a webhook URL
+
+    Returns:
+        Job id and status URL; poll GET /jobs/{jobId} for the /analyze-conversation response
+    """
+    if not req.messages:
+        raise HTTPException(status_code=400, detail="Messages are required.")
+    return await _submit_job("analyze-conversation", req.model_dump(exclude={"webhookUrl"}), req.webhookUrl)
+
+# Job status endpoint
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Poll a job.
+
+    Args:
+        job_id: Id returned when the job was submitted
+
+    Returns:
+        Job status, attempts and timestamps, plus the result or error once finished
+    """
+    # Only the submitter (same user, or same address for anonymous jobs) can read a job
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return {"success": True, **job}
+
 # Run the application
 if __name__ == "__main__":
     import uvicorn
 
-    port = int(os.getenv("PORT", 8001))
+    # Single process on the default loop; run_fixed.py is the multi-worker launcher
+    port = int(os.getenv("PORT", 8004))
     host = os.getenv("HOST", "0.0.0.0")
 
-    print(f"Starting PolyLingo Fixed Backend on {host}:{port}")
-    uvicorn.run(app, host=host, port=port)
+    logger.info("Starting PolyLingo Fixed Backend on {}:{}", host, port)
+    # Keep uvicorn from installing its own handlers; its loggers go through loguru
+    uvicorn.run(app, host=host, port=port, log_config=None)
@@ -0,0 +1,259 @@
+"""
+Shared, pooled HTTP client for the Groq chat completions API.
+"""
+import os
+import json
+import time
+import httpx
+from typing import AsyncIterator, Optional
+
+from metrics import STAGE_UPSTREAM_CONNECT, STAGE_UPSTREAM_TTFB, STAGE_UPSTREAM_TOTAL, upstream_responses, upstream_errors, record_usage
+
+# Upstream endpoint and default model
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-8b-8192")
+
+# Connection pool configuration
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", 100))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", 20))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", 30))
+GROQ_HTTP2 = os.getenv("GROQ_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# Per-phase timeouts in seconds (the read timeout is set per call)
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", 5))
+GROQ_WRITE_TIMEOUT = float(os.getenv("GROQ_WRITE_TIMEOUT", 5))
+GROQ_POOL_TIMEOUT = float(os.getenv("GROQ_POOL_TIMEOUT", 5))
+
+
+class _ConnectTimer:
+    """
+    httpx trace hook that times new connections (TCP connect plus TLS handshake).
+
+    Nothing is observed when the request reuses a pooled connection.
+    """
+
+    __slots__ = ("started", "finished")
+
+    def __init__(self):
+        self.started = 0.0
+        self.finished = 0.0
+
+    async def __call__(self, event: str, info: dict):
+        if event == "connection.connect_tcp.started":
+            self.started = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            self.finished = time.perf_counter()
+
+    def observe(self):
+        if self.started and self.finished:
+            STAGE_UPSTREAM_CONNECT.observe(self.finished - self.started)
+
+
+def _http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class GroqClient:
+    """
+    App-lifetime wrapper around a single httpx.AsyncClient.
+
+    The underlying client is created on startup and closed on shutdown so that
+    every upstream call reuses pooled keep-alive (and, when available, HTTP/2)
+    connections instead of doing a fresh TCP+TLS handshake.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.http2 = GROQ_HTTP2 and _http2_available()
+        self.requests_total = 0
+        self.requests_in_flight = 0
+
+    async def start(self):
+        """Create the pooled client. Safe to call more than once."""
+        if self._client is not None:
+            return
+        limits = httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+            keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+        )
+        self._client = httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout(15),
+            http2=self.http2,
+        )
+
+    async def close(self):
+        """Close the pooled client and release its connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def timeout(read_timeout: float) -> httpx.Timeout:
+        """
+        Build per-phase timeouts for a single call.
+
+        Args:
+            read_timeout: Seconds to wait for the upstream response
+
+        Returns:
+            httpx.Timeout with connect, read, write and pool phases set
+        """
+        return httpx.Timeout(
+            connect=GROQ_CONNECT_TIMEOUT,
+            read=read_timeout,
+            write=GROQ_WRITE_TIMEOUT,
+            pool=GROQ_POOL_TIMEOUT,
+        )
+
+    async def post_chat_completion(self, payload: dict, timeout: float = 15, url: str = GROQ_API_URL, api_key: Optional[str] = None) -> httpx.Response:
+        """
+        POST a chat completion payload over the shared connection pool.
+
+        Args:
+            payload: OpenAI-compatible chat completion body
+            timeout: Read timeout in seconds
+            url: Chat completions endpoint
+            api_key: Bearer token for the endpoint (defaults to GROQ_API_KEY)
+
+        Returns:
+            The raw httpx response
+        """
+        # Lazily start the client if the app was not started via lifespan events
+        if self._client is None:
+            await self.start()
+
+        headers = {
+            "Authorization": f"Bearer {api_key or os.getenv('GROQ_API_KEY')}",
+            "Content-Type": "application/json"
+        }
+
+        model = payload.get("model")
+        connect = _ConnectTimer()
+        request = self._client.build_request(
+            "POST", url, headers=headers, json=payload, timeout=self.timeout(timeout), extensions={"trace": connect}
+        )
+
+        self.requests_total += 1
+        self.requests_in_flight += 1
+        start = time.perf_counter()
+        try:
+            # Send with a streamed body so time to first byte (the response headers) can be told apart from the total
+            response = await self._client.send(request, stream=True)
+            STAGE_UPSTREAM_TTFB.observe(time.perf_counter() - start)
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            STAGE_UPSTREAM_TOTAL.observe(time.perf_counter() - start)
+            upstream_responses.labels(model, response.status_code).inc()
+            return response
+        except httpx.TransportError as e:
+            upstream_errors.labels(model, type(e).__name__).inc()
+            raise
+        finally:
+            connect.observe()
+            self.requests_in_flight -= 1
+
+    async def stream_chat_completion(self, payload: dict, timeout: float = 15, url: str = GROQ_API_URL, api_key: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat completion and yield content deltas as they arrive.
+
+        Args:
+            payload: OpenAI-compatible chat completion body (stream is forced on)
+            timeout: Read timeout in seconds, applied between received chunks
+            url: Chat completions endpoint
+            api_key: Bearer token for the endpoint (defaults to GROQ_API_KEY)
+
+        Yields:
+            Text deltas from the completion
+        """
+        if self._client is None:
+            await self.start()
+
+        headers = {
+            "Authorization": f"Bearer {api_key or os.getenv('GROQ_API_KEY')}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+
+        model = payload.get("model")
+        connect = _ConnectTimer()
+
+        self.requests_total += 1
+        self.requests_in_flight += 1
+        start = time.perf_counter()
+        first_delta = True
+        try:
+            async with self._client.stream(
+                "POST", url, headers=headers, json={**payload, "stream": True},
+                timeout=self.timeout(timeout), extensions={"trace": connect}
+            ) as response:
+                upstream_responses.labels(model, response.status_code).inc()
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise httpx.HTTPStatusError(
+                        f"Upstream returned {response.status_code}: {body[:200]!r}",
+                        request=response.request,
+                        response=response,
+                    )
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    # Groq reports stream usage on the last chunk under x_groq
+                    usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+                    if usage:
+                        record_usage(model, usage)
+                    choices = chunk.get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        if first_delta:
+                            # For streams, time to first byte is time to the first content token
+                            STAGE_UPSTREAM_TTFB.observe(time.perf_counter() - start)
+                            first_delta = False
+                        yield delta
+            STAGE_UPSTREAM_TOTAL.observe(time.perf_counter() - start)
+        except httpx.TransportError as e:
+            upstream_errors.labels(model, type(e).__name__).inc()
+            raise
+        finally:
+            connect.observe()
+            self.requests_in_flight -= 1
+
+    def pool_stats(self) -> dict:
+        """
+        Report connection pool usage for the health endpoint.
+
+        Returns:
+            Dictionary with pool limits and current connection counts
+        """
+        stats = {
+            "started": self._client is not None,
+            "http2": self.http2,
+            "maxConnections": GROQ_MAX_CONNECTIONS,
+            "maxKeepalive": GROQ_MAX_KEEPALIVE,
+            "requestsTotal": self.requests_total,
+            "requestsInFlight": self.requests_in_flight,
+        }
+
+        # httpx does not expose pool internals publicly, so read them defensively
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        stats["connections"] = len(connections)
+        stats["idleConnections"] = sum(1 for conn in connections if conn.is_idle())
+        stats["activeConnections"] = stats["connections"] - stats["idleConnections"]
+        return stats
+
+
+# Shared client instance used by all upstream calls
+groq_client = GroqClient()
@@ -0,0 +1,425 @@
+"""
+Durable job queue for long-running generation: SQLite storage drained by in-process async workers.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+from rate_limiter import backoff_delay
+from scheduler import current_priority, current_user_key, BACKGROUND
+
+# Job queue configuration
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))  # workers per backend process, 0 disables processing
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", 3600))  # seconds finished jobs are kept
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 300))  # a running job not finished by then is retried
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", 5))  # wait before the first retry, doubled per attempt
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", 300))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))  # idle workers re-check for jobs from other processes
+JOB_WEBHOOK_HOSTS = {host.strip() for host in os.getenv("JOB_WEBHOOK_HOSTS", "localhost,127.0.0.1,::1").split(",") if host.strip()}
+JOB_WEBHOOK_TIMEOUT = float(os.getenv("JOB_WEBHOOK_TIMEOUT", 5))
+JOB_WEBHOOK_ATTEMPTS = int(os.getenv("JOB_WEBHOOK_ATTEMPTS", 3))
+PURGE_INTERVAL = 60  # seconds between sweeps of expired jobs
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_COLUMNS = "id, kind, status, payload, result, error, webhook_url, webhook_status, user_key, attempts, created_at, started_at, finished_at, expires_at, available_at"
+
+
+class JobRejectedError(Exception):
+    """Raised when a job fails for a reason retrying cannot fix, e.g. invalid input."""
+
+
+def validate_webhook_url(url: str):
+    """
+    Check that a webhook points at an allowed host.
+
+    Args:
+        url: Webhook URL supplied by the client
+
+    Raises:
+        ValueError: If the URL is not http(s) or its host is not in JOB_WEBHOOK_HOSTS
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or parsed.hostname not in JOB_WEBHOOK_HOSTS:
+        raise ValueError(f"Webhook URL must be http(s) on one of: {', '.join(sorted(JOB_WEBHOOK_HOSTS))}")
+
+
+def retry_delay(attempt: int) -> float:
+    """
+    Seconds a failed job waits before it can be claimed again.
+
+    Args:
+        attempt: Attempts made so far, starting at 1
+
+    Returns:
+        JOB_RETRY_BASE_DELAY doubled per earlier attempt, at most JOB_RETRY_MAX_DELAY
+    """
+    return min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+
+
+def _row_to_job(row) -> dict:
+    """Convert a jobs row to the public job representation."""
+    (job_id, kind, status, _, result, error, webhook_url, webhook_status, _, attempts,
+     created_at, started_at, finished_at, expires_at, available_at) = row
+    job = {
+        "jobId": job_id,
+        "kind": kind,
+        "status": status,
+        "attempts": attempts,
+        "createdAt": created_at,
+        "startedAt": started_at,
+        "finishedAt": finished_at,
+        "expiresAt": expires_at,
+    }
+    if status == QUEUED and available_at is not None:
+        job["retryAt"] = available_at
+    if result is not None:
+        job["result"] = json.loads(result)
+    if error is not None:
+        job["error"] = error
+    if webhook_url:
+        job["webhookUrl"] = webhook_url
+        job["webhookStatus"] = webhook_status
+    return job
+
+
+class JobStore:
+    """
+    SQLite table of jobs, safe to share between backend processes.
+
+    Claims run in an IMMEDIATE transaction, so two workers (in this process
+    or another one on the same file) never take the same job.
+    """
+
+    def __init__(self, path: str = JOBS_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, webhook_url TEXT, webhook_status TEXT, user_key TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, lease_until REAL, expires_at REAL, available_at REAL)"
+        )
+        # Tables created before retries were delayed lack available_at
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "available_at" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN available_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires ON jobs (expires_at)")
+
+    def insert(self, kind: str, payload: dict, webhook_url: Optional[str], user_key: str) -> dict:
+        """Store a new queued job and return it."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, webhook_url, user_key, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), webhook_url, user_key, now),
+            )
+            return _row_to_job(self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self, lease_seconds: float) -> Optional[tuple]:
+        """
+        Take the oldest runnable job: queued and past its retry delay, or
+        running with an expired lease.
+
+        Returns:
+            Tuple of (id, kind, payload, user_key, attempts), or None if there is none
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, payload, user_key, attempts FROM jobs "
+                    "WHERE (status = ? AND (available_at IS NULL OR available_at <= ?)) "
+                    "OR (status = ? AND lease_until < ?) ORDER BY created_at LIMIT 1",
+                    (QUEUED, now, RUNNING, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, lease_until = ?, available_at = NULL WHERE id = ?",
+                        (RUNNING, now, now + lease_seconds, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job_id, kind, payload, user_key, attempts = row
+        return job_id, kind, json.loads(payload), user_key, attempts + 1
+
+    def finish(self, job_id: str, status: str, result: Optional[dict], error: Optional[str], ttl: float):
+        """Record the outcome of a job and start its expiry clock."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL, expires_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, now + ttl, job_id),
+            )
+
+    def requeue(self, job_id: str, error: Optional[str] = None, delay: float = 0.0):
+        """Put a claimed job back in the queue, claimable again after delay seconds."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, available_at = ? WHERE id = ?",
+                (QUEUED, error, time.time() + delay if delay > 0 else None, job_id),
+            )
+
+    def set_webhook_status(self, job_id: str, webhook_status: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET webhook_status = ? WHERE id = ?", (webhook_status, job_id))
+
+    def get(self, job_id: str, user_key: Optional[str] = None) -> Optional[dict]:
+        """Return a job that has not expired, or None; with user_key, only if that key submitted it."""
+        query = f"SELECT {_COLUMNS} FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)"
+        params = (job_id, time.time())
+        if user_key is not None:
+            query += " AND user_key = ?"
+            params += (user_key,)
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs past their TTL; returns how many were removed."""
+        with self._lock:
+            return self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of stored jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    Submit/poll jobs backed by JobStore and drained by async workers.
+
+    Handlers are registered per job kind and receive the stored payload; what
+    they return becomes the job result. Workers run their upstream calls at
+    background priority under the submitting client's fairness key, so queued
+    jobs never compete with interactive requests or the synchronous bulk
+    endpoints. A job that raises is retried up to JOB_MAX_ATTEMPTS times
+    unless it raises JobRejectedError; each retry waits retry_delay(attempt)
+    so a failing upstream is not hammered. Finished jobs
+    are kept for JOB_RESULT_TTL seconds, and their webhook, if any, is called
+    with the job.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB, workers: int = JOB_WORKERS):
+        self.db_path = db_path
+        self.workers = workers
+        self._store: Optional[JobStore] = None
+        self._handlers: Dict[str, Callable[[dict], Awaitable[dict]]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.running = 0
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.webhooks_failed = 0
+
+    def _db(self) -> JobStore:
+        """Open the store on first use."""
+        if self._store is None:
+            self._store = JobStore(self.db_path)
+        return self._store
+
+    def register(self, kind: str, handler: Callable[[dict], Awaitable[dict]]):
+        """
+        Register the coroutine function that runs jobs of a kind.
+
+        Args:
+            kind: Job kind, e.g. "generate-exercises"
+            handler: Coroutine function payload -> result
+        """
+        self._handlers[kind] = handler
+
+    async def submit(self, kind: str, payload: dict, webhook_url: Optional[str] = None) -> dict:
+        """
+        Store a job and wake a worker.
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serializable handler input
+            webhook_url: Optional URL to POST the finished job to
+
+        Returns:
+            The queued job
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind {kind}")
+        job = await asyncio.to_thread(self._db().insert, kind, payload, webhook_url, current_user_key.get())
+        self.submitted += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """
+        Look up a job that has not expired, for the client that submitted it.
+
+        Jobs are stored with the submitter's fairness key, the authenticated
+        user or else the client address, and only that key can read them back.
+        """
+        return await asyncio.to_thread(self._db().get, job_id, current_user_key.get())
+
+    def start(self):
+        """Start the workers and the expiry sweep. Safe to call more than once."""
+        if self._tasks:
+            return
+        self._db()
+        # Created lazily so the event binds to the running loop
+        self._wakeup = asyncio.Event()
+        self._client = httpx.AsyncClient(timeout=JOB_WEBHOOK_TIMEOUT)
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._purge_loop()))
+
+    async def stop(self):
+        """Stop the workers; jobs they were running go back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        """Close the store."""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    async def _worker(self):
+        """Claim and run jobs until cancelled."""
+        # Upstream calls made by jobs are background work
+        current_priority.set(BACKGROUND)
+        while True:
+            claimed = await asyncio.to_thread(self._store.claim, JOB_LEASE_SECONDS)
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(*claimed)
+
+    async def _run(self, job_id: str, kind: str, payload: dict, user_key: Optional[str], attempt: int):
+        """Run one claimed job and record its outcome."""
+        handler = self._handlers.get(kind)
+        current_user_key.set(user_key or "jobs")
+        self.running += 1
+        try:
+            if handler is None:
+                raise JobRejectedError(f"No handler for job kind {kind}")
+            result = await handler(payload)
+        except asyncio.CancelledError:
+            # Shutting down: let the next worker to start pick the job up again
+            await asyncio.shield(asyncio.to_thread(self._store.requeue, job_id))
+            raise
+        except Exception as e:
+            if isinstance(e, JobRejectedError) or attempt >= JOB_MAX_ATTEMPTS:
+                logger.warning("Job {} ({}) failed after {} attempts: {}", job_id, kind, attempt, e)
+                self.failed += 1
+                await asyncio.to_thread(self._store.finish, job_id, FAILED, None, str(e), JOB_RESULT_TTL)
+                await self._notify(job_id)
+            else:
+                delay = retry_delay(attempt)
+                logger.warning("Job {} ({}) attempt {} failed, retrying in {:.0f}s: {}", job_id, kind, attempt, delay, e)
+                self.retried += 1
+                await asyncio.to_thread(self._store.requeue, job_id, str(e), delay)
+            return
+        finally:
+            self.running -= 1
+
+        self.succeeded += 1
+        await asyncio.to_thread(self._store.finish, job_id, SUCCEEDED, result, None, JOB_RESULT_TTL)
+        await self._notify(job_id)
+
+    async def _notify(self, job_id: str):
+        """POST a finished job to its webhook, retrying with backoff."""
+        job = await asyncio.to_thread(self._store.get, job_id)
+        if job is None or not job.get("webhookUrl"):
+            return
+        status = "failed"
+        for attempt in range(JOB_WEBHOOK_ATTEMPTS):
+            try:
+                response = await self._client.post(job["webhookUrl"], json=job)
+                if response.status_code < 400:
+                    status = "delivered"
+                    break
+                status = f"failed ({response.status_code})"
+            except httpx.HTTPError as e:
+                status = f"failed ({type(e).__name__})"
+            if attempt + 1 < JOB_WEBHOOK_ATTEMPTS:
+                await asyncio.sleep(backoff_delay(attempt))
+        if status != "delivered":
+            self.webhooks_failed += 1
+            logger.warning("Webhook for job {} {}", job_id, status)
+        await asyncio.to_thread(self._store.set_webhook_status, job_id, status)
+
+    async def _purge_loop(self):
+        """Delete expired jobs periodically."""
+        while True:
+            removed = await asyncio.to_thread(self._store.purge_expired)
+            if removed:
+                logger.info("Purged {} expired jobs", removed)
+            await asyncio.sleep(PURGE_INTERVAL)
+
+    async def stats(self) -> dict:
+        """
+        Report queue counters for the health endpoint.
+
+        The per-status counts query SQLite, whose lock a worker may hold while
+        it waits on another process, so they are read off the event loop.
+
+        Returns:
+            Dictionary with worker count, stored jobs per status and counters
+        """
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "stored": await asyncio.to_thread(self._store.counts) if self._store is not None else {},
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "webhooksFailed": self.webhooks_failed,
+            "resultTtlSeconds": JOB_RESULT_TTL,
+            "retryBaseDelaySeconds": JOB_RETRY_BASE_DELAY,
+        }
+
+
+# Shared job queue used by the /jobs endpoints
+job_queue = JobQueue()
@@ -0,0 +1,214 @@
+"""
+In-process language identification from character n-gram profiles, scored with NumPy.
+"""
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from loguru import logger
+
+# Language detection configuration
+LANGUAGE_PROFILES = os.getenv("LANGUAGE_PROFILES") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "wordlists", "profiles.npz"
+)
+LANGUAGE_DETECT_MIN_CONFIDENCE = float(os.getenv("LANGUAGE_DETECT_MIN_CONFIDENCE", 0.9))  # below this "auto" is kept
+LANGUAGE_DETECT_MIN_LETTERS = int(os.getenv("LANGUAGE_DETECT_MIN_LETTERS", 4))  # shorter texts are not guessed
+LANGUAGE_DETECT_MAX_CHARS = int(os.getenv("LANGUAGE_DETECT_MAX_CHARS", 300))  # only the start of long texts is scored
+LANGUAGE_DETECT_OTHER_MARGIN = float(os.getenv("LANGUAGE_DETECT_OTHER_MARGIN", 10))  # log-odds a supported language needs over any other
+LANGUAGE_DETECT_WORD_CACHE = int(os.getenv("LANGUAGE_DETECT_WORD_CACHE", 50000))  # scored words kept in memory
+
+NGRAM_ORDERS = (1, 2, 3)
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+# Languages without a profile, recognized by their script alone
+SCRIPT_LANGUAGES = {"th": re.compile(r"[฀-๿]")}
+
+
+def ngrams(text: str) -> List[str]:
+    """
+    Character n-grams of a text, the features both profiles and inputs use.
+
+    Words are casefolded and padded with a space on each side, so n-grams
+    carry word starts and ends. Digits and punctuation are ignored.
+
+    Args:
+        text: Any text
+
+    Returns:
+        List of n-grams, with repeats
+    """
+    grams = []
+    for word in _WORD_PATTERN.findall(text.casefold()):
+        padded = f" {word} "
+        for n in NGRAM_ORDERS:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return [gram for gram in grams if gram != " "]
+
+
+class Detection(NamedTuple):
+    """Detected language of one text."""
+
+    language: str  # supported language code, or "auto" when not confident or not supported
+    confidence: float
+    best: Optional[str]  # most likely profiled language, even when not confident or not supported
+
+
+class LanguageDetector:
+    """
+    Naive Bayes language identifier over character 1-3-grams.
+
+    The profiles (wordlists/profiles.npz, built by wordlists/build_profiles.py)
+    hold a log-probability matrix of languages x n-grams, covering each
+    language's most frequent n-grams. Besides the supported languages they
+    profile every other language wordfreq covers, so text in, say, Swedish
+    matches the Swedish profile and comes back as "auto" instead of being
+    forced onto German or Dutch. Each word is scored once against every
+    language by summing the rows of its n-grams, and the vector is cached, so
+    common words cost a dictionary lookup. A text's score is the sum of its
+    word vectors; detect_batch reduces a whole batch in one NumPy call. Texts with fewer
+    than LANGUAGE_DETECT_MIN_LETTERS letters, whose posterior is below
+    LANGUAGE_DETECT_MIN_CONFIDENCE, or whose best match is an unsupported
+    language keep "auto" so the LLM decides instead of acting on a guess.
+    Closely related languages (Romanian and Spanish, Ukrainian and Russian)
+    can score close together, so a supported language must also beat every
+    unsupported one by LANGUAGE_DETECT_OTHER_MARGIN in log-likelihood.
+    Languages outside every profile can still be mistaken for a profiled one,
+    so callers must not act on a detection in ways they cannot undo. The profiles are loaded on first use.
+    """
+
+    def __init__(self, path: str = LANGUAGE_PROFILES, min_confidence: float = LANGUAGE_DETECT_MIN_CONFIDENCE):
+        self.path = path
+        self.min_confidence = min_confidence
+        self.languages: List[str] = []
+        self.supported: List[bool] = []
+        self._supported_mask: Optional[np.ndarray] = None
+        self._vocabulary: Optional[Dict[str, int]] = None
+        self._log_probs_by_ngram: Optional[np.ndarray] = None
+        self._word_cache: Dict[str, np.ndarray] = {}
+        self.detected = 0
+        self.undetermined = 0
+        self.other = 0
+
+    def load(self):
+        """Load the profiles. Safe to call more than once."""
+        if self._vocabulary is not None:
+            return
+        with np.load(self.path, allow_pickle=False) as profiles:
+            self.languages = [str(language) for language in profiles["languages"]]
+            self.supported = [bool(supported) for supported in profiles["supported"]]
+            self._supported_mask = np.array(self.supported)
+            self._vocabulary = {str(gram): index for index, gram in enumerate(profiles["ngrams"])}
+            # Stored languages x n-grams in float16 for size; scored n-grams x languages in float32
+            self._log_probs_by_ngram = np.ascontiguousarray(profiles["log_probs"].T, dtype=np.float32)
+        logger.info("Loaded language profiles for {} languages ({} supported) over {} n-grams",
+                    len(self.languages), sum(self.supported), len(self._vocabulary))
+
+    def _word_scores(self, word: str) -> np.ndarray:
+        """Summed log-probabilities of one casefolded word's n-grams under every language."""
+        scores = self._word_cache.get(word)
+        if scores is None:
+            vocabulary = self._vocabulary
+            features = [vocabulary[gram] for gram in ngrams(word) if gram in vocabulary]
+            scores = self._log_probs_by_ngram[features].sum(axis=0)
+            # Word frequencies are Zipfian, so a plain reset keeps the hit rate high
+            if len(self._word_cache) >= LANGUAGE_DETECT_WORD_CACHE:
+                self._word_cache.clear()
+            self._word_cache[word] = scores
+        return scores
+
+    def detect_batch(self, texts: List[str]) -> List[Detection]:
+        """
+        Detect the language of many texts with one vectorized reduction.
+
+        Args:
+            texts: Texts to identify
+
+        Returns:
+            One Detection per text, in order
+        """
+        self.load()
+        results: List[Optional[Detection]] = [None] * len(texts)
+        word_scores, offsets, scored = [], [], []
+        for position, text in enumerate(texts):
+            sample = text[:LANGUAGE_DETECT_MAX_CHARS]
+            words = _WORD_PATTERN.findall(sample.casefold())
+            letters = sum(map(len, words))
+            if letters < LANGUAGE_DETECT_MIN_LETTERS:
+                results[position] = Detection("auto", 0.0, None)
+                continue
+            script = next((language for language, pattern in SCRIPT_LANGUAGES.items()
+                           if pattern.search(sample) and len(pattern.findall(sample)) * 2 > letters), None)
+            if script:
+                results[position] = Detection(script, 1.0, script)
+                continue
+            offsets.append(len(word_scores))
+            word_scores.extend(self._word_scores(word) for word in words)
+            scored.append(position)
+
+        if scored:
+            # Per-text sums of word scores, then a softmax over languages, for the whole batch at once
+            scores = np.add.reduceat(np.array(word_scores), offsets, axis=0)
+            mask = self._supported_mask
+            other_margin = scores[:, mask].max(axis=1) - (scores[:, ~mask].max(axis=1) if (~mask).any() else -np.inf)
+            scores -= scores.max(axis=1, keepdims=True)
+            posteriors = np.exp(scores)
+            posteriors /= posteriors.sum(axis=1, keepdims=True)
+            best = posteriors.argmax(axis=1)
+            for row, position in enumerate(scored):
+                language = self.languages[best[row]]
+                confidence = round(float(posteriors[row, best[row]]), 4)
+                # Text in, or too close to, an unsupported language is left to the LLM
+                if not self.supported[best[row]] or other_margin[row] < LANGUAGE_DETECT_OTHER_MARGIN:
+                    self.other += 1
+                    results[position] = Detection("auto", confidence, language)
+                    continue
+                # Texts with no known n-gram score evenly and stay below any useful threshold
+                results[position] = Detection(language if confidence >= self.min_confidence else "auto", confidence, language)
+
+        for detection in results:
+            if detection.language == "auto":
+                self.undetermined += 1
+            else:
+                self.detected += 1
+        return results
+
+    def detect(self, text: str) -> Detection:
+        """
+        Detect the language of one text.
+
+        Args:
+            text: Text to identify
+
+        Returns:
+            Detection with the language code, or "auto" when not confident
+        """
+        return self.detect_batch([text])[0]
+
+    def resolve(self, language: Optional[str], text: str) -> str:
+        """The given language code, or the detected one when it is "auto" or empty."""
+        if language and language != "auto":
+            return language
+        return self.detect(text).language
+
+    def stats(self) -> dict:
+        """
+        Report detection counters for the health endpoint.
+
+        Returns:
+            Dictionary with profile size and detected/undetermined/other counts
+        """
+        return {
+            "languages": [language for language, supported in zip(self.languages, self.supported) if supported],
+            "otherLanguages": [language for language, supported in zip(self.languages, self.supported) if not supported],
+            "ngrams": len(self._vocabulary) if self._vocabulary is not None else 0,
+            "detected": self.detected,
+            "undetermined": self.undetermined,
+            "other": self.other,
+            "minConfidence": self.min_confidence,
+            "otherMargin": LANGUAGE_DETECT_OTHER_MARGIN,
+        }
+
+
+# Shared detector used for "auto" source languages and unlabelled chat messages
+language_detector = LanguageDetector()
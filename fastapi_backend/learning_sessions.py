@@ -0,0 +1,329 @@
+"""
+Write-behind persistence of learning sessions, flushed to storage in batches.
+"""
+import os
+import json
+import uuid
+import asyncio
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+from loguru import logger
+
+from sqlite_pool import SQLitePool
+
+# Learning session storage configuration
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")  # sqlite, memory, none
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+SESSION_DB_POOL_SIZE = int(os.getenv("SESSION_DB_POOL_SIZE", 2))
+SESSION_BATCH_SIZE = int(os.getenv("SESSION_BATCH_SIZE", 100))  # rows per insert; a full batch flushes at once
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", 1))  # seconds a row may wait for a partial batch
+SESSION_MAX_PENDING = int(os.getenv("SESSION_MAX_PENDING", 10000))  # buffered rows before new ones are dropped
+SESSION_RECENT_MAX = int(os.getenv("SESSION_RECENT_MAX", 100))  # largest page of recent sessions
+
+# Columns of the learning_sessions table, as in database/setup_learning_hub_tables.sql
+COLUMNS = (
+    "id", "user_id", "text", "user_language", "target_language",
+    "proficiency_level", "focus_area", "suggestions", "created_at",
+)
+
+
+class SessionRepository(ABC):
+    """
+    Interface for learning session storage.
+
+    Rows are dicts keyed by COLUMNS, with suggestions as a JSON string and
+    created_at as an ISO-8601 UTC timestamp, so they map one-to-one onto the
+    Supabase learning_sessions table.
+    """
+
+    @abstractmethod
+    async def insert_many(self, rows: List[dict]):
+        """Insert a batch of rows in one transaction."""
+
+    @abstractmethod
+    async def recent(self, user_id: str, limit: int) -> List[dict]:
+        """A user's most recent rows, newest first."""
+
+    def close(self):
+        """Release any resources held by the repository."""
+
+
+class InMemorySessionRepository(SessionRepository):
+    """Process-local repository, for development and tests."""
+
+    def __init__(self):
+        self._rows: List[dict] = []
+
+    async def insert_many(self, rows: List[dict]):
+        self._rows.extend(dict(row) for row in rows)
+
+    async def recent(self, user_id: str, limit: int) -> List[dict]:
+        rows = [row for row in self._rows if row["user_id"] == user_id]
+        rows.sort(key=lambda row: row["created_at"], reverse=True)
+        return [dict(row) for row in rows[:limit]]
+
+
+class SQLiteSessionRepository(SessionRepository):
+    """
+    SQLite-backed repository shared by every worker process.
+
+    Queries go through a SQLitePool. Batches are written with one executemany
+    per transaction, and recent-session reads are served by an index on
+    (user_id, created_at).
+    """
+
+    def __init__(self, path: str = SESSION_DB, pool_size: int = SESSION_DB_POOL_SIZE):
+        self.path = path
+        self._pool = SQLitePool(path, pool_size, "session-db", (
+            "CREATE TABLE IF NOT EXISTS learning_sessions ("
+            "id TEXT PRIMARY KEY, "
+            "user_id TEXT NOT NULL, "
+            "text TEXT NOT NULL, "
+            "user_language TEXT NOT NULL, "
+            "target_language TEXT NOT NULL, "
+            "proficiency_level TEXT NOT NULL, "
+            "focus_area TEXT NOT NULL, "
+            "suggestions TEXT NOT NULL, "
+            "created_at TEXT NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_learning_sessions_user_created "
+            "ON learning_sessions (user_id, created_at)",
+        ))
+
+    async def insert_many(self, rows: List[dict]):
+        def insert(conn):
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    f"INSERT INTO learning_sessions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [tuple(row[column] for column in COLUMNS) for row in rows],
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+        await self._pool.run(insert)
+
+    async def recent(self, user_id: str, limit: int) -> List[dict]:
+        rows = await self._pool.run(
+            lambda conn: conn.execute(
+                "SELECT * FROM learning_sessions WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+            ).fetchall()
+        )
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self._pool.close()
+
+
+def create_session_repository() -> Optional[SessionRepository]:
+    """
+    Build the repository selected by SESSION_STORE.
+
+    Returns:
+        A SessionRepository instance, or None when sessions are not stored
+    """
+    if SESSION_STORE == "none":
+        return None
+    if SESSION_STORE == "memory":
+        return InMemorySessionRepository()
+    return SQLiteSessionRepository()
+
+
+def _to_api(row: dict) -> dict:
+    """Convert a stored row into the camelCase shape the API returns."""
+    return {
+        "id": row["id"],
+        "text": row["text"],
+        "userLanguage": row["user_language"],
+        "targetLanguage": row["target_language"],
+        "proficiencyLevel": row["proficiency_level"],
+        "focusArea": row["focus_area"],
+        "suggestions": json.loads(row["suggestions"]),
+        "createdAt": row["created_at"],
+    }
+
+
+class SessionWriter:
+    """
+    Write-behind buffer in front of a SessionRepository.
+
+    record() only appends to an in-process buffer, so the request path never
+    waits on the database. A background task writes the buffer in batches of
+    SESSION_BATCH_SIZE, as soon as a batch is full or after
+    SESSION_FLUSH_INTERVAL seconds, whichever comes first. A failed batch goes
+    back to the front of the buffer and is retried on the next flush. When
+    SESSION_MAX_PENDING rows are already waiting, new rows are dropped and
+    counted rather than growing memory without bound. Rows not yet written
+    are still returned by recent().
+    """
+
+    def __init__(self, repository: Optional[SessionRepository] = None, batch_size: int = SESSION_BATCH_SIZE,
+                 flush_interval: float = SESSION_FLUSH_INTERVAL, max_pending: int = SESSION_MAX_PENDING):
+        self._repository = repository
+        self._opened = repository is not None
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Deque[dict] = deque()
+        self._writing: List[dict] = []
+        self._flush_now: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed_flushes = 0
+
+    def _repo(self) -> Optional[SessionRepository]:
+        """Open the repository on first use."""
+        if not self._opened:
+            self._repository = create_session_repository()
+            self._opened = True
+        return self._repository
+
+    @property
+    def enabled(self) -> bool:
+        """Whether sessions are stored at all."""
+        return self._repo() is not None
+
+    def record(self, user_id: str, text: str, user_language: str, target_language: str,
+               proficiency_level: str, focus_area: str, suggestions: dict):
+        """
+        Buffer one learning session for writing. Never blocks.
+
+        Args:
+            user_id: Id of the authenticated user
+            text: Text the suggestions were generated for
+            user_language: User's native language
+            target_language: Language being learned
+            proficiency_level: User's proficiency level
+            focus_area: Area the suggestions focus on
+            suggestions: Parsed learning suggestions
+        """
+        if not self.enabled:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+
+        self._pending.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "text": text,
+            "user_language": user_language,
+            "target_language": target_language,
+            "proficiency_level": proficiency_level,
+            "focus_area": focus_area,
+            "suggestions": json.dumps(suggestions, ensure_ascii=False),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+        self.recorded += 1
+        # A full batch is written right away instead of waiting for the interval
+        if len(self._pending) >= self.batch_size and self._flush_now is not None:
+            self._flush_now.set()
+
+    async def recent(self, user_id: str, limit: int) -> List[dict]:
+        """
+        A user's most recent learning sessions, newest first, including unflushed ones.
+
+        Args:
+            user_id: Id of the authenticated user
+            limit: Maximum number of sessions, capped at SESSION_RECENT_MAX
+
+        Returns:
+            List of sessions in the API's camelCase shape
+        """
+        if not self.enabled:
+            return []
+        limit = max(1, min(limit, SESSION_RECENT_MAX))
+
+        # Rows still buffered or being written are newer than anything stored
+        rows = [row for row in list(self._pending) + self._writing if row["user_id"] == user_id]
+        rows.extend(await self._repository.recent(user_id, limit))
+
+        # A batch that committed during the read can show up twice
+        unique = {row["id"]: row for row in rows}
+        newest = sorted(unique.values(), key=lambda row: row["created_at"], reverse=True)
+        return [_to_api(row) for row in newest[:limit]]
+
+    async def flush(self):
+        """Write everything buffered so far, one batch at a time."""
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            self._writing = batch
+            try:
+                await self._repository.insert_many(batch)
+            except Exception as e:
+                # Keep the rows, oldest first, for the next flush
+                self._pending.extendleft(reversed(batch))
+                self.failed_flushes += 1
+                logger.error("Writing {} learning sessions failed: {}", len(batch), e)
+                return
+            finally:
+                self._writing = []
+            self.written += len(batch)
+            self.batches += 1
+
+    async def _flush_loop(self):
+        """Flush when a batch fills up or the interval passes, until stopped."""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the background flusher. Safe to call more than once."""
+        if self._task is not None or not self.enabled:
+            return
+        # Created lazily so the event binds to the running loop
+        self._flush_now = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher after writing out everything still buffered."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._flush_now.set()
+        await self._task
+        self._task = None
+        await self.flush()
+        if self._pending:
+            logger.warning("Dropping {} unwritten learning sessions at shutdown", len(self._pending))
+
+    def close(self):
+        """Close the repository."""
+        if self._repository is not None:
+            self._repository.close()
+
+    def stats(self) -> dict:
+        """
+        Report buffer counters for the health endpoint.
+
+        Returns:
+            Dictionary with the store, buffer size and write counters
+        """
+        return {
+            "store": SESSION_STORE,
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failedFlushes": self.failed_flushes,
+            "batchSize": self.batch_size,
+            "flushIntervalSeconds": self.flush_interval,
+        }
+
+
+# Shared writer used by /learning-suggestions and /learning-sessions/recent
+session_writer = SessionWriter()
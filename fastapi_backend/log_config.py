@@ -0,0 +1,145 @@
+"""
+Structured, queued logging on loguru with request-id correlation and sampled payload logging.
+"""
+import os
+import sys
+import json
+import uuid
+import random
+import logging
+import contextvars
+from typing import Any
+
+from loguru import logger
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_JSON = os.getenv("LOG_JSON", "false").lower() in ("1", "true", "yes")  # one JSON object per line
+LOG_FILE = os.getenv("LOG_FILE", "logs/backend.log")  # empty disables the file sink
+LOG_ROTATION = os.getenv("LOG_ROTATION", "10 MB")
+LOG_RETENTION = os.getenv("LOG_RETENTION", "7 days")
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0.01))  # share of prompts/responses logged at DEBUG
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", 2000))
+
+# Library loggers that log every upstream call or form field below WARNING
+QUIET_LOGGERS = ("httpx", "httpcore", "hpack", "multipart")
+
+LOG_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<yellow>{extra[request_id]}</yellow> | <cyan>{name}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+
+# Request id of the HTTP request being handled, "-" outside requests
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+_payloads_enabled = False
+
+
+def _add_request_id(record: dict):
+    """Patcher stamping every record with the current request id."""
+    record["extra"]["request_id"] = request_id.get()
+
+
+class InterceptHandler(logging.Handler):
+    """Route standard-library logging (uvicorn, httpx) into loguru."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        # Find the caller outside the logging module so name and line are right
+        frame, depth = sys._getframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+def configure_logging():
+    """
+    Replace loguru's default sink with queued console and file sinks.
+
+    Sinks use enqueue=True, so records are written by a background thread and
+    the event loop never blocks on stdout or disk. Standard-library loggers,
+    including uvicorn's, are routed through the same sinks.
+    """
+    global _payloads_enabled
+
+    logger.remove()
+    logger.configure(extra={"request_id": "-"}, patcher=_add_request_id)
+    logger.add(sys.stderr, level=LOG_LEVEL, format=LOG_FORMAT, serialize=LOG_JSON, enqueue=True, backtrace=False)
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        logger.add(
+            LOG_FILE, level=LOG_LEVEL, format=LOG_FORMAT, serialize=LOG_JSON, enqueue=True, backtrace=False,
+            rotation=LOG_ROTATION, retention=LOG_RETENTION, colorize=False
+        )
+
+    # The root level filters stdlib records before they reach loguru, so httpx debug chatter is dropped early
+    logging.basicConfig(handlers=[InterceptHandler()], level=logger.level(LOG_LEVEL).no, force=True)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    # Per-request chatter from client and parser libraries stays out of the logs
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _payloads_enabled = LOG_PAYLOAD_SAMPLE_RATE > 0 and logger.level(LOG_LEVEL).no <= logger.level("DEBUG").no
+
+
+def log_payload(label: str, payload: Any):
+    """
+    Log a prompt or upstream response at DEBUG, for a sample of calls only.
+
+    Nothing is formatted unless DEBUG is enabled and the call is sampled, so
+    large payloads cost nothing on the hot path by default.
+
+    Args:
+        label: What the payload is, e.g. "Groq response"
+        payload: String or JSON-serializable object
+    """
+    if not _payloads_enabled or random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = f"{text[:LOG_PAYLOAD_MAX_CHARS]}... ({len(text)} chars)"
+    logger.opt(depth=1).debug("{}: {}", label, text)
+
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware assigning each request an id for log correlation.
+
+    A client-supplied X-Request-ID is reused so ids can be followed across
+    services; otherwise a new one is generated. The id is echoed back in the
+    X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = None
+        for name, header in scope["headers"]:
+            if name == b"x-request-id":
+                value = header.decode("latin-1")[:64]
+                break
+        value = value or uuid.uuid4().hex
+        encoded = value.encode("latin-1")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", encoded)]
+            await send(message)
+
+        token = request_id.set(value)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
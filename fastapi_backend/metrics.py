@@ -0,0 +1,454 @@
+"""
+Prometheus-style metrics: counters, histograms and scrape-time gauges with text exposition.
+
+Kept in-repo instead of depending on prometheus_client. Label children are
+created once and cached by their label values, so the hot path is a tuple
+lookup, a bisect and two additions; gauges are read from the components'
+own counters only when /metrics is scraped.
+"""
+import os
+import time
+import asyncio
+import functools
+import contextvars
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from loguru import logger
+
+# Metrics configuration
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "polylingo")
+METRICS_LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", 0.1))  # seconds between lag probes, 0 disables
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow upstream calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Content type of the Prometheus text exposition format (Starlette appends the charset)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    """Escape a label value; non-string values such as status codes are formatted first."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a {name="value",...} label set."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    """One labelled counter series."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class _HistogramChild:
+    """One labelled histogram series; bucket counts are stored non-cumulatively."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def observe_since(self, start: float):
+        """Observe the seconds elapsed since a time.perf_counter() reading."""
+        self.observe(time.perf_counter() - start)
+
+
+class _Family(ABC):
+    """
+    A named metric with a fixed set of label names.
+
+    Subclasses set kind, which goes into the TYPE line, and render their own
+    sample lines under header().
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Exposition lines of the family, header first."""
+
+
+class _ChildFamily(_Family):
+    """A family whose series are stored in-process as children cached by label values."""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    @abstractmethod
+    def _new_child(self):
+        """Create the series for one set of label values."""
+
+    def labels(self, *values: str):
+        """
+        Get the series for a set of label values, creating it on first use.
+
+        Args:
+            *values: One value per label name, in order; any hashable value works
+
+        Returns:
+            The child series
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}")
+            child = self._children[values] = self._new_child()
+        return child
+
+
+class Counter(_ChildFamily):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, child in self._children.items():
+            lines.append(f"{self.name}_total{_label_text(self.label_names, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Histogram(_ChildFamily):
+    """Distribution of observations over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                labels = _label_text(self.label_names, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Gauge(_Family):
+    """Current value read from a callback at scrape time, so it costs nothing per request."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        super().__init__(name, documentation, label_names)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, value in self.collect():
+            lines.append(f"{self.name}{_label_text(self.label_names, values)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Every metric family the app exposes, in registration order."""
+
+    def __init__(self):
+        self._families: List[_Family] = []
+
+    def register(self, family: _Family) -> _Family:
+        self._families.append(family)
+        return family
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge(self, name: str, documentation: str, label_names: Tuple[str, ...], collect) -> Gauge:
+        return self.register(Gauge(name, documentation, label_names, collect))
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            The scrape body
+        """
+        lines = []
+        for family in self._families:
+            try:
+                lines.extend(family.render())
+            except Exception as e:
+                # A broken gauge callback must not take down the whole scrape
+                logger.warning("Failed to collect {}: {}", family.name, e)
+        lines.append("")
+        return "\n".join(lines)
+
+
+def timed(child: _HistogramChild):
+    """
+    Decorate a function so each call's duration is observed in a histogram series.
+
+    Works for plain and async functions.
+
+    Args:
+        child: Histogram series to observe into
+
+    Returns:
+        The decorator
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# When the current route handler started, before the body was read and validated
+_handler_started: contextvars.ContextVar[float] = contextvars.ContextVar("handler_started", default=0.0)
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that times request parsing and validation.
+
+    The "validation" stage runs from the route handler starting (before the
+    body is read) to the endpoint function being called, which covers body
+    parsing, pydantic validation and dependency resolution. Only async
+    endpoints are timed, so sync ones keep running in the threadpool.
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def endpoint(**values):
+                started = _handler_started.get()
+                if started:
+                    STAGE_VALIDATION.observe(time.perf_counter() - started)
+                return await call(**values)
+            self.dependant.call = endpoint
+
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            token = _handler_started.set(time.perf_counter())
+            try:
+                return await handler(request)
+            finally:
+                _handler_started.reset(token)
+        return timed_handler
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware counting HTTP requests by route and status and timing them.
+
+    Routes with path parameters are reported by their template, e.g.
+    /jobs/{job_id}, and paths that are not app routes as "unmatched", so
+    client-chosen URLs cannot blow up the number of series.
+    """
+
+    # Requests currently being handled, across instances
+    in_flight = 0
+
+    def __init__(self, app):
+        self.app = app
+        self.routes: Optional[set] = None
+        self.templates: list = []
+
+    def _route_label(self, path: str) -> str:
+        if path in self.routes:
+            return path
+        for pattern, template in self.templates:
+            if pattern.match(path):
+                return template
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Routes are all declared by the first request, so read them once from the app
+        if self.routes is None:
+            routes = [route for route in scope["app"].routes if hasattr(route, "path_regex")]
+            self.templates = [(route.path_regex, route.path) for route in routes if "{" in route.path]
+            self.routes = {route.path for route in routes if "{" not in route.path}
+        route = self._route_label(scope["path"])
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        MetricsMiddleware.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            MetricsMiddleware.in_flight -= 1
+            http_requests.labels(route, status).inc()
+            http_request_seconds.labels(route).observe(time.perf_counter() - start)
+
+
+# Shared registry and the app's metric families
+metrics_registry = MetricsRegistry()
+
+http_requests = metrics_registry.counter("http_requests", "HTTP requests by route and status code.", ("route", "status"))
+http_request_seconds = metrics_registry.histogram("http_request_seconds", "HTTP request duration by route.", ("route",))
+stage_seconds = metrics_registry.histogram("stage_seconds", "Duration of each request-handling stage.", ("stage",))
+upstream_responses = metrics_registry.counter("upstream_responses", "Upstream responses by model and status code.", ("model", "status"))
+upstream_errors = metrics_registry.counter("upstream_errors", "Upstream calls that failed without a response, by model and error type.", ("model", "error"))
+event_loop_lag_seconds = metrics_registry.histogram(
+    "event_loop_lag_seconds", "How late a scheduled wake-up ran, i.e. how long the event loop was blocked.", (),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+upstream_tokens = metrics_registry.counter("upstream_tokens", "Tokens reported in the upstream usage field, by model and kind.", ("model", "kind"))
+sentence_analyses = metrics_registry.counter(
+    "sentence_analyses", "Sentence analyses by where they were answered and why they escalated to the LLM.", ("source", "reason")
+)
+
+# Stage series bound once at import so the hot path never builds label tuples
+STAGE_VALIDATION = stage_seconds.labels("validation")
+STAGE_PROMPT_BUILD = stage_seconds.labels("prompt_build")
+STAGE_CACHE_LOOKUP = stage_seconds.labels("cache_lookup")
+STAGE_SCHEDULER_WAIT = stage_seconds.labels("scheduler_wait")
+STAGE_LIMITER_WAIT = stage_seconds.labels("limiter_wait")
+STAGE_UPSTREAM_CONNECT = stage_seconds.labels("upstream_connect")
+STAGE_UPSTREAM_TTFB = stage_seconds.labels("upstream_ttfb")
+STAGE_UPSTREAM_TOTAL = stage_seconds.labels("upstream_total")
+STAGE_JSON_PARSE = stage_seconds.labels("json_parse")
+
+
+def record_usage(model: Optional[str], usage: dict):
+    """
+    Count the tokens of one completion from its usage field.
+
+    Args:
+        model: Model that produced the completion
+        usage: The response's usage object
+    """
+    model = model or "unknown"
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = usage.get(kind)
+        if tokens:
+            upstream_tokens.labels(model, kind[:-len("_tokens")]).inc(tokens)
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _memory_gauge():
+    memory = resident_memory_bytes()
+    return [((), memory)] if memory is not None else []
+
+
+metrics_registry.gauge("process_resident_memory_bytes", "Resident memory of this worker process.", (), _memory_gauge)
+
+
+class LoopLagMonitor:
+    """
+    Background task measuring event-loop lag.
+
+    Sleeps METRICS_LOOP_LAG_INTERVAL at a time and records how much later
+    than requested it woke up. Any blocking call on the loop shows up here.
+    """
+
+    def __init__(self, interval: float = METRICS_LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._series = event_loop_lag_seconds.labels()
+
+    async def _probe(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._series.observe(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        """Start probing on the running loop. Safe to call more than once."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def stop(self):
+        """Stop probing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Shared monitor started with the app
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,248 @@
+"""
+Per-task model routing with fallback chains and hedged upstream requests.
+"""
+import os
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional
+
+from groq_client import GROQ_API_URL, GROQ_MODEL
+
+# Model tiers; both default to the Groq endpoint
+MODEL_FAST = os.getenv("MODEL_FAST", GROQ_MODEL)  # scoring, translation, summaries
+MODEL_LARGE = os.getenv("MODEL_LARGE", "llama3-70b-8192")  # grammar breakdowns, long inputs
+MODEL_LARGE_INPUT_TOKENS = int(os.getenv("MODEL_LARGE_INPUT_TOKENS", 2000))  # fast-tier prompts above this go large
+
+# Optional last-resort fallback, e.g. another provider with an OpenAI-compatible API
+MODEL_FALLBACK = os.getenv("MODEL_FALLBACK", "")
+MODEL_FALLBACK_API_URL = os.getenv("MODEL_FALLBACK_API_URL", GROQ_API_URL)
+MODEL_FALLBACK_API_KEY_ENV = os.getenv("MODEL_FALLBACK_API_KEY_ENV", "GROQ_API_KEY")  # env var holding its key
+
+# Task to tier overrides, e.g. "exercises=large,learning=fast"
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "")
+
+# Hedging: duplicate a request once it runs past this latency percentile (0 disables)
+MODEL_HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", 0))
+MODEL_HEDGE_MIN_SAMPLES = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", 20))
+LATENCY_SAMPLES = 200  # recent latencies kept per model
+
+# Default tier per task
+DEFAULT_TASK_TIERS = {
+    "analysis": "fast",
+    "summary": "fast",
+    "translation": "fast",
+    "learning": "fast",
+    "exercises": "fast",
+    "scoring": "fast",
+    "grammar": "large",
+}
+
+
+class ModelTarget(NamedTuple):
+    """One model on one OpenAI-compatible endpoint."""
+
+    model: str
+    url: str = GROQ_API_URL
+    api_key_env: str = "GROQ_API_KEY"
+
+    def api_key(self) -> Optional[str]:
+        """Read the key at call time so rotated keys are picked up."""
+        return os.getenv(self.api_key_env)
+
+
+def _parse_routes(spec: str) -> Dict[str, str]:
+    """Parse "task=tier,task=tier" overrides."""
+    routes = {}
+    for item in spec.split(","):
+        task, _, tier = item.partition("=")
+        if task.strip() and tier.strip() in ("fast", "large"):
+            routes[task.strip()] = tier.strip()
+    return routes
+
+
+class _ModelStats:
+    """Latency window and counters for one model target."""
+
+    __slots__ = ("latencies", "requests", "failures")
+
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.requests = 0
+        self.failures = 0
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Latency at the given percentile of the window, in seconds."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class ModelRouter:
+    """
+    Choose the model chain for each call and race hedged duplicates.
+
+    Each task maps to a fast or large tier; prompts too long for the fast tier
+    are promoted to the large one. The chain continues with the other tier and
+    then the optional fallback provider, so a failed or timed-out call moves
+    down the chain instead of retrying a struggling model. When hedging is
+    enabled, a call that runs past the model's latency percentile gets a
+    duplicate on the next target and the first good response wins.
+    """
+
+    def __init__(
+        self,
+        fast: ModelTarget = ModelTarget(MODEL_FAST),
+        large: ModelTarget = ModelTarget(MODEL_LARGE),
+        fallback: Optional[ModelTarget] = ModelTarget(MODEL_FALLBACK, MODEL_FALLBACK_API_URL, MODEL_FALLBACK_API_KEY_ENV) if MODEL_FALLBACK else None,
+        task_tiers: Optional[Dict[str, str]] = None,
+        large_input_tokens: int = MODEL_LARGE_INPUT_TOKENS,
+        hedge_percentile: float = MODEL_HEDGE_PERCENTILE,
+        hedge_min_samples: int = MODEL_HEDGE_MIN_SAMPLES,
+    ):
+        self.tiers = {"fast": fast, "large": large}
+        self.fallback = fallback
+        self.task_tiers = {**DEFAULT_TASK_TIERS, **(task_tiers if task_tiers is not None else _parse_routes(MODEL_ROUTES))}
+        self.large_input_tokens = large_input_tokens
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._stats: Dict[ModelTarget, _ModelStats] = {}
+        self.fallbacks = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    def route(self, task: str, prompt_tokens: int = 0) -> List[ModelTarget]:
+        """
+        Pick the model chain for a call.
+
+        Args:
+            task: Task name, e.g. "analysis", "translation" or "grammar"
+            prompt_tokens: Estimated prompt size
+
+        Returns:
+            Targets to try in order, primary first
+        """
+        tier = self.task_tiers.get(task, "fast")
+        if tier == "fast" and self.large_input_tokens and prompt_tokens > self.large_input_tokens:
+            tier = "large"
+        other = "large" if tier == "fast" else "fast"
+
+        chain = []
+        for target in (self.tiers[tier], self.tiers[other], self.fallback):
+            if target is not None and target.model and target not in chain:
+                chain.append(target)
+        return chain
+
+    def _model_stats(self, target: ModelTarget) -> _ModelStats:
+        stats = self._stats.get(target)
+        if stats is None:
+            stats = self._stats[target] = _ModelStats()
+        return stats
+
+    def record(self, target: ModelTarget, seconds: float, ok: bool):
+        """
+        Record the outcome of one upstream call.
+
+        Args:
+            target: Target that was called
+            seconds: Time until the response arrived
+            ok: Whether the response was usable
+        """
+        stats = self._model_stats(target)
+        stats.requests += 1
+        if ok:
+            stats.latencies.append(seconds)
+        else:
+            stats.failures += 1
+
+    def hedge_delay(self, target: ModelTarget) -> Optional[float]:
+        """Seconds after which to hedge a call to target, or None to not hedge."""
+        if self.hedge_percentile <= 0:
+            return None
+        stats = self._stats.get(target)
+        if stats is None or len(stats.latencies) < self.hedge_min_samples:
+            return None
+        return stats.percentile(self.hedge_percentile)
+
+    async def hedged(self, chain: List[ModelTarget], send: Callable[[ModelTarget], Awaitable]):
+        """
+        Call the first target, hedging onto the next one if it runs slow.
+
+        Args:
+            chain: Targets in order of preference
+            send: Coroutine function target -> httpx response
+
+        Returns:
+            Tuple of (target that answered, its response): the first good
+            response, or the primary's if none was good
+
+        Raises:
+            Exception: The primary's exception if no call produced a response
+        """
+        primary = asyncio.ensure_future(send(chain[0]))
+        delay = self.hedge_delay(chain[0])
+        if delay is None:
+            return chain[0], await primary
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            return chain[0], primary.result()
+
+        # Race a duplicate on the next target, or the same one if there is no other
+        self.hedges += 1
+        hedge_target = chain[1] if len(chain) > 1 else chain[0]
+        hedge = asyncio.ensure_future(send(hedge_target))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.exception() and task.result().status_code < 400:
+                        if task is hedge:
+                            self.hedges_won += 1
+                            return hedge_target, task.result()
+                        return chain[0], task.result()
+            return chain[0], primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            # Retrieve the loser's exception so it is not reported as unhandled
+            for task in (primary, hedge):
+                if task.done() and not task.cancelled():
+                    task.exception()
+
+    def stats(self) -> dict:
+        """
+        Report routing and hedging counters for the health endpoint.
+
+        Returns:
+            Dictionary with tier models, per-model latency and fallback/hedge counts
+        """
+        models = {}
+        for target, stats in self._stats.items():
+            p50 = stats.percentile(50)
+            p95 = stats.percentile(95)
+            models[target.model] = {
+                "requests": stats.requests,
+                "failures": stats.failures,
+                "p50Ms": round(p50 * 1000) if p50 is not None else None,
+                "p95Ms": round(p95 * 1000) if p95 is not None else None,
+            }
+        return {
+            "fast": self.tiers["fast"].model,
+            "large": self.tiers["large"].model,
+            "fallback": self.fallback.model if self.fallback else None,
+            "hedgePercentile": self.hedge_percentile or None,
+            "fallbacks": self.fallbacks,
+            "hedges": self.hedges,
+            "hedgesWon": self.hedges_won,
+            "models": models,
+        }
+
+
+# Shared router used by every upstream call
+model_router = ModelRouter()
@@ -0,0 +1,271 @@
+"""
+OCR on a bounded process pool: Pillow preprocessing and Tesseract outside the event loop.
+"""
+import io
+import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from PIL import Image, ImageOps
+import pytesseract
+from loguru import logger
+
+# OCR configuration
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", 10))  # seconds per image, enforced on the tesseract process
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "eng")  # default for requests, and the only codes they may ask for
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", 0)) or OCR_WORKERS * 4  # queued plus running images
+OCR_QUEUE_TIMEOUT = float(os.getenv("OCR_QUEUE_TIMEOUT", 5))
+OCR_MAX_UPLOAD_BYTES = int(os.getenv("OCR_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", 2000))  # longest side after downscaling, in pixels
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "true").lower() in ("1", "true", "yes")
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class OcrError(Exception):
+    """Raised when an image cannot be read or contains no text."""
+
+
+class OcrBusyError(Exception):
+    """Raised when the OCR queue stays full past OCR_QUEUE_TIMEOUT."""
+
+
+class OcrWorkerError(Exception):
+    """Raised when the worker process running an image died, e.g. killed for memory."""
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds OCR_MAX_UPLOAD_BYTES."""
+
+
+class OcrLanguageError(Exception):
+    """Raised when a request asks for a Tesseract language outside OCR_LANGUAGES."""
+
+
+def check_languages(languages: str, allowed: str = OCR_LANGUAGES) -> str:
+    """
+    Validate a client's Tesseract language string before it reaches the command line.
+
+    Args:
+        languages: Codes joined by "+", e.g. "eng+spa"
+        allowed: Codes the server offers, in the same form
+
+    Returns:
+        The validated language string
+
+    Raises:
+        OcrLanguageError: If any code is not in allowed
+    """
+    offered = set(allowed.split("+"))
+    # An empty string or a stray "+" yields an empty code, which is never offered
+    if any(code not in offered for code in languages.split("+")):
+        raise OcrLanguageError(f"Unsupported OCR language, choose from: {', '.join(sorted(offered))}")
+    return languages
+
+
+def preprocess_image(data: bytes, max_side: int = OCR_MAX_SIDE, binarize: bool = OCR_BINARIZE) -> Image.Image:
+    """
+    Decode and clean up an image for OCR.
+
+    JPEG images are decoded directly at reduced scale via draft mode, so a
+    12 MP photo never materializes at full size. The image is converted to
+    grayscale, downscaled to max_side, contrast-stretched and optionally
+    binarized with a fixed threshold.
+
+    Args:
+        data: Encoded image bytes
+        max_side: Longest side after downscaling
+        binarize: Whether to convert to pure black and white
+
+    Returns:
+        Preprocessed grayscale or bilevel image
+    """
+    image = Image.open(io.BytesIO(data))
+    image.draft("L", (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    image = ImageOps.autocontrast(image, cutoff=1)
+    if binarize:
+        image = image.point(lambda value: 255 if value > 140 else 0, mode="1")
+    return image
+
+
+def _ocr_worker(data: bytes, languages: str, max_side: int, binarize: bool, timeout: float) -> dict:
+    """Preprocess and OCR one image; runs in a pool process."""
+    start = time.perf_counter()
+    try:
+        image = preprocess_image(data, max_side, binarize)
+    except Exception as e:
+        raise OcrError(f"Unreadable image: {e}") from None
+    preprocessed = time.perf_counter()
+
+    try:
+        text = pytesseract.image_to_string(image, lang=languages, timeout=timeout)
+    except RuntimeError as e:
+        # pytesseract signals its timeout with a RuntimeError
+        raise OcrError(f"OCR failed: {e}") from None
+    except pytesseract.TesseractError as e:
+        raise OcrError(f"OCR failed: {e.message}") from None
+    except pytesseract.TesseractNotFoundError:
+        raise OcrError("Tesseract is not installed") from None
+
+    return {
+        "text": " ".join(text.split()),
+        "width": image.width,
+        "height": image.height,
+        "preprocessMs": round((preprocessed - start) * 1000),
+        "ocrMs": round((time.perf_counter() - preprocessed) * 1000),
+    }
+
+
+async def read_upload(upload, max_bytes: int = OCR_MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Read an uploaded file in chunks, stopping as soon as it is too large.
+
+    Args:
+        upload: FastAPI UploadFile
+        max_bytes: Size limit
+
+    Returns:
+        The file contents
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds max_bytes
+    """
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return bytes(buffer)
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise UploadTooLargeError(f"Image exceeds {max_bytes} bytes")
+
+
+class OcrPool:
+    """
+    Process pool for OCR with a bounded queue.
+
+    Pillow and Tesseract are CPU-bound, so they run in OCR_WORKERS spawned
+    processes. At most OCR_MAX_PENDING images are admitted at once; further
+    requests wait up to OCR_QUEUE_TIMEOUT and are then rejected instead of
+    building an unbounded backlog. If a worker process dies, the executor is
+    broken for good: the images it was running fail with OcrWorkerError, and
+    the executor is replaced so later requests get a fresh pool.
+    """
+
+    def __init__(self, workers: int = OCR_WORKERS, max_pending: int = OCR_MAX_PENDING):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.crashed = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Create the executor on first use, with spawned (not forked) workers."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def run(self, data: bytes, languages: str = OCR_LANGUAGES) -> dict:
+        """
+        OCR one image.
+
+        Args:
+            data: Encoded image bytes
+            languages: Tesseract language codes, e.g. "eng+spa"
+
+        Returns:
+            Dictionary with text, processed size and timings
+
+        Raises:
+            OcrLanguageError: If languages asks for a code outside OCR_LANGUAGES
+            OcrBusyError: If no slot frees up in time
+            OcrError: If the image is unreadable or OCR fails
+            OcrWorkerError: If the worker process died while running the image
+        """
+        languages = check_languages(languages)
+
+        # Created lazily so the semaphore binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=OCR_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise OcrBusyError("OCR queue is full, retry later")
+
+        self.pending += 1
+        start = time.perf_counter()
+        executor = self._pool()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                executor, _ocr_worker, data, languages, OCR_MAX_SIDE, OCR_BINARIZE, OCR_TIMEOUT
+            )
+            self.processed += 1
+            return result
+        except OcrError:
+            self.failed += 1
+            raise
+        except BrokenProcessPool:
+            self.crashed += 1
+            self._replace(executor)
+            raise OcrWorkerError("OCR worker crashed, retry the request") from None
+        finally:
+            self.busy_seconds += time.perf_counter() - start
+            self.pending -= 1
+            self._slots.release()
+
+    def _replace(self, broken: ProcessPoolExecutor):
+        """Drop a broken executor so the next image starts a new one; runs once per breakage."""
+        # Every image in flight on the broken executor lands here; only the first swaps it out
+        if self._executor is not broken:
+            return
+        self._executor = None
+        self.restarts += 1
+        logger.warning("OCR worker process died, restarting the pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Shut down the worker processes, waiting for running images; call it off the event loop."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """
+        Report pool usage for the health endpoint.
+
+        Returns:
+            Dictionary with worker count, queue depth and counters
+        """
+        return {
+            "workers": self.workers,
+            "maxPending": self.max_pending,
+            "pending": self.pending,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "crashed": self.crashed,
+            "restarts": self.restarts,
+            "avgLatencyMs": round(self.busy_seconds / (self.processed + self.failed) * 1000) if self.processed + self.failed else 0,
+        }
+
+
+# Shared OCR pool used by the image endpoints
+ocr_pool = OcrPool()
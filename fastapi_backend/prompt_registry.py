@@ -0,0 +1,156 @@
+"""
+Prompt registry: templates compiled once and split into a static system part and per-request fields.
+"""
+import os
+import re
+from string import Formatter
+from typing import Dict, List, Set, Tuple
+
+import updated_prompts
+from conversation_context import estimate_tokens
+from metrics import timed, STAGE_PROMPT_BUILD
+
+# Registry configuration
+PROMPT_COMPACT = os.getenv("PROMPT_COMPACT", "false").lower() in ("1", "true", "yes")
+PROMPT_SPLIT_SYSTEM = os.getenv("PROMPT_SPLIT_SYSTEM", "true").lower() in ("1", "true", "yes")
+
+# Emoji and pictographs (with a trailing variation selector and space) dropped from derived compact variants
+_EMOJI_PATTERN = re.compile("[\U0001F300-\U0001FAFF\u2600-\u27BF]\uFE0F? ?")
+
+
+def _fields(text: str) -> Set[str]:
+    """Names of the replacement fields in a format string."""
+    return {field for _, field, _, _ in Formatter().parse(text) if field}
+
+
+def _strip_emoji(template: str) -> str:
+    """Derive a compact variant by dropping emoji from section headings."""
+    return _EMOJI_PATTERN.sub("", template)
+
+
+class CompiledPrompt:
+    """
+    One template, parsed once.
+
+    Paragraphs without replacement fields before the first and after the last
+    field paragraph form the static part, which is identical for every request
+    and is moved to the system message so upstream prefix caching can reuse it.
+    The paragraphs from the first to the last field paragraph form the
+    per-request part.
+    """
+
+    def __init__(self, name: str, template: str):
+        self.name = name
+        self.template = template
+        self.fields = _fields(template)
+
+        # Split on blank lines so each field keeps its heading
+        paragraphs = template.strip().split("\n\n")
+        dynamic_paragraphs = [index for index, paragraph in enumerate(paragraphs) if _fields(paragraph)]
+        if dynamic_paragraphs:
+            first, last = dynamic_paragraphs[0], dynamic_paragraphs[-1]
+            static = "\n\n".join(paragraphs[:first] + paragraphs[last + 1:])
+            self.dynamic = "\n\n".join(paragraphs[first:last + 1])
+        else:
+            static, self.dynamic = template, ""
+
+        # Formatting without fields resolves the {{ }} escapes once
+        self.static = static.format()
+        blank = {field: "" for field in self.fields}
+        self.full_tokens = estimate_tokens(template.format(**blank))
+        self.static_tokens = estimate_tokens(self.static)
+        self.dynamic_tokens = estimate_tokens(self.dynamic.format(**blank))
+
+    def render(self, system_message: str, split: bool = True, **fields) -> Tuple[str, str]:
+        """
+        Fill in the template.
+
+        Args:
+            system_message: Role description for the system message
+            split: Move the static part to the system message (when PROMPT_SPLIT_SYSTEM is on).
+                Pass False when more instructions will be appended to the user prompt, so they
+                sit next to the instructions they refer to
+            **fields: Values for the template's replacement fields
+
+        Returns:
+            Tuple of (system message, user prompt)
+        """
+        if not (split and PROMPT_SPLIT_SYSTEM):
+            return system_message, self.template.format(**fields)
+        system = f"{system_message}\n\n{self.static}" if self.static else system_message
+        return system, self.dynamic.format(**fields)
+
+
+class PromptRegistry:
+    """
+    All *_PROMPT templates from updated_prompts, compiled at import.
+
+    Each template has a compact variant: the hand-written <NAME>_COMPACT
+    constant when there is one, otherwise the template without emoji.
+    PROMPT_COMPACT selects which variant render() uses.
+    """
+
+    def __init__(self, module=updated_prompts, compact: bool = PROMPT_COMPACT):
+        self.compact = compact
+        self._full: Dict[str, CompiledPrompt] = {}
+        self._compact: Dict[str, CompiledPrompt] = {}
+        for name in dir(module):
+            template = getattr(module, name)
+            if not name.endswith("_PROMPT") or not isinstance(template, str):
+                continue
+            compact_template = getattr(module, f"{name}_COMPACT", None) or _strip_emoji(template)
+            self._full[name] = CompiledPrompt(name, template)
+            self._compact[name] = CompiledPrompt(f"{name}_COMPACT", compact_template)
+
+    def get(self, name: str) -> CompiledPrompt:
+        """Get the active variant of a template."""
+        return (self._compact if self.compact else self._full)[name]
+
+    @timed(STAGE_PROMPT_BUILD)
+    def render(self, name: str, system_message: str, split: bool = True, **fields) -> Tuple[str, str]:
+        """
+        Render a template by name.
+
+        Args:
+            name: Template name, e.g. "GRAMMAR_PROMPT"
+            system_message: Role description for the system message
+            split: Move the static part to the system message, see CompiledPrompt.render
+            **fields: Values for the template's replacement fields
+
+        Returns:
+            Tuple of (system message, user prompt)
+        """
+        return self.get(name).render(system_message, split, **fields)
+
+    def report(self, endpoints: Dict[str, List[str]]) -> dict:
+        """
+        Report template token counts and compact-variant savings per endpoint.
+
+        Counts exclude the field values, which are the same under every variant.
+
+        Args:
+            endpoints: Endpoint path to the template names it uses
+
+        Returns:
+            Dictionary of endpoint to per-template token counts
+        """
+        report = {}
+        for endpoint, names in endpoints.items():
+            templates = {}
+            for name in names:
+                full, compact = self._full[name], self._compact[name]
+                saved = full.full_tokens - compact.full_tokens
+                templates[name] = {
+                    "tokens": full.full_tokens,
+                    "staticTokens": full.static_tokens,
+                    "perRequestTokens": full.dynamic_tokens,
+                    "compactTokens": compact.full_tokens,
+                    "compactSavedTokens": saved,
+                    "compactSavedPercent": round(100 * saved / full.full_tokens, 1) if full.full_tokens else 0.0,
+                }
+            report[endpoint] = templates
+        return {"compactActive": self.compact, "splitSystem": PROMPT_SPLIT_SYSTEM, "endpoints": report}
+
+
+# Shared registry used by every prompt builder
+prompt_registry = PromptRegistry()
@@ -0,0 +1,228 @@
+"""
+Upstream concurrency limiter, token-bucket rate shaping and retry backoff for Groq calls.
+"""
+import os
+import time
+import random
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+# Limiter configuration (0 disables a budget)
+GROQ_MAX_IN_FLIGHT = int(os.getenv("GROQ_MAX_IN_FLIGHT", 32))
+GROQ_RPM = float(os.getenv("GROQ_RPM", 0))  # requests per minute
+GROQ_TPM = float(os.getenv("GROQ_TPM", 0))  # tokens per minute
+GROQ_QUEUE_TIMEOUT = float(os.getenv("GROQ_QUEUE_TIMEOUT", 10))  # max seconds a call waits for capacity
+GROQ_EXPECTED_COMPLETION_TOKENS = int(os.getenv("GROQ_EXPECTED_COMPLETION_TOKENS", 600))
+
+# Retry configuration for 429 and 5xx responses
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", 3))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", 0.5))
+GROQ_BACKOFF_MAX = float(os.getenv("GROQ_BACKOFF_MAX", 20))
+
+
+class UpstreamBusyError(Exception):
+    """Raised when a call cannot get upstream capacity before its deadline."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after  # seconds until capacity is likely, for the client's Retry-After
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at budget/60 per second.
+
+    Reservations are serialized with a lock so waiters are served in arrival
+    order, and may drive the level negative; later callers then wait for the
+    debt to be repaid, which keeps the long-run rate at the budget.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        """Add the tokens accrued since the last update."""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def reserve(self, amount: float, deadline: float):
+        """
+        Take amount from the bucket, waiting for refill if needed.
+
+        Args:
+            amount: Units to take
+            deadline: time.monotonic() value after which to give up
+
+        Raises:
+            UpstreamBusyError: If the wait would pass the deadline
+        """
+        # Created lazily so the lock binds to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            # A single request larger than the bucket only has to wait for a full bucket
+            needed = min(amount, self.capacity)
+            wait = max(0.0, (needed - self.level) / self.rate)
+            if time.monotonic() + wait > deadline:
+                raise UpstreamBusyError("Upstream rate budget exhausted", wait)
+            if wait:
+                await asyncio.sleep(wait)
+                self._refill()
+            self.level -= amount
+
+    def refund(self, amount: float):
+        """Return unused units, e.g. when actual usage was below the estimate."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class UpstreamLimiter:
+    """
+    Global gate in front of every upstream call.
+
+    Caps the number of requests in flight, shapes requests and estimated
+    tokens per minute with token buckets, and pauses all callers while the
+    upstream is signalling 429 Retry-After. Callers that cannot get capacity
+    before their deadline fail fast with UpstreamBusyError instead of piling up;
+    its retry_after tells the client when to come back, including when a
+    Retry-After pause outlasts the queue timeout.
+    """
+
+    def __init__(self, max_in_flight: int = GROQ_MAX_IN_FLIGHT, rpm: float = GROQ_RPM, tpm: float = GROQ_TPM, queue_timeout: float = GROQ_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._paused_until = 0.0
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.retries = 0
+
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens: int = 0, timeout: Optional[float] = None):
+        """
+        Wait for capacity for one upstream request.
+
+        Args:
+            estimated_tokens: Prompt plus expected completion tokens
+            timeout: Seconds to wait before giving up (defaults to GROQ_QUEUE_TIMEOUT)
+
+        Raises:
+            UpstreamBusyError: If capacity is not available before the deadline
+        """
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        self.queued += 1
+        acquired = False
+        try:
+            # Honour a Retry-After pause from an earlier 429
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                if time.monotonic() + pause > deadline:
+                    raise UpstreamBusyError("Upstream is rate limiting, retry later", pause)
+                await asyncio.sleep(pause)
+
+            if self.max_in_flight > 0:
+                # Created lazily so the semaphore binds to the running event loop
+                if self._semaphore is None:
+                    self._semaphore = asyncio.Semaphore(self.max_in_flight)
+                try:
+                    await asyncio.wait_for(self._semaphore.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    raise UpstreamBusyError("Too many upstream requests in flight")
+                acquired = True
+
+            if self._requests is not None:
+                await self._requests.reserve(1, deadline)
+            if self._tokens is not None and estimated_tokens:
+                await self._tokens.reserve(estimated_tokens, deadline)
+        except BaseException as e:
+            if isinstance(e, UpstreamBusyError):
+                self.rejected += 1
+            self.queued -= 1
+            if acquired:
+                self._semaphore.release()
+            raise
+
+        self.queued -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if acquired:
+                self._semaphore.release()
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """
+        Correct the token bucket with the usage reported upstream.
+
+        Args:
+            estimated_tokens: Tokens reserved before the call
+            actual_tokens: total_tokens from the response usage field, if any
+        """
+        if self._tokens is None or actual_tokens is None:
+            return
+        if actual_tokens < estimated_tokens:
+            self._tokens.refund(estimated_tokens - actual_tokens)
+        else:
+            self._tokens.level -= actual_tokens - estimated_tokens
+
+    def pause(self, seconds: float):
+        """Hold back every caller for seconds, e.g. from a Retry-After header."""
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        """
+        Report limiter state for the health endpoint.
+
+        Returns:
+            Dictionary with limits, queue depth and throttling counters
+        """
+        return {
+            "maxInFlight": self.max_in_flight,
+            "inFlight": self.in_flight,
+            "queued": self.queued,
+            "rpmBudget": self._requests.capacity if self._requests else None,
+            "tpmBudget": self._tokens.capacity if self._tokens else None,
+            "rejected": self.rejected,
+            "throttled429": self.throttled,
+            "retries": self.retries,
+            "pausedForSeconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        }
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Delay before retry number attempt (0-based).
+
+    Uses the upstream Retry-After header when present, otherwise exponential
+    backoff with full jitter so that retrying callers spread out.
+
+    Args:
+        attempt: Retry number, starting at 0
+        retry_after: Value of the Retry-After header, in seconds
+
+    Returns:
+        Seconds to wait
+    """
+    if retry_after:
+        try:
+            return min(GROQ_BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(GROQ_BACKOFF_MAX, GROQ_BACKOFF_BASE * (2 ** attempt)))
+
+
+# Shared limiter used by every upstream call
+upstream_limiter = UpstreamLimiter()
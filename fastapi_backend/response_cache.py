@@ -0,0 +1,204 @@
+"""
+Content-addressed response cache for LLM-backed endpoints.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Cache configuration
+GROQ_CACHE_SIZE = int(os.getenv("GROQ_CACHE_SIZE", 1024))
+GROQ_CACHE_TTL = float(os.getenv("GROQ_CACHE_TTL", 3600))
+GROQ_CACHE_DB = os.getenv("GROQ_CACHE_DB", "")  # Empty disables the on-disk tier
+GROQ_CACHE_DB_SIZE = int(os.getenv("GROQ_CACHE_DB_SIZE", 100000))  # rows kept on disk
+
+# Writes between purges of expired and excess disk entries
+PURGE_EVERY = 100
+
+
+def make_cache_key(model: str, system_message: str, prompt: str) -> str:
+    """
+    Hash the fully formatted request into a cache key.
+
+    Args:
+        model: Upstream model name
+        system_message: The system message sent with the prompt
+        prompt: The fully formatted user prompt
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    digest = hashlib.sha256()
+    for part in (model, system_message, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    SQLite-backed cache tier that survives restarts.
+
+    Every PURGE_EVERY writes, expired rows are deleted and the rows that
+    expire soonest are dropped until at most max_rows remain, so entries
+    nobody reads again do not pile up.
+    """
+
+    def __init__(self, path: str, max_rows: int = GROQ_CACHE_DB_SIZE):
+        self.max_rows = max_rows
+        self._writes = 0
+        self.purged = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache (expires_at)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Return (value, expires_at) for a live entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row
+
+    def set(self, key: str, value: str, expires_at: float):
+        """Insert or replace an entry, purging stale ones every PURGE_EVERY writes."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self.purged += self._conn.execute(
+                    "DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),)
+                ).rowcount
+                self.purged += self._conn.execute(
+                    "DELETE FROM response_cache WHERE key IN ("
+                    "SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                ).rowcount
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of upstream completions.
+
+    The first tier is an in-process LRU bounded by entry count with a TTL per
+    entry; the optional second tier is a SQLite file shared across restarts.
+    """
+
+    def __init__(self, max_size: int = GROQ_CACHE_SIZE, ttl: float = GROQ_CACHE_TTL, db_path: str = GROQ_CACHE_DB):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk: Optional[DiskCache] = DiskCache(db_path) if db_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached completion.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            The cached content, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self._disk is not None:
+            row = await asyncio.to_thread(self._disk.get, key)
+            if row is not None:
+                # Promote disk hits into the memory tier
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """
+        Store a completion in every tier.
+
+        Args:
+            key: Cache key from make_cache_key
+            value: Completion content to cache
+        """
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, expires_at)
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all in-memory entries."""
+        self._entries.clear()
+
+    def close(self):
+        """Release the on-disk tier."""
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    def stats(self) -> dict:
+        """
+        Report cache counters for the health endpoint.
+
+        Returns:
+            Dictionary with sizes and hit/miss counters
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "ttlSeconds": self.ttl,
+            "diskEnabled": self._disk is not None,
+            "diskPurged": self._disk.purged if self._disk is not None else 0,
+            "hits": self.hits,
+            "diskHits": self.disk_hits,
+            "misses": self.misses,
+            "hitRate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared cache instance used by call_groq_api
+response_cache = ResponseCache()
@@ -1,9 +1,103 @@
 """
-Run the fixed backend on port 8001
+Run the fixed backend on port 8004, with one worker process per CPU core by default.
+
+Workers share the listening socket and every piece of state that must be
+consistent between requests: users, learning sessions, jobs, conversation
+summaries and incremental analysis state all live in SQLite files. What
+stays per worker only saves work (the in-memory response cache,
+single-flight, the translation memory) or is reported per worker (/health,
+/metrics). The server uses uvloop and httptools when they are installed, and
+drains in-flight requests on SIGTERM before exiting.
+
+Usage:
+    python run_fixed.py
+    WEB_CONCURRENCY=1 python run_fixed.py  # a single process
 """
+import os
+import importlib.util
+
 import uvicorn
-from fixed_backend import app
+from dotenv import load_dotenv
+from loguru import logger
+
+# Load .env before importing modules that read configuration
+load_dotenv()
+
+from log_config import configure_logging
+import ocr
+import scheduler
+import rate_limiter
+import user_store
+import learning_sessions
+
+# Server configuration
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8004))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)  # worker processes, one per core by default
+LOOP = os.getenv("LOOP", "auto")  # auto picks uvloop when installed
+HTTP = os.getenv("HTTP", "auto")  # auto picks httptools when installed
+BACKLOG = int(os.getenv("BACKLOG", 2048))  # pending connections the listening socket holds
+TIMEOUT_KEEP_ALIVE = int(os.getenv("TIMEOUT_KEEP_ALIVE", 5))  # seconds an idle keep-alive connection stays open
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", 30))  # seconds in-flight requests get to finish on shutdown
+
+
+def split_budgets(workers: int) -> dict:
+    """
+    Divide process-wide upstream and OCR budgets between worker processes.
+
+    Limits are enforced per process, so without this N workers would send N
+    times the configured GROQ_RPM/GROQ_TPM and start N times OCR_WORKERS
+    tesseract processes.
+
+    Args:
+        workers: Number of worker processes
+
+    Returns:
+        Environment variables with each worker's share
+    """
+    budgets = {
+        "GROQ_MAX_IN_FLIGHT": max(1, rate_limiter.GROQ_MAX_IN_FLIGHT // workers),
+        "LLM_MAX_CONCURRENT": max(1, scheduler.LLM_MAX_CONCURRENT // workers),
+        "OCR_WORKERS": max(1, ocr.OCR_WORKERS // workers),
+    }
+    # 0 means the budget is disabled, which stays disabled per worker
+    if rate_limiter.GROQ_RPM:
+        budgets["GROQ_RPM"] = rate_limiter.GROQ_RPM / workers
+    if rate_limiter.GROQ_TPM:
+        budgets["GROQ_TPM"] = rate_limiter.GROQ_TPM / workers
+    return {name: str(value) for name, value in budgets.items()}
+
+
+def main():
+    configure_logging()
+    workers = max(1, WEB_CONCURRENCY)
+    loop, http = LOOP, HTTP
+    if loop == "auto":
+        loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    if http == "auto":
+        http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+    # Keep uvicorn from installing its own handlers; its loggers go through loguru
+    options = dict(
+        host=HOST, port=PORT, loop=loop, http=http, backlog=BACKLOG,
+        timeout_keep_alive=TIMEOUT_KEEP_ALIVE, timeout_graceful_shutdown=GRACEFUL_TIMEOUT, log_config=None,
+    )
+    logger.info("Starting PolyLingo Fixed Backend on {}:{} with {} workers (loop={}, http={})", HOST, PORT, workers, loop, http)
+
+    if workers == 1:
+        from fixed_backend import app
+        uvicorn.Server(uvicorn.Config(app, **options)).run()
+        return
+
+    if user_store.USER_STORE == "memory":
+        logger.warning("USER_STORE=memory is per process; accounts will not be shared between workers")
+    if learning_sessions.SESSION_STORE == "memory":
+        logger.warning("SESSION_STORE=memory is per process; learning sessions will not be shared between workers")
+
+    # Each spawned worker imports the app itself, so this process opens no databases
+    os.environ.update(split_budgets(workers))
+    uvicorn.run("fixed_backend:app", workers=workers, **options)
+
 
 if __name__ == "__main__":
-    print("Starting PolyLingo Fixed Backend on port 8004")
-    uvicorn.run(app, host="0.0.0.0", port=8004)
+    main()
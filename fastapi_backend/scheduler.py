@@ -0,0 +1,275 @@
+"""
+Priority scheduler for LLM work with per-user fair queuing.
+"""
+import os
+import time
+import asyncio
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+BULK = 1
+BACKGROUND = 2
+PRIORITY_NAMES = ("interactive", "bulk", "background")
+
+# Scheduler configuration
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", os.getenv("GROQ_MAX_IN_FLIGHT", 32)))
+LLM_INTERACTIVE_RESERVED = int(os.getenv("LLM_INTERACTIVE_RESERVED", 4))  # slots bulk work can never take
+WAIT_SAMPLES = 1024  # recent waits kept per class for percentiles
+
+# Priority and fairness key of the request being served, set by PriorityMiddleware
+current_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=BULK)
+current_user_key: contextvars.ContextVar = contextvars.ContextVar("llm_user_key", default="anonymous")
+# Set inside work shared by several requests, see SharedPriority
+current_shared_priority: contextvars.ContextVar = contextvars.ContextVar("llm_shared_priority", default=None)
+
+
+class SharedPriority:
+    """
+    Priority class of one upstream call made on behalf of several requests.
+
+    It starts at the first request's class and is raised to the most urgent
+    class among the requests waiting on the call. A slot request the call
+    already has queued moves to the new class's queue, so an interactive
+    request that joins a background call is not held back by it.
+    """
+
+    def __init__(self, priority: int):
+        self.value = priority
+        self._queued: Optional[Tuple["PriorityScheduler", str, asyncio.Future]] = None
+
+    def raise_to(self, priority: int):
+        """Raise the class to priority if that is more urgent."""
+        if priority >= self.value:
+            return
+        previous, self.value = self.value, priority
+        if self._queued is not None:
+            scheduler, user_key, future = self._queued
+            scheduler._move(previous, priority, user_key, future)
+
+
+class _ClassStats:
+    """Wait-time bookkeeping for one priority class."""
+
+    __slots__ = ("granted", "waits")
+
+    def __init__(self):
+        self.granted = 0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def summary(self, queued: int) -> dict:
+        waits = sorted(self.waits)
+        return {
+            "queued": queued,
+            "granted": self.granted,
+            "waitAvgMs": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "waitP95Ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+            "waitMaxMs": round(waits[-1], 1) if waits else 0.0,
+        }
+
+
+class PriorityScheduler:
+    """
+    Grant upstream slots by priority class, round-robin across users within a class.
+
+    Interactive work always goes first, and LLM_INTERACTIVE_RESERVED slots are
+    kept free of bulk and background work, so a click never waits behind a
+    saturated batch queue. Within a class each user key has its own FIFO and
+    users take turns, so one heavy client cannot starve the others.
+    """
+
+    def __init__(self, max_concurrent: int = LLM_MAX_CONCURRENT, interactive_reserved: int = LLM_INTERACTIVE_RESERVED):
+        self.max_concurrent = max(1, max_concurrent)
+        self.interactive_reserved = min(interactive_reserved, self.max_concurrent - 1)
+        self.active = 0
+        self._queues: List["OrderedDict[str, Deque[asyncio.Future]]"] = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._queued = [0] * len(PRIORITY_NAMES)
+        self._stats = [_ClassStats() for _ in PRIORITY_NAMES]
+
+    def _has_room(self, priority: int) -> bool:
+        """Whether a slot is free for this class."""
+        limit = self.max_concurrent if priority == INTERACTIVE else self.max_concurrent - self.interactive_reserved
+        return self.active < limit
+
+    def _waiting_at_or_above(self, priority: int) -> bool:
+        """Whether anyone of equal or higher priority is already queued."""
+        return any(self._queued[p] for p in range(priority + 1))
+
+    async def acquire(self, priority: int = BULK, user_key: str = "anonymous", shared: Optional[SharedPriority] = None):
+        """
+        Wait for a slot.
+
+        Args:
+            priority: INTERACTIVE, BULK or BACKGROUND
+            user_key: Fairness key, e.g. a user id or client address
+            shared: Priority of a shared call, which replaces priority and may be raised while waiting
+        """
+        if shared is not None:
+            priority = shared.value
+        if self._has_room(priority) and not self._waiting_at_or_above(priority):
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(user_key, deque()).append(future)
+        self._queued[priority] += 1
+        if shared is not None:
+            shared._queued = (self, user_key, future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self.release()
+            else:
+                self._remove(shared.value if shared is not None else priority, user_key, future)
+            raise
+        finally:
+            if shared is not None:
+                shared._queued = None
+
+    def _remove(self, priority: int, user_key: str, future: asyncio.Future) -> bool:
+        """Drop a waiter from its queue; returns whether it was still queued."""
+        waiters = self._queues[priority].get(user_key)
+        if waiters is None or future not in waiters:
+            return False
+        waiters.remove(future)
+        self._queued[priority] -= 1
+        if not waiters:
+            del self._queues[priority][user_key]
+        return True
+
+    def _move(self, previous: int, priority: int, user_key: str, future: asyncio.Future):
+        """Requeue a waiting slot request under a more urgent class."""
+        if self._remove(previous, user_key, future):
+            self._queues[priority].setdefault(user_key, deque()).append(future)
+            self._queued[priority] += 1
+            # The new class may have a free slot, e.g. one reserved for interactive work
+            self._dispatch()
+
+    def release(self):
+        """Return a slot and grant it to the next waiter."""
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots, highest priority first, rotating through users."""
+        while True:
+            for priority, queue in enumerate(self._queues):
+                if queue and self._has_room(priority):
+                    user_key, waiters = next(iter(queue.items()))
+                    future = waiters.popleft()
+                    self._queued[priority] -= 1
+                    if waiters:
+                        queue.move_to_end(user_key)
+                    else:
+                        del queue[user_key]
+                    if future.done():
+                        break
+                    self.active += 1
+                    future.set_result(None)
+                    break
+            else:
+                return
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[int] = None, user_key: Optional[str] = None):
+        """
+        Hold a slot for the duration of the block.
+
+        Args:
+            priority: Priority class, defaults to the current request's, or
+                the shared call's when run on behalf of several requests
+            user_key: Fairness key, defaults to the current request's
+        """
+        shared = current_shared_priority.get() if priority is None else None
+        priority = current_priority.get() if priority is None else priority
+        user_key = current_user_key.get() if user_key is None else user_key
+        start = time.monotonic()
+        await self.acquire(priority, user_key, shared)
+        if shared is not None:
+            priority = shared.value
+        stats = self._stats[priority]
+        stats.granted += 1
+        stats.waits.append((time.monotonic() - start) * 1000)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """
+        Report queue depth and wait times per class.
+
+        Returns:
+            Dictionary with active slots and per-class queue statistics
+        """
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "interactiveReserved": self.interactive_reserved,
+            "active": self.active,
+            "classes": {
+                name: self._stats[priority].summary(self._queued[priority])
+                for priority, name in enumerate(PRIORITY_NAMES)
+            },
+        }
+
+
+class PriorityMiddleware:
+    """
+    ASGI middleware that tags each request with a priority class and fairness key.
+
+    The class comes from the route table, and a client may lower (never raise) it
+    with an X-Priority header. The fairness key is the authenticated user when
+    the request carries a bearer token that resolve_user (token -> user id, or
+    None if invalid) accepts, otherwise the client address.
+    Client-supplied identity headers are ignored, so a client cannot claim a
+    fresh key per request to jump the round-robin.
+    """
+
+    def __init__(self, app, routes: Dict[str, int], default: int = BULK,
+                 resolve_user: Optional[Callable[[str], Awaitable[Optional[str]]]] = None):
+        self.app = app
+        self.routes = routes
+        self.default = default
+        self.resolve_user = resolve_user
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = self.routes.get(scope["path"], self.default)
+        user_key = None
+        token = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-priority":
+                requested = value.decode("latin-1").strip().lower()
+                if requested in PRIORITY_NAMES:
+                    priority = max(priority, PRIORITY_NAMES.index(requested))
+            elif name == b"authorization":
+                scheme, _, credentials = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and credentials.strip():
+                    token = credentials.strip()
+        if token is not None and self.resolve_user is not None:
+            user_id = await self.resolve_user(token)
+            if user_id is not None:
+                user_key = f"user:{user_id}"
+        if user_key is None:
+            client = scope.get("client")
+            user_key = f"ip:{client[0]}" if client else "anonymous"
+
+        priority_token = current_priority.set(priority)
+        user_token = current_user_key.set(user_key)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_priority.reset(priority_token)
+            current_user_key.reset(user_token)
+
+
+# Shared scheduler used by every upstream call
+llm_scheduler = PriorityScheduler()
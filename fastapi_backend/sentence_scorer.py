@@ -0,0 +1,328 @@
+"""
+Local first-pass sentence scorer: dictionary spell check plus structural heuristics.
+"""
+import os
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+from loguru import logger
+
+from metrics import sentence_analyses
+
+# Sentence scorer configuration
+WORDLIST_DIR = os.getenv("WORDLIST_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlists")
+WORDLIST_PRELOAD = [language for language in os.getenv("WORDLIST_PRELOAD", "en,es,fr,de,it,pt").split(",") if language]  # others load on first use
+ANALYZE_CONFIDENCE_THRESHOLD = float(os.getenv("ANALYZE_CONFIDENCE_THRESHOLD", 0.7))  # below this the LLM is asked
+ANALYZE_LOCAL_MAX_WORDS = int(os.getenv("ANALYZE_LOCAL_MAX_WORDS", 25))  # longer sentences need a real grammar check
+ANALYZE_MAX_CHARS = int(os.getenv("ANALYZE_MAX_CHARS", 1000))
+
+# Words: letters, optionally joined by apostrophes ("don't", "aujourd'hui")
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+_APOSTROPHES = re.compile(r"['’]")
+_TERMINAL = ".!?…"
+_PAIRS = (("(", ")"), ("[", "]"), ("{", "}"))
+
+# Commonly confused words whose right choice depends on grammar the local pass cannot see
+# ("Their going"). Confusions involving words as common as "to", "das" or "e" are left out,
+# since escalating on them would send nearly every sentence to the LLM.
+CONFUSABLE_WORDS: Dict[str, FrozenSet[str]] = {
+    "en": frozenset({
+        "their", "there", "they're", "its", "it's", "your", "you're", "then", "than", "too",
+        "whose", "who's", "affect", "effect", "lose", "loose", "accept", "except", "weather", "whether",
+    }),
+    "es": frozenset({"haber", "hay", "ahí", "ahi", "ay", "echo", "hecho", "haya", "halla", "valla", "vaya", "porque", "porqué", "sino"}),
+    "fr": frozenset({"ces", "ses", "c'est", "s'est", "ou", "où", "ça", "sa", "quand", "quant", "peu", "peut", "leur", "leurs"}),
+    "de": frozenset({"dass", "seid", "seit", "wider", "wieder", "wenn", "wen", "denn"}),
+    "it": frozenset({"ha", "hanno", "anno", "c'è", "ce", "po'", "pò", "qual'è"}),
+    "pt": frozenset({"mas", "mais", "mau", "mal", "há", "à", "porque", "porquê", "aonde"}),
+}
+
+# Points taken off the score per issue
+PENALTIES = {
+    "spelling": 15,
+    "repeated_word": 10,
+    "unbalanced": 10,
+    "capitalization": 5,
+    "punctuation": 5,
+    "spacing": 3,
+}
+
+
+class Issue(NamedTuple):
+    """One problem found in a sentence."""
+
+    kind: str
+    word: str = ""
+    suggestion: str = ""
+
+
+def is_slip(word: str, candidate: str) -> bool:
+    """
+    Whether word is candidate mistyped by a slip of the fingers.
+
+    Slips are two adjacent letters swapped ("teh", "recieve") or a letter
+    doubled or undoubled ("untill", "occured"). Other single edits, such as
+    "heron" against "hero", are as likely to be a real, rarer word.
+    """
+    if len(word) == len(candidate):
+        differences = [i for i, (a, b) in enumerate(zip(word, candidate)) if a != b]
+        return (
+            len(differences) == 2 and differences[1] == differences[0] + 1
+            and word[differences[0]] == candidate[differences[1]] and word[differences[1]] == candidate[differences[0]]
+        )
+    longer, shorter = (word, candidate) if len(word) > len(candidate) else (candidate, word)
+    if len(longer) != len(shorter) + 1:
+        return False
+    for i in range(len(longer)):
+        if longer[:i] + longer[i + 1:] == shorter:
+            return (i > 0 and longer[i - 1] == longer[i]) or (i + 1 < len(longer) and longer[i + 1] == longer[i])
+    return False
+
+
+class WordIndex:
+    """
+    One language's wordlist, loaded once into a word -> frequency rank map.
+
+    Lookups are O(1). Spelling suggestions are dictionary words one edit away
+    (deletion, transposition, substitution or insertion), generated over the
+    alphabet the wordlist actually uses, preferring slips, then frequency.
+    """
+
+    def __init__(self, words: List[str]):
+        self.ranks: Dict[str, int] = {}
+        for rank, word in enumerate(words):
+            self.ranks.setdefault(word, rank)
+        self.alphabet = "".join(sorted({char for word in self.ranks for char in word if char.isalpha()}))
+
+    @classmethod
+    def load(cls, path: str) -> "WordIndex":
+        """Read a wordlist file: one casefolded word per line, most frequent first, # comments."""
+        with open(path, encoding="utf-8") as f:
+            return cls([line.strip() for line in f if line.strip() and not line.startswith("#")])
+
+    def known(self, word: str) -> bool:
+        """Whether a casefolded word, or every part of an elided form like "l'homme", is in the list."""
+        if word in self.ranks:
+            return True
+        parts = _APOSTROPHES.split(word)
+        return len(parts) > 1 and all(part in self.ranks for part in parts)
+
+    def suggest(self, word: str) -> Optional[str]:
+        """The likeliest intended dictionary word one edit away, if any."""
+        splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+        candidates = set()
+        for left, right in splits:
+            if right:
+                candidates.add(left + right[1:])
+                if len(right) > 1:
+                    candidates.add(left + right[1] + right[0] + right[2:])
+                candidates.update(left + char + right[1:] for char in self.alphabet)
+            candidates.update(left + char + right for char in self.alphabet)
+        found = [candidate for candidate in candidates if candidate in self.ranks and candidate != word]
+        return min(found, key=lambda candidate: (not is_slip(word, candidate), self.ranks[candidate])) if found else None
+
+
+def _language_code(language: Optional[str]) -> str:
+    """Base language of a code, e.g. "en" for "en-GB"."""
+    return (language or "").lower().split("-")[0]
+
+
+class LocalAnalysis(NamedTuple):
+    """Result of the local pass."""
+
+    score: int
+    feedback: str
+    tip: str
+    confidence: float
+    issues: List[Issue]
+    escalation_reason: Optional[str]
+
+
+def _describe(issue: Issue) -> tuple:
+    """One-sentence feedback and an actionable tip for an issue."""
+    if issue.kind == "spelling":
+        return (
+            f"The word '{issue.word}' looks misspelled.",
+            f"Check the spelling of '{issue.word}', which should probably be '{issue.suggestion}'."
+        )
+    if issue.kind == "repeated_word":
+        return f"The word '{issue.word}' is repeated.", f"Remove the second '{issue.word}'."
+    if issue.kind == "unbalanced":
+        return "A bracket or quotation mark is not closed.", f"Add the missing '{issue.suggestion}'."
+    if issue.kind == "capitalization":
+        return "The sentence does not start with a capital letter.", f"Capitalize the first word, '{issue.word}'."
+    if issue.kind == "punctuation":
+        return "The sentence has no closing punctuation.", "End the sentence with a period, question mark or exclamation mark."
+    return "There is extra spacing in the sentence.", "Use a single space between words and none before punctuation."
+
+
+class SentenceScorer:
+    """
+    Scores sentences locally and decides when the LLM is needed.
+
+    The local pass checks every word against the language's wordlist and
+    applies structural checks (capitalization, closing punctuation, repeated
+    words, spacing, unbalanced brackets and quotes). An unknown word is a typo
+    only when it is a slip of a dictionary word (see is_slip). The pass does
+    not parse grammar, so it escalates on the signals that an error it cannot
+    see is likely: no wordlist for the language, lowercase words that are
+    unknown and not slips (rare words, slang or heavy misspellings), words of
+    CONFUSABLE_WORDS, and long sentences. Short sentences of known words
+    without those signals are answered locally. Only languages with a shipped
+    WORDLIST_DIR/<language>.txt are looked up; each list is read on first use
+    and kept.
+    """
+
+    def __init__(self, wordlist_dir: str = WORDLIST_DIR, threshold: float = ANALYZE_CONFIDENCE_THRESHOLD,
+                 max_local_words: int = ANALYZE_LOCAL_MAX_WORDS):
+        self.wordlist_dir = wordlist_dir
+        self.threshold = threshold
+        self.max_local_words = max_local_words
+        self._indexes: Dict[str, WordIndex] = {}
+        # Language codes come from clients, so only shipped lists are ever loaded or cached
+        self.available = frozenset(
+            name[:-4] for name in (os.listdir(wordlist_dir) if os.path.isdir(wordlist_dir) else ()) if name.endswith(".txt")
+        )
+        self.local = 0
+        self.escalated = 0
+        self.escalation_failures = 0
+        self.reasons: Counter = Counter()
+
+    def index(self, language: str) -> Optional[WordIndex]:
+        """The wordlist index for a language, loaded on first use; None if there is no list."""
+        language = _language_code(language)
+        if language not in self.available:
+            return None
+        index = self._indexes.get(language)
+        if index is None:
+            index = self._indexes[language] = WordIndex.load(os.path.join(self.wordlist_dir, f"{language}.txt"))
+            logger.info("Loaded {} wordlist with {} words", language, len(index.ranks))
+        return index
+
+    def preload(self, languages: List[str] = WORDLIST_PRELOAD):
+        """Load wordlists ahead of the first request, so no request pays the ~30 ms parse."""
+        for language in languages:
+            self.index(language)
+
+    def analyze(self, sentence: str, language: str) -> LocalAnalysis:
+        """
+        Score a sentence without calling the LLM.
+
+        Args:
+            sentence: Text to analyze
+            language: Language code of the text, e.g. "en"
+
+        Returns:
+            LocalAnalysis with score, feedback, tip, confidence and, when the
+            LLM should be asked instead, the reason
+        """
+        index = self.index(language)
+        text = sentence.strip()
+        matches = list(WORD_PATTERN.finditer(text))
+        issues: List[Issue] = []
+        confidence = 1.0
+        reason = None
+
+        # Spelling: unknown words with a close match are typos, without one they are doubtful
+        doubtful = 0
+        confusable = False
+        if index is None:
+            confidence, reason = 0.0, "no_wordlist"
+        else:
+            confusables = CONFUSABLE_WORDS.get(_language_code(language), frozenset())
+            for position, match in enumerate(matches):
+                word = match.group()
+                # Wordlists are casefolded, e.g. German "ß" is stored as "ss"
+                lower = word.casefold().replace("’", "'")
+                if index.known(lower):
+                    confusable = confusable or lower in confusables
+                    continue
+                # Capitalized words after the first are most likely names
+                if position > 0 and word[0].isupper():
+                    continue
+                suggestion = index.suggest(lower)
+                if suggestion and is_slip(lower, suggestion):
+                    issues.append(Issue("spelling", word, suggestion))
+                else:
+                    doubtful += 1
+            if doubtful:
+                confidence -= 0.35 * doubtful
+                reason = "unknown_words"
+            # A known word can still be the wrong one ("Their going"); only the LLM can tell
+            if confusable:
+                confidence = min(confidence, 0.5)
+                reason = reason or "confusable_words"
+
+        if len(matches) > self.max_local_words:
+            confidence = min(confidence, 0.5)
+            reason = reason or "long_sentence"
+
+        # Structure
+        words = [match.group().casefold() for match in matches]
+        for previous, word in zip(words, words[1:]):
+            if previous == word and len(word) > 1:
+                issues.append(Issue("repeated_word", word))
+                break
+        for opening, closing in _PAIRS:
+            if text.count(opening) != text.count(closing):
+                issues.append(Issue("unbalanced", suggestion=closing))
+                break
+        else:
+            if text.count('"') % 2:
+                issues.append(Issue("unbalanced", suggestion='"'))
+        if matches and matches[0].start() == 0 and matches[0].group()[0].islower():
+            issues.append(Issue("capitalization", matches[0].group()))
+        if len(words) > 2 and text[-1] not in _TERMINAL and text[-1] not in "\"')»":
+            issues.append(Issue("punctuation"))
+        if "  " in text or re.search(r"\s[,.!?;:]", text):
+            issues.append(Issue("spacing"))
+
+        score = max(1, min(100, 100 - sum(PENALTIES[issue.kind] for issue in issues)))
+        if issues:
+            feedback, tip = _describe(issues[0])
+            if len(issues) > 1:
+                feedback = f"{feedback[:-1]}, plus {len(issues) - 1} more issue{'s' if len(issues) > 2 else ''}."
+        else:
+            feedback = "No spelling or punctuation problems found."
+            tip = "Read the sentence aloud to check that verb forms agree with their subjects."
+
+        confidence = max(0.0, confidence)
+        if confidence >= self.threshold:
+            reason = None
+        return LocalAnalysis(score, feedback, tip, round(confidence, 2), issues, reason)
+
+    def record(self, escalation_reason: Optional[str], failed: bool = False):
+        """Count one analysis by where it was answered."""
+        if escalation_reason is None:
+            self.local += 1
+            sentence_analyses.labels("local", "").inc()
+            return
+        self.escalated += 1
+        sentence_analyses.labels("llm_failed" if failed else "llm", escalation_reason).inc()
+        self.reasons[escalation_reason] += 1
+        if failed:
+            self.escalation_failures += 1
+
+    def stats(self) -> dict:
+        """
+        Report the escalation rate for the health endpoint.
+
+        Returns:
+            Dictionary with local and escalated counts, the escalation rate and reasons
+        """
+        total = self.local + self.escalated
+        return {
+            "analyzed": total,
+            "local": self.local,
+            "escalated": self.escalated,
+            "escalationRate": round(self.escalated / total, 3) if total else 0.0,
+            "escalationReasons": dict(self.reasons),
+            "escalationFailures": self.escalation_failures,
+            "confidenceThreshold": self.threshold,
+            "wordlistsLoaded": sorted(self._indexes),
+        }
+
+
+# Shared scorer used by /analyze-sentence
+sentence_scorer = SentenceScorer()
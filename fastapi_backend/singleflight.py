@@ -0,0 +1,97 @@
+"""
+Single-flight coalescing of identical in-flight upstream calls.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from scheduler import SharedPriority, current_priority, current_shared_priority
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share a key.
+
+    The first caller for a key starts the work as a task; callers that arrive
+    while it is still running await the same task instead of starting their
+    own. Results and exceptions are delivered to every waiter. The shared task
+    is only cancelled once every waiter has been cancelled.
+
+    The task takes its scheduler slots at the most urgent priority class among
+    its waiters (see SharedPriority), so an interactive caller that joins a
+    background caller's call is not slowed down by it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Tuple[asyncio.Task, list, SharedPriority]] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """
+        Run fn once per key among concurrent callers.
+
+        Args:
+            key: Identity of the call; it must cover every argument that changes the result
+            fn: Zero-argument coroutine function doing the actual work
+
+        Returns:
+            Tuple of (result, whether this caller joined an existing call)
+        """
+        call = self._calls.get(key)
+        if call is None:
+            priority = SharedPriority(current_priority.get())
+
+            async def run():
+                # Set inside the task, so only the shared call's scheduler slots see it
+                current_shared_priority.set(priority)
+                return await fn()
+
+            task = asyncio.ensure_future(run())
+            # Waiter count is boxed in a list so the done callback sees updates
+            call = (task, [0], priority)
+            self._calls[key] = call
+            task.add_done_callback(lambda _t: self._forget(key, task))
+            self.leaders += 1
+            joined = False
+        else:
+            call[2].raise_to(current_priority.get())
+            self.coalesced += 1
+            joined = True
+
+        task, waiters, _ = call
+        waiters[0] += 1
+        try:
+            # Shield so one waiter's cancellation does not cancel the others
+            return await asyncio.shield(task), joined
+        except asyncio.CancelledError:
+            if not task.done() and waiters[0] == 1:
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """Drop a finished call so the next caller starts fresh."""
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """
+        Report coalescing counters for the health endpoint.
+
+        Returns:
+            Dictionary with in-flight, leader and coalesced call counts
+        """
+        return {
+            "inFlight": len(self._calls),
+            "upstreamCalls": self.leaders,
+            "coalescedCalls": self.coalesced,
+        }
+
+
+# Shared instance used by call_groq_api
+single_flight = SingleFlight()
@@ -0,0 +1,59 @@
+"""
+Pooled SQLite connections in WAL mode, queried from a thread pool off the event loop.
+"""
+import queue
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+
+class SQLitePool:
+    """
+    Fixed set of connections to one SQLite file, shared by every worker process.
+
+    The database runs in WAL mode so readers never block the writer. Queries
+    run on a thread pool as large as the connection pool, each thread
+    borrowing a connection for the duration of one call, so the event loop
+    never blocks on I/O. Connections are in autocommit mode; a call that
+    needs a transaction issues BEGIN and COMMIT itself. The schema statements
+    (CREATE ... IF NOT EXISTS) run once when the pool opens.
+    """
+
+    def __init__(self, path: str, size: int, name: str, schema: Iterable[str] = ()):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=name)
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            self._connections.put(self._connect())
+        self.run_sync(lambda conn: [conn.execute(statement) for statement in schema])
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open one pooled connection."""
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def run_sync(self, fn: Callable[..., T], *args) -> T:
+        """Run fn(conn, *args) on the calling thread with a borrowed connection."""
+        conn = self._connections.get()
+        try:
+            return fn(conn, *args)
+        finally:
+            self._connections.put(conn)
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run fn(conn, *args) on the pool with a borrowed connection."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.run_sync, fn, *args)
+
+    def close(self):
+        """Wait for running queries, then close every connection."""
+        self._executor.shutdown(wait=True)
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
@@ -0,0 +1,131 @@
+"""
+Server-Sent Events helpers and an incremental JSON section parser for streamed completions.
+"""
+import json
+from typing import List, Tuple
+
+
+def sse_event(event: str, data) -> str:
+    """
+    Format one Server-Sent Event.
+
+    Args:
+        event: Event name
+        data: JSON-serializable payload
+
+    Returns:
+        The encoded event, terminated by a blank line
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class JsonSectionParser:
+    """
+    Incrementally scan a streamed JSON object and emit top-level members as they close.
+
+    Text before the first '{' (such as a markdown fence) is ignored. Each call to
+    feed() returns the (key, value) pairs whose values were completed by that chunk,
+    so a client can render "translation" while "grammar" is still being generated.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._length = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the top-level object has closed."""
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """
+        Consume the next piece of streamed text.
+
+        Args:
+            chunk: Newly received text
+
+        Returns:
+            List of (key, value) pairs completed by this chunk
+        """
+        sections = []
+        for char in chunk:
+            if self._finished:
+                break
+            position = self._length
+            self._buffer.append(char)
+            self._length += 1
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        self._key = json.loads(self._text(self._key_start, position + 1))
+                        self._key_start = None
+                    elif self._depth == 1 and self._value_start is not None and self._value_start >= 0:
+                        sections.extend(self._close_value(position + 1))
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None:
+                    self._key_start = position
+                elif self._depth == 1 and self._value_start == -1:
+                    self._value_start = position
+            elif char == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = -1  # value begins at the next non-space character
+            elif char in "{[":
+                if self._depth == 1 and self._value_start == -1:
+                    self._value_start = position
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    sections.extend(self._close_value(position + 1))
+                elif self._depth == 0:
+                    # Close a trailing scalar such as a number or boolean
+                    if self._value_start is not None and self._value_start >= 0:
+                        sections.extend(self._close_value(position))
+                    self._finished = True
+            elif char == "," and self._depth == 1 and self._value_start is not None and self._value_start >= 0:
+                sections.extend(self._close_value(position))
+            elif self._depth == 1 and self._value_start == -1 and not char.isspace():
+                self._value_start = position
+        return sections
+
+    def _text(self, start: int, end: int) -> str:
+        """Return a slice of the received text."""
+        return "".join(self._buffer[start:end])
+
+    def _close_value(self, end: int) -> List[Tuple[str, object]]:
+        """Decode the value that just closed and reset member state."""
+        key, start = self._key, self._value_start
+        self._key = None
+        self._value_start = None
+        if key is None or start is None or start < 0:
+            return []
+        try:
+            return [(key, json.loads(self._text(start, end)))]
+        except json.JSONDecodeError:
+            return []
+
+    def text(self) -> str:
+        """Return everything received so far."""
+        return "".join(self._buffer)
@@ -0,0 +1,193 @@
+"""
+Structured JSON output: upstream JSON mode, tolerant extraction and per-endpoint schemas.
+"""
+import os
+import re
+import json
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from metrics import timed, STAGE_JSON_PARSE
+
+# Structured output configuration
+GROQ_JSON_MODE = os.getenv("GROQ_JSON_MODE", "true").lower() in ("1", "true", "yes")
+JSON_REPAIR = os.getenv("JSON_REPAIR", "true").lower() in ("1", "true", "yes")  # re-ask for missing keys
+
+# Markdown code fence around a response, with or without a language tag
+_FENCE_PATTERN = re.compile(r"```[a-zA-Z]*\s*(.*?)```", re.DOTALL)
+_decoder = json.JSONDecoder()
+
+
+def _balanced_end(text: str, start: int) -> int:
+    """Index just past the bracket closing the one at start, or len(text) if unbalanced."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return len(text)
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Drop commas that directly precede a closing bracket, outside strings."""
+    out = []
+    in_string = False
+    escaped = False
+    length = len(text)
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            lookahead = index + 1
+            while lookahead < length and text[lookahead].isspace():
+                lookahead += 1
+            if lookahead < length and text[lookahead] in "}]":
+                continue
+        out.append(char)
+    return "".join(out)
+
+
+class OutputStats:
+    """Counters for how model output was turned into JSON."""
+
+    def __init__(self):
+        self.parsed = 0
+        self.recovered = 0
+        self.unparseable = 0
+        self.reasked = 0
+        self.repaired = 0
+        self.incomplete = 0
+        self.json_mode_unsupported: Set[str] = set()
+
+    def as_dict(self) -> dict:
+        """Report counters for the health endpoint."""
+        return {
+            "jsonMode": GROQ_JSON_MODE,
+            "parsed": self.parsed,
+            "recovered": self.recovered,
+            "unparseable": self.unparseable,
+            "reasked": self.reasked,
+            "repaired": self.repaired,
+            "incomplete": self.incomplete,
+            "jsonModeUnsupported": sorted(self.json_mode_unsupported),
+        }
+
+
+output_stats = OutputStats()
+
+
+@timed(STAGE_JSON_PARSE)
+def extract_json(text: str) -> Optional[Any]:
+    """
+    Parse model output as JSON, tolerating common formatting slips.
+
+    Tries a plain parse first. Otherwise strips a markdown fence, takes the
+    first JSON object in the text and, if that still fails, removes trailing
+    commas before closing brackets.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        The parsed value, or None if no JSON object could be recovered
+    """
+    try:
+        value = json.loads(text)
+        output_stats.parsed += 1
+        return value
+    except ValueError:
+        pass
+
+    fenced = _FENCE_PATTERN.search(text)
+    candidate = fenced.group(1) if fenced else text
+    start = candidate.find("{")
+    if start != -1:
+        snippet = candidate[start:_balanced_end(candidate, start)]
+        for attempt in (snippet, _strip_trailing_commas(snippet)):
+            try:
+                value, _ = _decoder.raw_decode(attempt)
+            except ValueError:
+                continue
+            output_stats.recovered += 1
+            return value
+
+    output_stats.unparseable += 1
+    return None
+
+
+def json_mode_supported(model: str) -> bool:
+    """Whether to request upstream JSON mode from a model."""
+    return GROQ_JSON_MODE and model not in output_stats.json_mode_unsupported
+
+
+def mark_json_mode_unsupported(model: str):
+    """Stop requesting JSON mode from a model that rejected it."""
+    output_stats.json_mode_unsupported.add(model)
+
+
+class JsonSchema(NamedTuple):
+    """Required top-level keys of a response and their expected types."""
+
+    name: str
+    keys: Dict[str, Any]
+
+    def normalize(self, value: Any) -> Any:
+        """Wrap bare strings in a list where the schema expects a list."""
+        if not isinstance(value, dict):
+            return value
+        for key, expected in self.keys.items():
+            if expected is list and isinstance(value.get(key), str):
+                value[key] = [value[key]]
+        return value
+
+    def problems(self, value: Any) -> List[str]:
+        """
+        Keys that are missing or have the wrong type.
+
+        Args:
+            value: Parsed response
+
+        Returns:
+            Offending key names, or every key if value is not an object
+        """
+        if not isinstance(value, dict):
+            return list(self.keys)
+        return [
+            key for key, expected in self.keys.items()
+            if key not in value or (expected is not object and not isinstance(value[key], expected))
+        ]
+
+
+# Schemas for each structured endpoint
+LEARNING_SCHEMA = JsonSchema("learning", {
+    "translation": list, "grammar": list, "vocabulary": list, "suggestions": list, "cultural": list,
+})
+EXERCISE_SCHEMA = JsonSchema("exercises", {"questions": list, "answers": list})
+INCREMENTAL_ANALYSIS_SCHEMA = JsonSchema("incremental_analysis", {"messages": list, "summary": str})
+ANALYZER_SCHEMA = JsonSchema("analyzer", {"score": (int, float), "feedback": str, "tip": str})
+
+
+def analysis_schema(aspects: Iterable[str]) -> JsonSchema:
+    """Schema requiring one key of any type per analyzed aspect."""
+    return JsonSchema("analysis", {aspect: object for aspect in aspects})
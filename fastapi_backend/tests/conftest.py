@@ -0,0 +1,19 @@
+"""
+Shared test setup: import the backend modules from the parent directory and
+keep every store in memory or a temporary directory so tests leave no
+databases behind.
+"""
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("USER_STORE", "memory")
+os.environ.setdefault("SESSION_STORE", "memory")
+_DB_DIR = tempfile.mkdtemp(prefix="voxify-tests-")
+os.environ.setdefault("JOBS_DB", os.path.join(_DB_DIR, "jobs.db"))
+os.environ.setdefault("SUMMARY_DB", os.path.join(_DB_DIR, "summaries.db"))
+os.environ.setdefault("ANALYSIS_STATE_DB", os.path.join(_DB_DIR, "analysis_state.db"))
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
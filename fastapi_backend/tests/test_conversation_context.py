@@ -0,0 +1,72 @@
+import asyncio
+
+from conversation_context import ConversationContext, estimate_tokens, format_message
+
+
+class Message:
+    def __init__(self, text):
+        self.speaker, self.language, self.text = "A", "en", text
+
+
+def _messages(count):
+    return [Message(f"message number {index} " * 5) for index in range(count)]
+
+
+def _summarizer(calls):
+    async def summarize(previous, lines):
+        calls.append(lines)
+        return f"{len(lines)} messages"
+    return summarize
+
+
+def test_summary_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "summaries.db")
+    first, second = ConversationContext(db_path=path), ConversationContext(db_path=path)
+    calls = []
+    messages = _messages(8)
+
+    async def scenario():
+        one = await first.build(messages, 60, _summarizer(calls), "chat")
+        two = await second.build(messages, 60, _summarizer(calls), "chat")
+        return one, two
+
+    try:
+        one, two = asyncio.run(scenario())
+    finally:
+        first.close()
+        second.close()
+    assert len(calls) == 1
+    assert one == two and one[0] == f"{len(calls[0])} messages"
+    assert second.summaries_reused == 1
+
+
+def test_reused_summary_still_fits_the_budget(tmp_path):
+    context = ConversationContext(db_path=str(tmp_path / "summaries.db"))
+    calls = []
+    messages = _messages(10)
+
+    async def scenario():
+        await context.build(messages[:8], 60, _summarizer(calls), "chat")
+        return await context.build(messages, 60, _summarizer(calls), "chat")
+
+    try:
+        summary, recent, omitted = asyncio.run(scenario())
+    finally:
+        context.close()
+    # Two more messages slide fewer than SUMMARY_MIN_MESSAGES out of the window, so no new summary
+    assert len(calls) == 1 and summary == f"{len(calls[0])} messages"
+    assert sum(estimate_tokens(format_message(message)) for message in recent) <= 60
+    assert omitted == 2 and recent == messages[len(messages) - len(recent):]
+
+
+def test_conversation_ids_are_scoped_to_the_caller():
+    from fixed_backend import conversation_key
+    from scheduler import current_user_key
+
+    keys = []
+    for caller in ("user:1", "user:2", "ip:10.0.0.7"):
+        token = current_user_key.set(caller)
+        keys.append(conversation_key("chat-42"))
+        current_user_key.reset(token)
+    assert len(set(keys)) == 3
+    assert conversation_key(None) is None
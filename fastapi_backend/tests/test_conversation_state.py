@@ -0,0 +1,73 @@
+import asyncio
+
+from conversation_state import ConversationStateStore
+
+
+def _delta(sentiment, summary):
+    return {"messages": [{"sentiment": sentiment, "cultural": "Uses a greeting."}], "summary": summary}
+
+
+def test_concurrent_workers_both_keep_their_deltas(tmp_path):
+    # Two stores on one file stand in for two worker processes
+    path = str(tmp_path / "state.db")
+    first, second = ConversationStateStore(db_path=path), ConversationStateStore(db_path=path)
+
+    async def scenario():
+        stale = await first.get("chat")
+        fresh = await second.get("chat")
+        await second.update("chat", fresh, lambda state: state.apply(["B"], ["Speaker B (en): no"], _delta(-1.0, "B disagrees")))
+        await first.update("chat", stale, lambda state: state.apply(["A"], ["Speaker A (en): yes"], _delta(1.0, "A agrees")))
+        return await second.get("chat")
+
+    try:
+        state = asyncio.run(scenario())
+    finally:
+        first.close()
+        second.close()
+    assert first.conflicts == 1 and second.conflicts == 0
+    assert state.message_count == 2 and state.version == 2
+    assert state.snapshot(["sentiment"])["sentiment"] == {"score": 0.0, "label": "neutral", "messages": 2}
+    assert set(state.speakers) == {"A", "B"} and state.summary == "A agrees"
+
+
+def test_expired_and_reset_conversations_start_over(tmp_path):
+    store = ConversationStateStore(ttl=-1, db_path=str(tmp_path / "state.db"))
+
+    async def scenario():
+        await store.update("chat", await store.get("chat"), lambda state: state.apply(["A"], ["line"], _delta(1.0, "s")))
+        expired = await store.get("chat")
+        seen = (expired.message_count, expired.version)
+        # The expired row is replaced in place
+        replaced = await store.update("chat", expired, lambda state: state.apply(["A"], ["line"], _delta(1.0, "s")))
+        await store.reset("chat")
+        return seen, replaced.version, await store.get("chat")
+
+    try:
+        seen, replaced_version, after_reset = asyncio.run(scenario())
+    finally:
+        store.close()
+    assert seen == (0, 1) and replaced_version == 2 and store.conflicts == 0
+    assert after_reset.message_count == 0 and after_reset.version == 0
+
+
+def test_incremental_state_is_scoped_to_the_caller(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import fixed_backend
+
+    async def fake_json(prompt, system_message, schema, task, label):
+        return {"messages": [{"sentiment": 0.8}], "summary": "Friendly."}, False
+
+    monkeypatch.setattr(fixed_backend, "call_groq_json", fake_json)
+    body = {"conversationId": "shared-id", "newMessages": [{"text": "Hello!", "speaker": "A", "language": "en"}]}
+    def from_address(address):
+        async def app(scope, receive, send):
+            scope["client"] = (address, 5000)
+            await fixed_backend.app(scope, receive, send)
+        return TestClient(app)
+
+    owner, other = from_address("10.0.0.1"), from_address("10.0.0.2")
+
+    assert owner.post("/analyze-conversation/incremental", json=body).json()["messageCount"] == 1
+    assert other.post("/analyze-conversation/incremental", json=body).json()["messageCount"] == 1
+    assert owner.post("/analyze-conversation/incremental", json=body).json()["messageCount"] == 2
@@ -0,0 +1,55 @@
+import sqlite3
+import time
+
+import job_queue
+from job_queue import JobStore, QUEUED, retry_delay
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_DELAY", 5.0)
+    monkeypatch.setattr(job_queue, "JOB_RETRY_MAX_DELAY", 30.0)
+    assert [retry_delay(attempt) for attempt in range(1, 6)] == [5.0, 10.0, 20.0, 30.0, 30.0]
+
+
+def test_requeued_job_is_not_claimed_before_its_delay(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.insert("generate-exercises", {"text": "hola"}, None, "user")
+    job_id = store.claim(60)[0]
+
+    store.requeue(job_id, "upstream 503", delay=30)
+    assert store.claim(60) is None
+    waiting = store.get(job_id)
+    assert waiting["status"] == QUEUED and waiting["error"] == "upstream 503"
+    assert waiting["retryAt"] > time.time()
+
+    store.requeue(job_id, "upstream 503")
+    claimed = store.claim(60)
+    assert claimed[0] == job["jobId"] and claimed[4] == 2
+    store.close()
+
+
+def test_old_table_gains_available_at(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, payload TEXT NOT NULL, "
+        "result TEXT, error TEXT, webhook_url TEXT, webhook_status TEXT, user_key TEXT, "
+        "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, "
+        "finished_at REAL, lease_until REAL, expires_at REAL)"
+    )
+    conn.execute("INSERT INTO jobs (id, kind, status, payload, created_at) VALUES ('old', 'k', 'queued', '{}', 0)")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    assert store.claim(60)[0] == "old"
+    store.close()
+
+
+def test_job_is_readable_only_by_its_submitter(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.insert("generate-exercises", {"text": "hola"}, None, "user:1")
+    assert store.get(job["jobId"], "user:1")["jobId"] == job["jobId"]
+    assert store.get(job["jobId"], "user:2") is None
+    assert store.get(job["jobId"], "ip:127.0.0.1") is None
+    store.close()
@@ -0,0 +1,124 @@
+"""
+Tests for local language detection and how translate_text uses it.
+"""
+import asyncio
+
+import pytest
+
+from language_id import LanguageDetector
+
+# Text in languages the app does not support, several close to a supported one
+UNSUPPORTED = [
+    "Jag älskar dig",
+    "Tack så mycket för din hjälp",
+    "Jeg elsker deg",
+    "Tusen takk for hjelpen",
+    "Mange tak for din hjælp",
+    "Kiitos paljon avustasi",
+    "Děkuji moc za pomoc",
+    "Unde este gara?",
+    "Mulțumesc mult pentru ajutor",
+    "Köszönöm szépen a segítséget",
+    "Moltes gràcies per la teva ajuda",
+    "Де знаходиться вокзал?",
+    "Terima kasih banyak atas bantuanmu",
+    "Ευχαριστώ πολύ για τη βοήθειά σου",
+    "איפה תחנת הרכבת?",
+]
+
+SUPPORTED = {
+    "en": "I would like to book a table for two.",
+    "es": "¿Dónde está la estación de tren?",
+    "fr": "Je voudrais réserver une table pour deux.",
+    "de": "Ich möchte einen Tisch für zwei Personen reservieren.",
+    "nl": "Ik wil graag een tafel voor twee reserveren.",
+    "pt": "Eu gostaria de reservar uma mesa para dois.",
+    "ru": "Спасибо большое за помощь",
+    "ja": "駅はどこですか？",
+    "th": "สถานีรถไฟอยู่ที่ไหน",
+}
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return LanguageDetector()
+
+
+@pytest.mark.parametrize("text", UNSUPPORTED)
+def test_unsupported_language_stays_auto(detector, text):
+    assert detector.detect(text).language == "auto"
+
+
+@pytest.mark.parametrize("language,text", sorted(SUPPORTED.items()))
+def test_supported_language_is_detected(detector, language, text):
+    assert detector.detect(text).language == language
+
+
+def test_batch_matches_single(detector):
+    texts = list(SUPPORTED.values()) + UNSUPPORTED + ["ok", ""]
+    assert [d.language for d in detector.detect_batch(texts)] == [detector.detect(text).language for text in texts]
+
+
+def test_short_text_stays_auto(detector):
+    assert detector.detect("ok").language == "auto"
+
+
+def _translate(monkeypatch, text, source, target):
+    """Run translate_text with a stubbed upstream; return the result and the prompts sent."""
+    import fixed_backend
+
+    calls = []
+
+    async def fake_call(prompt, system_message, **kwargs):
+        calls.append(prompt)
+        return {"success": True, "content": "übersetzt"}
+
+    monkeypatch.setattr(fixed_backend, "call_groq_api", fake_call)
+    result = asyncio.run(fixed_backend.translate_text(text, source, target, True))
+    return result, calls
+
+
+def test_unsupported_text_is_not_returned_untranslated(monkeypatch):
+    result, calls = _translate(monkeypatch, "Jag älskar dig så mycket", "auto", "de")
+    assert calls, "text outside the profiles must go to the LLM"
+    assert result["translation"] == "übersetzt"
+    assert result["detectedLanguage"] == "auto"
+
+
+def test_detected_target_language_still_goes_upstream(monkeypatch):
+    result, calls = _translate(monkeypatch, "Ich möchte einen Tisch reservieren", "auto", "de")
+    assert calls
+    assert result["detectedLanguage"] == "de"
+
+
+def test_explicit_source_equal_to_target_skips_upstream(monkeypatch):
+    result, calls = _translate(monkeypatch, "Ich möchte einen Tisch reservieren", "de", "de")
+    assert not calls
+    assert result["translation"] == "Ich möchte einen Tisch reservieren"
+
+
+def test_undetected_text_skips_the_translation_memory(monkeypatch):
+    import fixed_backend
+    from translation_memory import TranslationMemory
+
+    memory = TranslationMemory(db_path="")
+    monkeypatch.setattr(fixed_backend, "translation_memory", memory)
+    for _ in range(2):
+        result, calls = _translate(monkeypatch, "Jag älskar dig så mycket", "auto", "de")
+        assert calls and result["memoryMatch"] is None
+        assert "auto" not in calls[0]
+    assert memory.stats()["size"] == 0
+
+
+def test_labelling_leaves_request_messages_untouched():
+    import fixed_backend
+
+    messages = [
+        fixed_backend.ChatMessage(text=SUPPORTED["fr"], speaker="A"),
+        fixed_backend.ChatMessage(text="Jag älskar dig", speaker="B"),
+        fixed_backend.ChatMessage(text="Hello there, how are you?", speaker="A", language="en"),
+    ]
+    labelled = fixed_backend.label_languages(messages)
+    assert [msg.language for msg in labelled] == ["fr", "auto", "en"]
+    assert [msg.language for msg in messages] == ["auto", "auto", "en"]
+    assert fixed_backend.format_message(labelled[1]) == "Speaker B: Jag älskar dig"
@@ -0,0 +1,70 @@
+"""
+Tests that both session backends store and page learning sessions the same way.
+"""
+import asyncio
+
+import pytest
+
+from learning_sessions import InMemorySessionRepository, SessionWriter, SQLiteSessionRepository
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repository(request, tmp_path):
+    repo = InMemorySessionRepository() if request.param == "memory" else SQLiteSessionRepository(str(tmp_path / "sessions.db"), 2)
+    yield repo
+    repo.close()
+
+
+def _row(session_id, user_id, created_at):
+    return {"id": session_id, "user_id": user_id, "text": f"text {session_id}", "user_language": "en",
+            "target_language": "es", "proficiency_level": "beginner", "focus_area": "vocabulary",
+            "suggestions": '{"tips": ["hola"]}', "created_at": created_at}
+
+
+def test_recent_returns_one_users_rows_newest_first(repository):
+    rows = [
+        _row("a", "1", "2024-01-01T10:00:00+00:00"),
+        _row("b", "2", "2024-01-01T11:00:00+00:00"),
+        _row("c", "1", "2024-01-01T12:00:00+00:00"),
+        _row("d", "1", "2024-01-01T09:00:00+00:00"),
+    ]
+
+    async def scenario():
+        await repository.insert_many(rows)
+        return await repository.recent("1", 2), await repository.recent("3", 10)
+
+    newest, nobody = asyncio.run(scenario())
+    assert newest == [rows[2], rows[0]]
+    assert nobody == []
+
+
+def test_duplicate_id_fails_the_whole_batch(tmp_path):
+    repository = SQLiteSessionRepository(str(tmp_path / "sessions.db"), 1)
+
+    async def scenario():
+        await repository.insert_many([_row("a", "1", "2024-01-01T10:00:00+00:00")])
+        with pytest.raises(Exception):
+            await repository.insert_many([_row("b", "1", "2024-01-01T11:00:00+00:00"),
+                                          _row("a", "1", "2024-01-01T12:00:00+00:00")])
+        return await repository.recent("1", 10)
+
+    try:
+        assert [row["id"] for row in asyncio.run(scenario())] == ["a"]
+    finally:
+        repository.close()
+
+
+def test_writer_serves_unflushed_and_stored_sessions(repository):
+    writer = SessionWriter(repository, batch_size=2)
+
+    async def scenario():
+        writer.record("1", "uno", "en", "es", "beginner", "vocabulary", {"tips": ["uno"]})
+        writer.record("1", "dos", "en", "es", "beginner", "vocabulary", {"tips": ["dos"]})
+        await writer.flush()
+        writer.record("1", "tres", "en", "es", "beginner", "vocabulary", {"tips": ["tres"]})
+        return await writer.recent("1", 10)
+
+    sessions = asyncio.run(scenario())
+    assert [session["text"] for session in sessions] == ["tres", "dos", "uno"]
+    assert sessions[0]["suggestions"] == {"tips": ["tres"]} and sessions[0]["targetLanguage"] == "es"
+    assert writer.written == 2 and writer.batches == 1
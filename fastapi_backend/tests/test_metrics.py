@@ -0,0 +1,46 @@
+from metrics import METRICS_PREFIX, MetricsRegistry
+
+
+def test_counter_exposition():
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests", "Requests served.", ("route", "status"))
+    requests.labels("/translate", 200).inc()
+    requests.labels("/translate", 200).inc(2)
+    requests.labels('/say "hi"', 500).inc()
+
+    name = f"{METRICS_PREFIX}_test_requests"
+    assert registry.render().splitlines() == [
+        f"# HELP {name} Requests served.",
+        f"# TYPE {name} counter",
+        f'{name}_total{{route="/translate",status="200"}} 3',
+        f'{name}_total{{route="/say \\"hi\\"",status="500"}} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_latency", "Latency.", buckets=(0.5, 0.1))
+    for value in (0.05, 0.1, 0.3, 2):
+        latency.labels().observe(value)
+
+    name = f"{METRICS_PREFIX}_test_latency"
+    assert registry.render().splitlines()[2:] == [
+        f'{name}_bucket{{le="0.1"}} 2',
+        f'{name}_bucket{{le="0.5"}} 3',
+        f'{name}_bucket{{le="+Inf"}} 4',
+        f"{name}_sum 2.45",
+        f"{name}_count 4",
+    ]
+
+
+def test_failing_gauge_is_skipped():
+    registry = MetricsRegistry()
+    registry.gauge("test_broken", "Broken.", (), lambda: 1 / 0)
+    registry.gauge("test_depth", "Depth.", ("queue",), lambda: [(("ocr",), 3), (("jobs",), 0.5)])
+
+    assert registry.render().splitlines() == [
+        f"# HELP {METRICS_PREFIX}_test_depth Depth.",
+        f"# TYPE {METRICS_PREFIX}_test_depth gauge",
+        f'{METRICS_PREFIX}_test_depth{{queue="ocr"}} 3',
+        f'{METRICS_PREFIX}_test_depth{{queue="jobs"}} 0.5',
+    ]
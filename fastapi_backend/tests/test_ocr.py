@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+import pytest
+
+from ocr import OcrError, OcrLanguageError, OcrPool, OcrWorkerError, check_languages
+
+
+def test_dead_worker_fails_one_request_and_the_pool_recovers():
+    pool = OcrPool(workers=1, max_pending=2)
+
+    async def scenario():
+        # Kill the only worker process, which breaks the executor
+        broken = pool._pool()
+        with pytest.raises(Exception):
+            await asyncio.wrap_future(broken.submit(os._exit, 1))
+
+        with pytest.raises(OcrWorkerError):
+            await pool.run(b"not an image")
+        # A fresh executor serves the next image; this one is simply unreadable
+        with pytest.raises(OcrError):
+            await pool.run(b"not an image")
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.close()
+    assert pool.crashed == 1 and pool.restarts == 1 and pool.failed == 1
+
+
+@pytest.mark.parametrize("languages", ["deu", "eng+deu", "eng+", "", "eng --psm 0", "../../tmp/x"])
+def test_languages_outside_the_configured_set_are_rejected(languages):
+    with pytest.raises(OcrLanguageError):
+        check_languages(languages, "eng+spa")
+
+
+def test_configured_languages_and_subsets_pass():
+    assert check_languages("spa+eng", "eng+spa") == "spa+eng"
+    assert check_languages("eng", "eng+spa") == "eng"
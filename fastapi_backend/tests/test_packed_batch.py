@@ -0,0 +1,58 @@
+"""
+Tests for packed batch prompts: the batch instructions must sit in the same
+message as the per-item format they override.
+"""
+import asyncio
+import json
+
+import fixed_backend
+from structured_output import LEARNING_SCHEMA
+
+
+def test_packed_prompt_is_not_split(monkeypatch):
+    calls = []
+
+    async def fake_call(prompt, system_message, **kwargs):
+        calls.append((system_message, prompt))
+        return {"success": False, "error": "stub"}
+
+    monkeypatch.setattr(fixed_backend, "call_groq_api", fake_call)
+    asyncio.run(fixed_backend._generate_packed(
+        ["I goes home.", "She have a cat."],
+        lambda text: fixed_backend.build_learning_prompt(text, "en", "es", "beginner", "grammar", split=False),
+        "grammar",
+        LEARNING_SCHEMA,
+    ))
+
+    system_message, prompt = calls[0]
+    assert system_message == fixed_backend.LEARNING_SYSTEM_MESSAGE
+    # The single-item format and the override that replaces it are read together
+    single = fixed_backend.build_learning_prompt("x", "en", "es", "beginner", "grammar", split=False)[1]
+    assert prompt.startswith(single.split("x", 1)[0])
+    assert "overrides the response format above" in prompt
+    assert "contains 2 numbered sentences" in prompt
+
+
+def test_single_prompt_is_still_split():
+    system_message, prompt = fixed_backend.build_learning_prompt("I goes home.", "en", "es", "beginner", "grammar")
+    if fixed_backend.prompt_registry.get("GRAMMAR_PROMPT").static:
+        assert system_message != fixed_backend.LEARNING_SYSTEM_MESSAGE
+    assert "I goes home." in prompt
+
+
+def test_packed_items_come_back_normalized(monkeypatch):
+    item = {"translation": "Voy a casa.", "grammar": ["goes -> go"], "vocabulary": [], "suggestions": "Practise verbs.", "cultural": []}
+
+    async def fake_call(prompt, system_message, **kwargs):
+        return {"success": True, "content": json.dumps({"items": [item, item]}), "cached": False}
+
+    monkeypatch.setattr(fixed_backend, "call_groq_api", fake_call)
+    items, cached = asyncio.run(fixed_backend._generate_packed(
+        ["I goes home.", "She have a cat."],
+        lambda text: fixed_backend.build_learning_prompt(text, "en", "es", "beginner", "grammar", split=False),
+        "grammar",
+        LEARNING_SCHEMA,
+    ))
+    assert not cached
+    assert [result["translation"] for result in items] == [["Voy a casa."], ["Voy a casa."]]
+    assert items[0]["suggestions"] == ["Practise verbs."]
@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+import httpx
+
+import fixed_backend
+import response_cache
+from model_router import ModelTarget, model_router
+from response_cache import DiskCache, ResponseCache
+
+
+def test_disk_tier_purges_expired_and_excess_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "PURGE_EVERY", 5)
+    disk = DiskCache(str(tmp_path / "cache.db"), max_rows=3)
+    now = time.time()
+    disk.set("expired", "old", now - 1)
+    for index in range(4):
+        disk.set(f"key-{index}", "value", now + 100 + index)
+
+    keys = [row[0] for row in disk._conn.execute("SELECT key FROM response_cache ORDER BY key")]
+    disk.close()
+    assert keys == ["key-1", "key-2", "key-3"] and disk.purged == 2
+
+
+def test_fallback_answer_is_not_cached(monkeypatch):
+    primary, fallback = ModelTarget("primary-model"), ModelTarget("fallback-model")
+    cache = ResponseCache()
+    monkeypatch.setattr(fixed_backend, "response_cache", cache)
+    monkeypatch.setattr(model_router, "route", lambda task, tokens: [primary, fallback])
+
+    async def hedged(chain, send):
+        body = {"model": fallback.model, "choices": [{"message": {"content": '{"answer": 1}'}}]}
+        return fallback, httpx.Response(200, json=body)
+
+    monkeypatch.setattr(model_router, "hedged", hedged)
+    result = asyncio.run(fixed_backend.call_groq_api("prompt", "system"))
+    assert result["success"] and result["model"] == "fallback-model"
+    assert result["cacheKey"] is None and cache.stats()["size"] == 0
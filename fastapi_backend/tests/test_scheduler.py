@@ -0,0 +1,64 @@
+import asyncio
+
+from scheduler import PriorityMiddleware, current_user_key
+
+
+async def _resolve(token):
+    return "42" if token == "valid" else None
+
+
+def _user_key(headers, client=("10.0.0.7", 5000)):
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["key"] = current_user_key.get()
+
+    middleware = PriorityMiddleware(app, routes={}, resolve_user=_resolve)
+    scope = {"type": "http", "path": "/translate", "headers": headers, "client": client}
+    asyncio.run(middleware(scope, None, None))
+    return seen["key"]
+
+
+def test_bearer_token_keys_on_the_user():
+    assert _user_key([(b"authorization", b"Bearer valid")]) == "user:42"
+
+
+def test_client_headers_do_not_set_the_key():
+    assert _user_key([(b"x-user-id", b"someone-else")]) == "ip:10.0.0.7"
+
+
+def test_invalid_token_falls_back_to_the_address():
+    assert _user_key([(b"authorization", b"Bearer forged"), (b"x-user-id", b"42")]) == "ip:10.0.0.7"
+
+
+def test_joining_interactive_caller_raises_a_shared_background_call():
+    from scheduler import BACKGROUND, INTERACTIVE, PriorityScheduler, current_priority
+    from singleflight import SingleFlight
+
+    scheduler = PriorityScheduler(max_concurrent=2, interactive_reserved=1)
+    flights = SingleFlight()
+    granted = []
+
+    async def upstream():
+        async with scheduler.slot():
+            granted.append("shared")
+            return "answer"
+
+    async def caller(priority):
+        current_priority.set(priority)
+        return await flights.do("prompt", upstream)
+
+    async def scenario():
+        # The only non-reserved slot is busy, so background work has to queue
+        await scheduler.acquire(BACKGROUND, "other")
+        background = asyncio.ensure_future(caller(BACKGROUND))
+        await asyncio.sleep(0)
+        assert granted == []
+        # An interactive joiner may use the reserved slot, and takes the shared call with it
+        result = await asyncio.wait_for(caller(INTERACTIVE), timeout=1)
+        return result, await background
+
+    (answer, joined), (background_answer, background_joined) = asyncio.run(scenario())
+    assert answer == background_answer == "answer" and joined and not background_joined
+    assert granted == ["shared"]
+    assert scheduler.stats()["classes"]["interactive"]["granted"] == 1
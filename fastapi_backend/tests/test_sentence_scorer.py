@@ -0,0 +1,52 @@
+"""
+Tests for the local sentence scorer's escalation decisions.
+"""
+import pytest
+
+from sentence_scorer import SentenceScorer, is_slip
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return SentenceScorer()
+
+
+def test_clean_sentence_is_answered_locally(scorer):
+    result = scorer.analyze("She has been learning Spanish for three years.", "en")
+    assert result.escalation_reason is None
+    assert result.issues == [] and result.score == 100
+
+
+def test_confusable_word_goes_to_the_llm(scorer):
+    # The local pass cannot see the their/they're confusion
+    result = scorer.analyze("Their going to the store.", "en")
+    assert result.escalation_reason == "confusable_words"
+
+
+def test_unknown_language_is_not_cached(scorer):
+    for language in ("xx", "zz-top", "../en"):
+        assert scorer.analyze("Hello there.", language).escalation_reason == "no_wordlist"
+    assert set(scorer._indexes) <= scorer.available
+
+
+def test_rare_word_is_not_a_typo(scorer):
+    result = scorer.analyze("I saw the heron near the pond.", "en")
+    assert not [issue for issue in result.issues if issue.kind == "spelling"]
+    assert result.escalation_reason is not None
+
+
+def test_slip_is_answered_locally(scorer):
+    result = scorer.analyze("I will recieve it tomorrow.", "en")
+    assert result.escalation_reason is None
+    assert result.issues[0].suggestion == "receive"
+
+
+@pytest.mark.parametrize("word,candidate,expected", [
+    ("teh", "the", True),
+    ("untill", "until", True),
+    ("occured", "occurred", True),
+    ("heron", "hero", False),
+    ("definately", "definitely", False),
+])
+def test_is_slip(word, candidate, expected):
+    assert is_slip(word, candidate) is expected
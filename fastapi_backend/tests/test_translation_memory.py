@@ -0,0 +1,31 @@
+"""
+Tests for the translation memory: only exact matches stand in for a translation.
+"""
+import asyncio
+
+from translation_memory import TranslationMemory
+
+
+def _memory(*entries):
+    memory = TranslationMemory(db_path="")
+    for text, translation, style in entries:
+        asyncio.run(memory.store(text, "en", "es", style, translation))
+    return memory
+
+
+def test_near_match_is_only_a_reference():
+    memory = _memory(("The meeting is at 10:30", "La reunión es a las 10:30", "natural"))
+    assert memory.lookup("The meeting is at 11:30", "en", "es", "natural") is None
+    reference = memory.reference("The meeting is at 11:30", "en", "es", "natural")
+    assert reference["translation"] == "La reunión es a las 10:30"
+
+
+def test_exact_match_ignores_case_and_spacing():
+    memory = _memory(("I like it", "Me gusta", "natural"))
+    assert memory.lookup("  i LIKE it ", "en", "es", "natural") == "Me gusta"
+
+
+def test_styles_do_not_share_entries():
+    memory = _memory(("I like it", "Me gusta", "natural"))
+    assert memory.lookup("I like it", "en", "es", "literal") is None
+    assert memory.reference("I like it", "en", "es", "literal") is None
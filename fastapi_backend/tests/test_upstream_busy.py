@@ -0,0 +1,19 @@
+"""
+Tests that a saturated upstream limiter gives clients a retryable response.
+"""
+import time
+
+from fastapi.testclient import TestClient
+
+import fixed_backend
+from rate_limiter import upstream_limiter
+
+
+def test_long_upstream_pause_answers_503_with_retry_after(monkeypatch):
+    # A Retry-After pause longer than the queue timeout fails fast
+    monkeypatch.setattr(upstream_limiter, "_paused_until", time.monotonic() + 60)
+    client = TestClient(fixed_backend.app)
+    response = client.post("/translate", json={"text": "Where is the station?", "sourceLanguage": "en", "targetLanguage": "es"})
+    assert response.status_code == 503
+    assert 55 <= int(response.headers["retry-after"]) <= 60
+    assert response.json()["errorType"] == "UPSTREAM_BUSY"
@@ -0,0 +1,73 @@
+"""
+Tests that both user backends store, look up and reject users the same way.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from user_store import InMemoryUserRepository, SQLiteUserRepository, UserExistsError
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repository(request, tmp_path):
+    repo = InMemoryUserRepository() if request.param == "memory" else SQLiteUserRepository(str(tmp_path / "users.db"), 2)
+    yield repo
+    repo.close()
+
+
+def _user(username, email):
+    return {"id": f"id-{username}", "username": username, "email": email,
+            "hashed_password": "hash", "created_at": datetime(2024, 1, 2, 3, 4, 5)}
+
+
+def test_round_trip_and_password_update(repository):
+    async def scenario():
+        await repository.create(_user("ana", "Ana@Example.com"))
+        await repository.update_password_hash("ana", "new-hash")
+        return await repository.get_by_username("ana"), await repository.get_by_username("ANA")
+
+    stored, other_case = asyncio.run(scenario())
+    assert stored == {**_user("ana", "Ana@Example.com"), "hashed_password": "new-hash"}
+    assert other_case is None
+
+
+def test_email_lookup_and_uniqueness_ignore_ascii_case_only(repository):
+    async def scenario():
+        await repository.create(_user("emile", "Émile@Example.com"))
+        found = await repository.get_by_email("Émile@EXAMPLE.COM")
+        # Non-ASCII letters are compared exactly, as SQLite's NOCASE does
+        other = await repository.get_by_email("émile@example.com")
+        with pytest.raises(UserExistsError) as duplicate:
+            await repository.create(_user("emile2", "ÉMILE@example.COM"))
+        await repository.create(_user("emile3", "émile@example.com"))
+        return found, other, duplicate.value.field
+
+    found, other, field = asyncio.run(scenario())
+    assert found["username"] == "emile"
+    assert other is None
+    assert field == "Email"
+
+
+def test_duplicate_username_is_rejected(repository):
+    async def scenario():
+        await repository.create(_user("ana", "a@example.com"))
+        await repository.create(_user("ana", "b@example.com"))
+
+    with pytest.raises(UserExistsError, match="Username"):
+        asyncio.run(scenario())
+
+
+def test_routes_use_the_current_repository(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import auth
+    import fixed_backend
+
+    repository = InMemoryUserRepository()
+    monkeypatch.setattr(auth, "user_repository", repository)
+    response = TestClient(fixed_backend.app).post(
+        "/auth/register", json={"username": "lee", "email": "lee@example.com", "password": "secret123"}
+    )
+    assert response.status_code == 200
+    assert asyncio.run(repository.get_by_username("lee"))["email"] == "lee@example.com"
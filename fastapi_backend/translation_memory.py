@@ -0,0 +1,220 @@
+"""
+Translation memory with exact and fuzzy near-match lookup.
+"""
+import os
+import asyncio
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, Optional, Set, Tuple
+
+from loguru import logger
+
+# Translation memory configuration
+TM_MAX_ENTRIES = int(os.getenv("TM_MAX_ENTRIES", 50000))
+TM_FUZZY_THRESHOLD = float(os.getenv("TM_FUZZY_THRESHOLD", 0.92))  # 0 disables near-match references
+TM_FUZZY_CANDIDATES = int(os.getenv("TM_FUZZY_CANDIDATES", 5))
+TM_DB = os.getenv("TM_DB", "")  # Empty keeps the memory in-process only
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize source text for memory lookups.
+
+    Applies Unicode NFKC, case folding and whitespace collapsing so that
+    trivially different spellings of the same UI string share an entry.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized text, padded so short strings still index."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TranslationMemory:
+    """
+    Store of (normalized source, source lang, target lang, style) -> translation.
+
+    Style is the translation style the entry was produced with ("natural" or
+    "literal"), so one never answers a request for the other. Only exact
+    matches stand in for a translation, through a dict lookup. Near matches
+    differ in ways that matter, such as a number or a negation, so they are
+    only offered as a reference: reference() finds them through a character
+    trigram inverted index per language pair and style, re-scoring the
+    candidates sharing the most trigrams with difflib against a similarity
+    threshold. Entries are evicted least-recently-used, and an optional SQLite
+    file persists the memory across restarts.
+    """
+
+    def __init__(self, max_entries: int = TM_MAX_ENTRIES, fuzzy_threshold: float = TM_FUZZY_THRESHOLD, db_path: str = TM_DB):
+        self.max_entries = max_entries
+        self.fuzzy_threshold = fuzzy_threshold
+        self._entries: "OrderedDict[Tuple[str, str, str, str], str]" = OrderedDict()
+        self._index: Dict[Tuple[str, str, str], Dict[str, Set[str]]] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.exact_hits = 0
+        self.references = 0
+        self.misses = 0
+        if db_path:
+            self._open(db_path)
+
+    def _open(self, path: str):
+        """Open the SQLite store and load existing entries."""
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Entries from before the style column may mix styles and chat context, so they are not kept
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(translation_memory)")]
+        if columns and "style" not in columns:
+            logger.warning("Discarding translation memory entries stored without a translation style")
+            self._conn.execute("DROP TABLE translation_memory")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translation_memory ("
+            "source_norm TEXT NOT NULL, source_lang TEXT NOT NULL, target_lang TEXT NOT NULL, style TEXT NOT NULL, "
+            "translation TEXT NOT NULL, PRIMARY KEY (source_norm, source_lang, target_lang, style))"
+        )
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT source_norm, source_lang, target_lang, style, translation FROM translation_memory ORDER BY rowid DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for source_norm, source_lang, target_lang, style, translation in reversed(rows):
+            self._remember((source_norm, source_lang, target_lang, style), translation)
+
+    def lookup(self, text: str, source_lang: str, target_lang: str, style: str) -> Optional[str]:
+        """
+        Find the stored translation of exactly this text.
+
+        Args:
+            text: Source text
+            source_lang: Source language code (or "auto")
+            target_lang: Target language code
+            style: Translation style, "natural" or "literal"
+
+        Returns:
+            The stored translation, or None
+        """
+        key = (normalize_text(text), source_lang, target_lang, style)
+        translation = self._entries.get(key)
+        if translation is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.exact_hits += 1
+        return translation
+
+    def reference(self, text: str, source_lang: str, target_lang: str, style: str) -> Optional[dict]:
+        """
+        Find the closest stored source above the similarity threshold, as a reference for the model.
+
+        A near match is not a translation of text, so it must not be returned as one.
+
+        Args:
+            text: Source text
+            source_lang: Source language code (or "auto")
+            target_lang: Target language code
+            style: Translation style, "natural" or "literal"
+
+        Returns:
+            Dictionary with source, translation and similarity, or None
+        """
+        index = self._index.get((source_lang, target_lang, style)) if self.fuzzy_threshold > 0 else None
+        if not index:
+            return None
+        source_norm = normalize_text(text)
+
+        # Rank candidates by shared trigrams, then re-score the best few exactly
+        shared = Counter()
+        for gram in _trigrams(source_norm):
+            for candidate in index.get(gram, ()):
+                shared[candidate] += 1
+
+        best, best_score = None, self.fuzzy_threshold
+        for candidate, _count in shared.most_common(TM_FUZZY_CANDIDATES):
+            score = SequenceMatcher(None, source_norm, candidate).ratio()
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is None:
+            return None
+
+        key = (best, source_lang, target_lang, style)
+        self._entries.move_to_end(key)
+        self.references += 1
+        return {"source": best, "translation": self._entries[key], "similarity": round(best_score, 4)}
+
+    async def store(self, text: str, source_lang: str, target_lang: str, style: str, translation: str):
+        """
+        Record a translation that depends on nothing but the text, the languages and the style.
+
+        Args:
+            text: Source text
+            source_lang: Source language code (or "auto")
+            target_lang: Target language code
+            style: Translation style, "natural" or "literal"
+            translation: Translated text
+        """
+        key = (normalize_text(text), source_lang, target_lang, style)
+        self._remember(key, translation)
+        if self._conn is not None:
+            await asyncio.to_thread(self._persist, key, translation)
+
+    def _remember(self, key: Tuple[str, str, str, str], translation: str):
+        """Insert into the in-process store and index, evicting the oldest entries."""
+        if key not in self._entries:
+            pair_index = self._index.setdefault(key[1:], {})
+            for gram in _trigrams(key[0]):
+                pair_index.setdefault(gram, set()).add(key[0])
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            pair_index = self._index.get(old_key[1:], {})
+            for gram in _trigrams(old_key[0]):
+                sources = pair_index.get(gram)
+                if sources is not None:
+                    sources.discard(old_key[0])
+                    if not sources:
+                        del pair_index[gram]
+
+    def _persist(self, key: Tuple[str, str, str, str], translation: str):
+        """Write one entry to SQLite."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translation_memory (source_norm, source_lang, target_lang, style, translation) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (*key, translation),
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the SQLite store."""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict:
+        """
+        Report memory counters for the health endpoint.
+
+        Returns:
+            Dictionary with size and hit/miss counters
+        """
+        return {
+            "size": len(self._entries),
+            "maxEntries": self.max_entries,
+            "fuzzyThreshold": self.fuzzy_threshold,
+            "persistent": self._conn is not None,
+            "exactHits": self.exact_hits,
+            "references": self.references,
+            "misses": self.misses,
+        }
+
+
+# Shared translation memory used by the translation endpoints
+translation_memory = TranslationMemory()
@@ -182,6 +182,29 @@ Example format: {{
 
 Do not include any text outside the JSON structure."""
 
+# Compact variants of the learning prompts: same keys and content, without emoji and repeated instructions
+_LEARNING_COMPACT_HEAD = """You are a language tutor. Analyze the input sentence for a learner at the given level.
+
+Input sentence: "{text}"
+Source language: {user_lang}
+Target language: {target_lang}
+Level: {proficiency}
+"""
+
+_LEARNING_COMPACT_TAIL = """
+Return only a JSON object whose keys each hold an array of strings:
+- translation: natural translation, plus a literal one if notably different
+- grammar: structure, parts of speech, tense, voice and key concepts, pitched at the learner's level
+- vocabulary: key words and phrases, each with a simple definition and usage example
+- suggestions: similar patterns to practice, one or two rules or word sets to explore, and a follow-up exercise or question
+- cultural: cultural nuances, formality or regional variants, if any
+Format: {{"translation": [], "grammar": [], "vocabulary": [], "suggestions": [], "cultural": []}}"""
+
+GRAMMAR_PROMPT_COMPACT = _LEARNING_COMPACT_HEAD + "Focus: grammar\n" + _LEARNING_COMPACT_TAIL
+VOCABULARY_PROMPT_COMPACT = _LEARNING_COMPACT_HEAD + "Focus: vocabulary\n" + _LEARNING_COMPACT_TAIL
+IDIOMS_PROMPT_COMPACT = _LEARNING_COMPACT_HEAD + "Focus: idioms\n" + _LEARNING_COMPACT_TAIL
+GENERAL_PROMPT_COMPACT = _LEARNING_COMPACT_HEAD + "Focus: general\n" + _LEARNING_COMPACT_TAIL
+
 # Exercise Generator prompt
 EXERCISE_GENERATOR_PROMPT = """Generate 3 {proficiency_level} level practice questions for the topic: '{focus_area}'.
 Each question should be:
@@ -198,6 +221,10 @@ Example format: {{
 
 Do not include any text outside the JSON structure."""
 
+# Compact variant of the exercise generator prompt
+EXERCISE_GENERATOR_PROMPT_COMPACT = """Write 3 {proficiency_level} practice questions on '{focus_area}', based on '{user_input}', with answers.
+Return only JSON: {{"questions": ["q1", "q2", "q3"], "answers": ["a1", "a2", "a3"]}}"""
+
 # Analyzer Module prompt
 ANALYZER_PROMPT = """Analyze this sentence: "{user_input}".
 Evaluate grammar, spelling, and sentence structure.
@@ -214,3 +241,79 @@ Example format: {{
 }}
 
 Do not include any text outside the JSON structure."""
+
+# Batch packing suffix, appended to a single-sentence prompt whose input lists several numbered sentences
+PACKED_BATCH_SUFFIX = """
+
+BATCH MODE: The input above contains {count} numbered sentences. Treat each sentence independently and apply all of the instructions above to each one.
+IMPORTANT: This overrides the response format above. Instead of a single object, format your response as valid JSON with a single key: items.
+The value of items must be an array of exactly {count} objects, one per numbered sentence and in the same order, each with the keys and format described above for one response.
+Example format: {{
+  "items": [{{...result for sentence 1...}}, {{...result for sentence 2...}}]
+}}
+
+Do not include any text outside the JSON structure."""
+
+# Text translation prompt
+TRANSLATION_PROMPT = """Translate the following text from {source_lang} to {target_lang}.
+{style}
+Return only the translated text, without quotes, notes or explanations.
+{reference}
+Text: "{text}"
+"""
+
+# Chat translation prompt, with recent turns as context
+CHAT_TRANSLATION_PROMPT = """You are translating one message in an ongoing conversation from {source_lang} to {target_lang}.
+{style}
+Use the earlier messages only as context for tone, pronouns and references. Translate only the new message.
+Return only the translated message, without quotes, notes or explanations.
+
+Earlier messages:
+{history}
+
+New message: "{text}"
+"""
+
+# Rolling conversation summary prompt
+CONVERSATION_SUMMARY_PROMPT = """Update the running summary of a conversation.
+
+Current summary (may be empty):
+{summary}
+
+New messages to fold into the summary:
+{messages}
+
+Write an updated summary of at most {max_words} words. Keep who said what, the topics, decisions, open questions, the tone and the formality level of each speaker.
+Return only the summary text."""
+
+# Incremental conversation analysis prompt, scoring only the new messages
+INCREMENTAL_ANALYSIS_PROMPT = """You are continuing an analysis of an ongoing conversation. Only the new messages need to be analyzed; the state below describes everything before them.
+
+Conversation state:
+{state}
+
+New messages:
+{messages}
+
+Analyze each new message for: {aspects}.
+Scores: sentiment from -1 (very negative) to 1 (very positive); formality from 0 (very informal) to 1 (very formal); engagement from 0 (disengaged) to 1 (highly engaged).
+
+IMPORTANT: Format your response as valid JSON with these exact keys: messages, summary.
+messages must be an array with exactly {count} objects, one per new message in order. Include only the requested aspects; cultural is a short note or an empty string.
+summary is an updated one-sentence summary of the whole conversation so far.
+Example format: {{
+  "messages": [{{"sentiment": 0.6, "formality": 0.3, "engagement": 0.8, "cultural": ""}}],
+  "summary": "Two friends are planning a weekend trip."
+}}
+
+Do not include any text outside the JSON structure."""
+
+# Targeted re-ask when a JSON response is missing keys
+JSON_REPAIR_PROMPT = """{prompt}
+
+Your previous response was:
+{response}
+
+It is missing these keys, or their values have the wrong type: {keys}.
+IMPORTANT: Format your response as valid JSON containing only these keys: {keys}.
+Do not repeat any other keys. Do not include any text outside the JSON structure."""
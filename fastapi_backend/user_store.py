@@ -0,0 +1,170 @@
+"""
+Pluggable user repository with a SQLite (WAL) default backend.
+"""
+import os
+import string
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlite_pool import SQLitePool
+
+# User store configuration
+USER_STORE = os.getenv("USER_STORE", "sqlite")  # sqlite, memory
+USER_DB = os.getenv("USER_DB", "users.db")
+USER_DB_POOL_SIZE = int(os.getenv("USER_DB_POOL_SIZE", 4))
+
+# SQLite's NOCASE collation folds ASCII letters only
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class UserExistsError(Exception):
+    """Raised when a username or email is already registered."""
+
+    def __init__(self, field: str):
+        super().__init__(f"{field} already registered")
+        self.field = field
+
+
+def email_key(email: str) -> str:
+    """An email as compared for uniqueness: ASCII letters lowercased, the same as SQLite's NOCASE."""
+    return email.translate(_ASCII_LOWER)
+
+
+class UserRepository(ABC):
+    """
+    Interface for user storage.
+
+    Users are plain dicts with id, username, email, hashed_password and created_at.
+    Usernames match exactly; emails match by email_key, so every backend
+    agrees on which addresses collide.
+    """
+
+    @abstractmethod
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        """Look up a user by username."""
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        """Look up a user by email, ignoring ASCII case."""
+
+    @abstractmethod
+    async def create(self, user: dict) -> dict:
+        """Insert a user, raising UserExistsError if the username or email is taken."""
+
+    @abstractmethod
+    async def update_password_hash(self, username: str, hashed_password: str):
+        """Replace a user's password hash."""
+
+    def close(self):
+        """Release any resources held by the repository."""
+
+
+class InMemoryUserRepository(UserRepository):
+    """Process-local repository with hash indexes, for development and tests."""
+
+    def __init__(self):
+        self._by_username: Dict[str, dict] = {}
+        self._by_email: Dict[str, dict] = {}
+
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        user = self._by_username.get(username)
+        return dict(user) if user else None
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        user = self._by_email.get(email_key(email))
+        return dict(user) if user else None
+
+    async def create(self, user: dict) -> dict:
+        if user["username"] in self._by_username:
+            raise UserExistsError("Username")
+        if email_key(user["email"]) in self._by_email:
+            raise UserExistsError("Email")
+        stored = dict(user)
+        self._by_username[stored["username"]] = stored
+        self._by_email[email_key(stored["email"])] = stored
+        return dict(stored)
+
+    async def update_password_hash(self, username: str, hashed_password: str):
+        if username in self._by_username:
+            self._by_username[username]["hashed_password"] = hashed_password
+
+
+class SQLiteUserRepository(UserRepository):
+    """
+    SQLite-backed repository shared by every worker process.
+
+    The database runs in WAL mode so readers never block the writer, and
+    username and email carry unique indexes, making lookups and uniqueness
+    checks O(log n). Queries go through a SQLitePool, so the event loop never
+    blocks on I/O.
+    """
+
+    def __init__(self, path: str = USER_DB, pool_size: int = USER_DB_POOL_SIZE):
+        self.path = path
+        self._pool = SQLitePool(path, pool_size, "user-db", (
+            "CREATE TABLE IF NOT EXISTS users ("
+            "id TEXT PRIMARY KEY, "
+            "username TEXT NOT NULL, "
+            "email TEXT NOT NULL, "
+            "hashed_password TEXT NOT NULL, "
+            "created_at TEXT NOT NULL)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email COLLATE NOCASE)",
+        ))
+
+    @staticmethod
+    def _row_to_user(row) -> Optional[dict]:
+        """Convert a row into a user dict."""
+        if row is None:
+            return None
+        user = dict(row)
+        user["created_at"] = datetime.fromisoformat(user["created_at"])
+        return user
+
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        row = await self._pool.run(
+            lambda conn: conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        )
+        return self._row_to_user(row)
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        row = await self._pool.run(
+            lambda conn: conn.execute("SELECT * FROM users WHERE email = ? COLLATE NOCASE", (email,)).fetchone()
+        )
+        return self._row_to_user(row)
+
+    async def create(self, user: dict) -> dict:
+        def insert(conn):
+            conn.execute(
+                "INSERT INTO users (id, username, email, hashed_password, created_at) VALUES (?, ?, ?, ?, ?)",
+                (user["id"], user["username"], user["email"], user["hashed_password"], user["created_at"].isoformat()),
+            )
+
+        try:
+            await self._pool.run(insert)
+        except sqlite3.IntegrityError as e:
+            # The unique indexes make concurrent registrations race-free
+            raise UserExistsError("Email" if "email" in str(e) else "Username") from e
+        return dict(user)
+
+    async def update_password_hash(self, username: str, hashed_password: str):
+        await self._pool.run(
+            lambda conn: conn.execute("UPDATE users SET hashed_password = ? WHERE username = ?", (hashed_password, username))
+        )
+
+    def close(self):
+        self._pool.close()
+
+
+def create_user_repository() -> UserRepository:
+    """
+    Build the repository selected by USER_STORE.
+
+    Returns:
+        A UserRepository instance
+    """
+    if USER_STORE == "memory":
+        return InMemoryUserRepository()
+    return SQLiteUserRepository()
@@ -0,0 +1,61 @@
+"""
+Build the per-language wordlists used by the sentence scorer.
+
+Writes <language>.txt next to this file: the most frequent words of each
+language, one per line, most frequent first, keeping only tokens the scorer's
+tokenizer would produce. Word frequencies come from the wordfreq package,
+which is needed only to rebuild the lists, not to run the backend.
+
+Usage:
+    pip install wordfreq==3.1.1
+    python -m wordlists.build --languages en,es,fr,de,it,pt --words 25000
+"""
+import argparse
+import os
+from importlib.metadata import version
+
+from sentence_scorer import WORD_PATTERN
+
+WORDLIST_DIR = os.path.dirname(os.path.abspath(__file__))
+LANGUAGES = ("en", "es", "fr", "de", "it", "pt")
+
+
+def build(language: str, words: int) -> int:
+    """
+    Write one language's wordlist.
+
+    Args:
+        language: Language code
+        words: Number of words to keep
+
+    Returns:
+        Number of words written
+    """
+    import wordfreq
+
+    kept = []
+    # Numbers and abbreviations are dropped, so ask for extra candidates
+    for word in wordfreq.top_n_list(language, int(words * 1.2)):
+        if WORD_PATTERN.fullmatch(word):
+            kept.append(word)
+            if len(kept) == words:
+                break
+
+    with open(os.path.join(WORDLIST_DIR, f"{language}.txt"), "w", encoding="utf-8") as f:
+        f.write(f"# Top {len(kept)} {language} words by frequency, from wordfreq {version('wordfreq')} (CC BY-SA 4.0)\n")
+        f.write("\n".join(kept) + "\n")
+    return len(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--languages", type=lambda value: value.split(","), default=list(LANGUAGES))
+    parser.add_argument("--words", type=int, default=25000, help="Words per language")
+    args = parser.parse_args()
+
+    for language in args.languages:
+        print(f"{language}: {build(language, args.words)} words")
+
+
+if __name__ == "__main__":
+    main()
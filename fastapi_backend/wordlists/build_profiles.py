@@ -0,0 +1,82 @@
+"""
+Build the character n-gram profiles used by the language detector.
+
+Counts the 1-3-grams of each language's most frequent words, weighted by word
+frequency, keeps the most frequent n-grams of every language, and writes a
+languages x n-grams log-probability matrix to profiles.npz next to this file.
+Besides the languages the app supports, the profiles cover every other
+language wordfreq has, marked as unsupported, so text in one of them is
+recognized as "other" instead of being forced onto its nearest neighbour.
+Word frequencies come from the wordfreq package, which is needed only to
+rebuild the profiles, not to run the backend.
+
+Usage:
+    pip install wordfreq==3.1.1
+    python -m wordlists.build_profiles --ngrams 400
+"""
+import argparse
+import os
+from collections import Counter
+from importlib.metadata import version
+
+import numpy as np
+
+from language_id import ngrams
+
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles.npz")
+# Languages of fixed_backend.LANGUAGE_NAMES; Thai is recognized by script instead
+LANGUAGES = ("en", "es", "fr", "de", "it", "pt", "ru", "zh", "ja", "ko", "ar", "hi", "tr", "nl", "pl", "vi")
+# Profiled only so that text in them is not mistaken for a supported language
+OTHER_LANGUAGES = (
+    "bg", "bn", "ca", "cs", "da", "el", "fa", "fi", "fil", "he", "hu", "id", "is",
+    "lt", "lv", "mk", "ms", "nb", "ro", "sh", "sk", "sl", "sv", "ta", "uk", "ur",
+)
+FLOOR_PROBABILITY = 1e-7  # n-grams a language never produces
+
+
+def ngram_distribution(language: str, words: int) -> Counter:
+    """Frequency-weighted n-gram probabilities of a language's top words."""
+    import wordfreq
+
+    # Read the frequency table directly; word_frequency() would need tokenizers such as jieba
+    frequencies = wordfreq.get_frequency_dict(language)
+    counts = Counter()
+    for word in sorted(frequencies, key=frequencies.__getitem__, reverse=True)[:words]:
+        frequency = frequencies[word]
+        for gram in ngrams(word):
+            counts[gram] += frequency
+    total = sum(counts.values())
+    return Counter({gram: count / total for gram, count in counts.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--languages", type=lambda value: value.split(","), default=list(LANGUAGES))
+    parser.add_argument("--other-languages", type=lambda value: value.split(","), default=list(OTHER_LANGUAGES))
+    parser.add_argument("--words", type=int, default=20000, help="Top words per language to count")
+    parser.add_argument("--ngrams", type=int, default=400, help="Most frequent n-grams kept per language")
+    args = parser.parse_args()
+
+    languages = args.languages + [language for language in args.other_languages if language not in args.languages]
+    distributions = {language: ngram_distribution(language, args.words) for language in languages}
+
+    # Vocabulary: the union of every language's most frequent n-grams
+    vocabulary = sorted({gram for distribution in distributions.values() for gram, _ in distribution.most_common(args.ngrams)})
+    log_probs = np.array([
+        [np.log(max(distributions[language].get(gram, 0.0), FLOOR_PROBABILITY)) for gram in vocabulary]
+        for language in languages
+    ], dtype=np.float16)
+
+    np.savez_compressed(
+        PROFILE_PATH,
+        languages=np.array(languages),
+        supported=np.array([language in args.languages for language in languages]),
+        ngrams=np.array(vocabulary),
+        log_probs=log_probs,
+        source=np.array(f"wordfreq {version('wordfreq')} (CC BY-SA 4.0)"),
+    )
+    print(f"{len(languages)} languages ({len(args.languages)} supported) x {len(vocabulary)} n-grams, {os.path.getsize(PROFILE_PATH)} bytes")
+
+
+if __name__ == "__main__":
+    main()